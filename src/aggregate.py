@@ -3,179 +3,400 @@ import numpy as np
 import glob
 import os
 import gc
+import argparse
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from sketch import DEFAULT_ALPHA, to_bucket, grouped_sketches, merge_grouped_sketches, grouped_quantile
+from state_store import fingerprint, save_month_states, load_month_states, state_dir
+from reader import read_parquet, required_columns, month_window_filter
+from dataset import dataset_path, partition_dir
+from query import scan, list_months
+from kpi_store import KPI_FORMATS, write_kpi, kpi_path
+from od_matrix import od_path, save_od
+from services import PICKUP_COLUMN, service_config, file_pattern, kpi_name, add_service_arguments
+from instrument import Probe, path_size, append_records, RUN_LOG_PATH
+from paths import PROCESSED_FOLDER
 
 # ------------------------------
 # CONFIG
 # ------------------------------
-INPUT_FOLDER = 'processed'     # where clean_*.parquet are stored
-OUTPUT_FOLDER = 'processed'    # KPI CSVs will also be saved here
-YEAR = 2019
+INPUT_FOLDER = PROCESSED_FOLDER     # where clean_*.parquet are stored
+OUTPUT_FOLDER = PROCESSED_FOLDER    # KPI tables will also be saved here
+STATE_FOLDER = os.path.join(OUTPUT_FOLDER, 'agg_state')   # per-month partial states
 
+# States of dataset partitions are kept apart from those of the flat files: both are
+# named after their month, and switching --source must not overwrite the other's states
+def source_state_folder(source='flat'):
+    return os.path.join(STATE_FOLDER, 'dataset') if source == 'dataset' else STATE_FOLDER
 
-# ------------------------------
-# LOAD CLEANED DATA
-# ------------------------------
-clean_files = sorted(glob.glob(os.path.join(INPUT_FOLDER, f'clean_yellow_tripdata_{YEAR}-*.parquet')))
-
-chunks = {
-    'hourly': [],
-    'daily': [],
-    'weekly': [],
-    'monthly': [],
-    'monthly_pickup': [],
-    'monthly_dropoff': [],
-    'monthly_payment_type': [],
-    'hourly_timeseries': []
+# Columns summed per group (count, sum, sum of squares) and columns with a quantile sketch
+SUM_COLS = ['trip_duration', 'avg_speed', 'total_amount', 'passenger_count', 'trip_distance']
+SKETCH_COLS = ['trip_duration', 'avg_speed', 'trip_distance']
+
+# Relative error bound of every percentile column (see sketch.py)
+SKETCH_ALPHA = DEFAULT_ALPHA
+
+# Each month is grouped once per base; every KPI table is a roll-up of one base.
+# All the calendar tables come from the small (date, hour) base.
+BASE_KEYS = {
+    'time': ['date', 'hour'],
+    'pickup': ['month', 'PULocationID'],
+    'pickup_daily': ['date', 'PULocationID'],
+    'dropoff': ['month', 'DOLocationID'],
+    'payment_type': ['month', 'payment_type'],
+}
+
+# Optional (date, hour, pickup zone) base behind --zone-timeseries. It keeps sums only:
+# a sketch per zone and hour would be far bigger than the series itself.
+ZONE_TIME_KEYS = ['date', 'hour', 'PULocationID']
+ZONE_ROW_GROUP_SIZE = 100_000
+
+# Optional origin-destination base behind --od (--od-hourly adds the pickup hour),
+# saved as sparse PU x DO matrices per month (see od_matrix.py)
+OD_KEYS = ['month', 'PULocationID', 'DOLocationID']
+OD_HOURLY_KEYS = ['month', 'hour', 'PULocationID', 'DOLocationID']
+
+# Columns sketched per base (bases not listed sketch every SKETCH_COLS column)
+BASE_SKETCH_COLS = {
+    'zone_time': [],
+    'od': ['trip_duration'],
+}
+
+def month_bases(zone_timeseries=False, od=False, od_hourly=False):
+    base_keys = dict(BASE_KEYS)
+    if zone_timeseries:
+        base_keys['zone_time'] = ZONE_TIME_KEYS
+    if od or od_hourly:
+        base_keys['od'] = OD_HOURLY_KEYS if od_hourly else OD_KEYS
+    return base_keys
+
+# Bases clean_data.py --aggregate builds while it cleans a month: enough for aggregate.py
+# with or without --zone-timeseries / --od to find every month already done
+FUSED_BASES = month_bases(zone_timeseries=True, od=True)
+
+KPI_TABLES = {
+    'hourly': ('time', ['dow', 'hour']),
+    'daily': ('time', ['date']),
+    'weekly': ('time', ['week_start']),
+    'monthly': ('time', ['month']),
+    'monthly_pickup': ('pickup', ['month', 'PULocationID']),
+    'daily_pickup': ('pickup_daily', ['date', 'PULocationID']),
+    'monthly_dropoff': ('dropoff', ['month', 'DOLocationID']),
+    'monthly_payment_type': ('payment_type', ['month', 'payment_type']),
+}
+
+# Base keys computed from a column of the cleaned file rather than read directly
+KEY_SOURCES = {
+    'date': PICKUP_COLUMN,
+    'hour': PICKUP_COLUMN,
+    'month': PICKUP_COLUMN,
 }
 
+# Only these columns are read from the cleaned files
+READ_COLUMNS = required_columns(
+    [key for keys in BASE_KEYS.values() for key in keys],
+    SUM_COLS + SKETCH_COLS,
+    KEY_SOURCES
+)
+
+# Coarser keys derived from the base keys at roll-up time
+DERIVED_KEYS = {
+    'dow': lambda keys: keys['date'].dt.dayofweek, # 0=Monday, 6=Sunday
+    'week_start': lambda keys: keys['date'].dt.to_period('W').dt.start_time,
+    'month': lambda keys: keys['date'].dt.to_period('M'),
+}
 
-if not clean_files:
-    raise FileNotFoundError('No cleaned parquet files found in processed/. Please run cleaning first.')
 
 # ------------------------------
 # AGGREGATE LOGIC
 # ------------------------------
-def apply_agg(df, group_cols):
-    return df.groupby(group_cols).agg(
-        trips=('VendorID', 'count'),
-        duration_p50=('trip_duration', 'median'),
-        duration_p95=('trip_duration', lambda x: x.quantile(0.95)),
-        duration_mean=('trip_duration', 'mean'),
-        speed_p50=('avg_speed', 'median'),
-        speed_mean=('avg_speed', 'mean'),
-        total_money=('total_amount', 'sum'),
-        passenger_mean=('passenger_count', 'mean'),
-        passenger_sum=('passenger_count', 'sum'),
-        distance_sum=('trip_distance', 'sum'),
-        distance_p50=('trip_distance', 'median'),
-        distance_mean=('trip_distance', 'mean'),
-    )
-
-def apply_agg_bonus(df):
-    return df.groupby(['date', 'hour']).agg(
-        trips=('VendorID', 'count'),
-        speed_mean=('avg_speed', 'mean'),
-        total_money=('total_amount', 'sum'),
-        distance_sum=('trip_distance', 'sum')
-    )
-
-for f in clean_files:
-    print(f'Processing: {os.path.basename(f)}')
-    df = pd.read_parquet(f)
-
-    df['date'] = df['tpep_pickup_datetime'].dt.date
-    df['year'] = df['tpep_pickup_datetime'].dt.year
-    df['month'] = df['tpep_pickup_datetime'].dt.to_period('M')
-    df['week_start'] = df['tpep_pickup_datetime'].dt.to_period('W').dt.start_time
-    df['dow']  = df['tpep_pickup_datetime'].dt.dayofweek # 0=Monday, 6=Sunday
-    df['hour'] = df['tpep_pickup_datetime'].dt.hour # 0 to 23
-    
+# Partial state of one grouping: everything in it can be added across chunks.
+# The groups are numbered once, then every sum and every sketch is a bincount
+# over those numbers (no per-group Python calls).
+def apply_agg(df, group_cols, alpha=SKETCH_ALPHA, sketch_cols=SKETCH_COLS):
+    grouped = df.groupby(group_cols, observed=True)
+    codes = grouped.ngroup().to_numpy()
+    group_index = grouped.size().index
+    n_groups = len(group_index)
+
+    sums = {'trips': np.bincount(codes, minlength=n_groups)}
+    for col in SUM_COLS:
+        values = df[col].to_numpy(dtype='float64', na_value=np.nan)
+        sums[f'{col}_sum'] = np.bincount(codes, weights=values, minlength=n_groups)
+        sums[f'{col}_sumsq'] = np.bincount(codes, weights=values * values, minlength=n_groups)
+    sums = pd.DataFrame(sums, index=group_index)
+
+    sketches = {}
+    for col in sketch_cols:
+        bucket_col = f'{col}_bucket'
+        buckets = df[bucket_col].to_numpy() if bucket_col in df.columns else to_bucket(df[col], alpha)
+        sketches[col] = grouped_sketches(codes, group_index, buckets)
+
+    return {'sums': sums, 'sketches': sketches, 'alpha': alpha}
+
+def merge_states(states):
+    alphas = {s['alpha'] for s in states}
+    if len(alphas) > 1:
+        raise ValueError(f'Cannot merge states built with different sketch alphas: {sorted(alphas)}')
+
+    sums = pd.concat([s['sums'] for s in states])
+    # min_count=1: a column the service does not report stays NaN instead of summing to 0
+    sums = sums.groupby(level=list(range(sums.index.nlevels))).sum(min_count=1)
+
+    sketches = {col: merge_grouped_sketches([s['sketches'][col] for s in states]) for col in states[0]['sketches']}
+
+    return {'sums': sums, 'sketches': sketches, 'alpha': alphas.pop()}
+
+# Re-key a base state to group_cols (deriving e.g. dow from date) and merge the rows
+def rollup_state(state, group_cols):
+    def rekey(table, extra_cols):
+        table = table.reset_index()
+        for col in group_cols:
+            if col not in table.columns:
+                table[col] = DERIVED_KEYS[col](table)
+        keys = group_cols + extra_cols
+        value_cols = [c for c in table.columns if c not in keys and c not in state_keys]
+        return table.groupby(keys)[value_cols].sum(min_count=1)
+
+    state_keys = list(state['sums'].index.names)
+    sums = rekey(state['sums'], [])
+    sketches = {col: rekey(counts.rename('n'), ['bucket'])['n'] for col, counts in state['sketches'].items()}
+    return {'sums': sums, 'sketches': sketches, 'alpha': state['alpha']}
+
+# Turn a state into the KPI columns. A column the service does not report (NaN, see
+# services.py) has NaN sums, and its percentiles are NaN as well rather than 0
+def finalize_state(state):
+    sums = state['sums']
+    trips = sums['trips']
+    sketches = state['sketches']
+    alpha = state['alpha']
+
+    def quantile(col, q):
+        return grouped_quantile(sketches[col], q, alpha).where(sums[f'{col}_sum'].notna())
+
+    kpi = pd.DataFrame({
+        'trips': trips,
+        'duration_p50': quantile('trip_duration', 0.5),
+        'duration_p95': quantile('trip_duration', 0.95),
+        'duration_mean': sums['trip_duration_sum'] / trips,
+        'speed_p50': quantile('avg_speed', 0.5),
+        'speed_mean': sums['avg_speed_sum'] / trips,
+        'total_money': sums['total_amount_sum'],
+        'passenger_mean': sums['passenger_count_sum'] / trips,
+        'passenger_sum': sums['passenger_count_sum'],
+        'distance_sum': sums['trip_distance_sum'],
+        'distance_p50': quantile('trip_distance', 0.5),
+        'distance_mean': sums['trip_distance_sum'] / trips,
+    }, index=sums.index)
+    return kpi.reset_index()
+
+# Hourly series of every pickup zone from the zone_time base, in compact dtypes and
+# sorted by zone so a reader can load a few zones at a time
+def zone_timeseries(state):
+    sums = state['sums']
+    trips = sums['trips']
+    ts = pd.DataFrame({
+        'trips': trips.astype('int32'),
+        'speed_mean': (sums['avg_speed_sum'] / trips).astype('float32'),
+        'total_money': sums['total_amount_sum'].astype('float32'),
+        'distance_sum': sums['trip_distance_sum'].astype('float32'),
+    }, index=sums.index).reset_index()
+    ts['hour'] = ts['hour'].astype('int8')
+    ts['PULocationID'] = ts['PULocationID'].astype('uint16')
+    return ts.sort_values(['PULocationID', 'date', 'hour'], ignore_index=True)
+
+# Base keys plus the sketch bucket of each row, computed once and shared by every base
+def add_key_columns(df, alpha=SKETCH_ALPHA):
+    df['date'] = df[PICKUP_COLUMN].dt.normalize()
+    df['month'] = df[PICKUP_COLUMN].dt.to_period('M')
+    df['hour'] = df[PICKUP_COLUMN].dt.hour.astype('int8') # 0 to 23
+    for col in SKETCH_COLS:
+        df[f'{col}_bucket'] = to_bucket(df[col], alpha)
+    return df
+
+# States of every base for one month of READ_COLUMNS
+def aggregate_month(df, base_keys, alpha=SKETCH_ALPHA, probe=None):
+    probe = probe or Probe('aggregate')
+    with probe.phase('keys'):
+        df = add_key_columns(df, alpha)
+    with probe.phase('groupby'):
+        return {
+            base: apply_agg(df, keys, alpha, BASE_SKETCH_COLS.get(base, SKETCH_COLS)) for base, keys in base_keys.items()
+        }
+
+
+# One (name, path, loader) per cleaned month of the year; the loader returns its READ_COLUMNS
+def month_sources(year, service, source='flat'):
+    sources = []
+    prefix = service_config(service)['prefix']
+    if source == 'dataset':
+        root = dataset_path(INPUT_FOLDER, service)
+        for year, month in list_months(root, years=[year]):
+            sources.append((
+                f'clean_{prefix}_{year}-{month:02d}',
+                partition_dir(root, year, month),
+                lambda year=year, month=month: scan(root, READ_COLUMNS, years=[year], months=[month])
+            ))
+    else:
+        for f in sorted(glob.glob(file_pattern(service, year, INPUT_FOLDER, clean=True))):
+            month_str = os.path.basename(f).split('_')[-1].replace('.parquet', '')
+            sources.append((
+                os.path.basename(f).replace('.parquet', ''),
+                f,
+                lambda f=f, month_str=month_str: read_parquet(
+                    f, READ_COLUMNS, month_window_filter(PICKUP_COLUMN, month_str)
+                )
+            ))
+    return sources
+
+# Month states of every source, from the state store when the cleaned file is unchanged;
+# returns the states per base and the run-log records of the months scanned
+def load_states(sources, base_keys, alpha, fingerprint_method='mtime', full=False, state_folder=STATE_FOLDER):
+    sketch_cols = {base: BASE_SKETCH_COLS.get(base, SKETCH_COLS) for base in base_keys}
+    chunks = {base: [] for base in base_keys}
+    records = []
+
+    for name, path, load in sources:
+        source_fingerprint = fingerprint(path, fingerprint_method)
+        month_states = None
+        if not full:
+            month_states = load_month_states(
+                path, source_fingerprint, base_keys, sketch_cols, alpha, state_folder, name
+            )
+
+        if month_states is None:
+            print(f'Processing: {name}')
+            probe = Probe('aggregate', name)
+            with probe.phase('read'):
+                df = load()
+            month_states = aggregate_month(df, base_keys, alpha, probe)
+            with probe.phase('write'):
+                save_month_states(path, source_fingerprint, month_states, state_folder, name)
+
+            probe.count(rows_in=len(df), rows_out=sum(len(state['sums']) for state in month_states.values()),
+                        bytes_read=path_size(path), bytes_written=path_size(state_dir(path, state_folder, name)))
+            records.append(probe.finish())
+            del df
+            gc.collect()
+        else:
+            print(f'Unchanged: {name}')
+
+        for base in base_keys:
+            chunks[base].append(month_states[base])
+    return chunks, records
+
+# KPI tables of one year (kpi_<name>[_<service>]_<year>, see services.py); returns the
+# run-log records, or None when the year has no cleaned months
+def aggregate_year(year, service, args, base_keys):
+    sources = month_sources(year, service, args.source)
+    if not sources:
+        print(f'No cleaned {service} files for {year}')
+        return None
+    chunks, records = load_states(sources, base_keys, args.sketch_alpha, args.fingerprint, args.full,
+                                  source_state_folder(args.source))
+
+    #-------------------------------
+    #   CHUNK MERGE
+    #-------------------------------
+    probe = Probe('aggregate', kpi_name('kpi', service) + f'_{year}')
+    with probe.phase('merge'):
+        base_states = {base: merge_states(states) for base, states in chunks.items()}
+
+    kpi = {}
+    with probe.phase('groupby'):
+        for key, (base, group_cols) in KPI_TABLES.items():
+            kpi[key] = finalize_state(rollup_state(base_states[base], group_cols))
+
+    dow_map = {0: 'Mon', 1: 'Tue', 2: 'Wed', 3: 'Thu', 4: 'Fri', 5: 'Sat', 6: 'Sun'}
+    kpi['hourly']['day'] = kpi['hourly']['dow'].map(dow_map)
+
+    # Bonus: (date, hour) series straight from the time base
+    bonus_final = finalize_state(base_states['time'])[
+        ['date', 'hour', 'trips', 'speed_mean', 'total_money', 'distance_sum']
+    ]
+
     # =====================================================
-    #  KPI
+    #   COMPUTE PERCENTAGE AND SAVE OUTPUTS
     # =====================================================
-    chunks['hourly'].append(apply_agg(df, ['dow', 'hour']))
-    chunks['daily'].append(apply_agg(df, ['date']))
-    chunks['weekly'].append(apply_agg(df, ['week_start']))
-    chunks['monthly'].append(apply_agg(df, ['month']))
-    
-    chunks['monthly_pickup'].append(apply_agg(df, ['month', 'PULocationID']))
-    chunks['monthly_dropoff'].append(apply_agg(df, ['month', 'DOLocationID']))
-    chunks['monthly_payment_type'].append(apply_agg(df, ['month', 'payment_type']))
-    chunks['hourly_timeseries'].append(apply_agg_bonus(df))
-
-    del df
-    gc.collect()
-
-
-#-------------------------------
-#   CHUNK MERGE
-#-------------------------------
-
-kpi = {
-    'hourly': pd.DataFrame(),
-    'daily': pd.DataFrame(),
-    'weekly': pd.DataFrame(),
-    'monthly': pd.DataFrame(),
-    'monthly_pickup': pd.DataFrame(),
-    'monthly_dropoff': pd.DataFrame(),
-    'monthly_payment_type': pd.DataFrame()
-}
+    # kpi_<key>_<year> in every --kpi-format (see kpi_store.py)
+    total_trips_year = kpi['monthly']['trips'].sum()
+    total_money_year = kpi['monthly']['total_money'].sum()
 
-for key in kpi:
-    kpi[key] = pd.concat(chunks[key]).reset_index()
+    for key in KPI_TABLES:
+        kpi[key]['trip_pct'] = (kpi[key]['trips'] / total_trips_year) * 100
+        kpi[key]['money_pct'] = (kpi[key]['total_money'] / total_money_year) * 100
 
-# ------------------------------
-# Fix duplicate rows in weekly
-# ------------------------------
+        with probe.phase('write'):
+            write_kpi(kpi[key], kpi_name(key, service), year, OUTPUT_FOLDER, args.kpi_format)
+        print(f"Saved: kpi_{kpi_name(key, service)}_{year} ({', '.join(args.kpi_format)})")
 
-kpi['weekly'] = kpi['weekly'].groupby('week_start').agg(
-    trips=('trips', 'sum'),
-    total_money=('total_money', 'sum'),
-    passenger_sum=('passenger_sum', 'sum'),
-    distance_sum=('distance_sum', 'sum'),
-    duration_p50=('duration_p50', 'mean'), 
-    duration_p95=('duration_p95', 'mean'),
-    duration_mean=('duration_mean', 'mean'),
-    speed_p50=('speed_p50', 'mean'),
-    speed_mean=('speed_mean', 'mean'),
-    distance_p50=('distance_p50', 'mean'),
-).reset_index()
-
-kpi['weekly'] = kpi['weekly'].sort_values('week_start')
 
-# ------------------------------
-# Merge Hourly
-# ------------------------------
-kpi['hourly'] = kpi['hourly'].groupby(['dow', 'hour']).agg(
-    trips=('trips', 'sum'),
-    total_money=('total_money', 'sum'),
-    passenger_sum=('passenger_sum', 'sum'),
-    distance_sum=('distance_sum', 'sum'),
-    duration_p50=('duration_p50', 'mean'), 
-    duration_p95=('duration_p95', 'mean'),
-    duration_mean=('duration_mean', 'mean'),
-    speed_p50=('speed_p50', 'mean'),
-    speed_mean=('speed_mean', 'mean'),
-    distance_p50=('distance_p50', 'mean'),
-).reset_index()
-
-dow_map = {0: 'Mon', 1: 'Tue', 2: 'Wed', 3: 'Thu', 4: 'Fri', 5: 'Sat', 6: 'Sun'}
-kpi['hourly']['day'] = kpi['hourly']['dow'].map(dow_map)
-
-# New merge
-bonus_df = pd.concat(chunks['hourly_timeseries']).reset_index()
-bonus_final = bonus_df.groupby(['date', 'hour']).agg(
-    trips=('trips', 'sum'),
-    speed_mean=('speed_mean', 'mean'),
-    total_money=('total_money', 'sum'),
-    distance_sum=('distance_sum', 'sum')
-).reset_index()
-
-
-# =====================================================
-#   COMPUTE PERCENTAGE AND SAVE OUTPUTS
-# =====================================================
-output_path = {
-    'hourly': f'kpi_hourly_{YEAR}.csv',
-    'daily': f'kpi_daily_{YEAR}.csv',
-    'weekly': f'kpi_weekly_{YEAR}.csv',
-    'monthly': f'kpi_monthly_{YEAR}.csv',
-    'monthly_pickup': f'kpi_monthly_pickup_{YEAR}.csv',
-    'monthly_dropoff': f'kpi_monthly_dropoff_{YEAR}.csv',
-    'monthly_payment_type': f'kpi_monthly_payment_type_{YEAR}.csv'
-}
+    # kpi bonus
+    with probe.phase('write'):
+        write_kpi(bonus_final, kpi_name('hourly_timeseries', service), year, OUTPUT_FOLDER, args.kpi_format)
+    written = [kpi_path(kpi_name(key, service), year, OUTPUT_FOLDER, fmt)
+               for key in [*KPI_TABLES, 'hourly_timeseries'] for fmt in args.kpi_format]
+
+    if 'zone_time' in base_states:
+        zone_output_path = zone_timeseries_path(year, service)
+        with probe.phase('groupby'):
+            zone_table = pa.Table.from_pandas(zone_timeseries(base_states['zone_time']), preserve_index=False)
+        with probe.phase('write'):
+            pq.write_table(zone_table, zone_output_path, row_group_size=ZONE_ROW_GROUP_SIZE)
+        written.append(zone_output_path)
+        print(f"Saved: {os.path.basename(zone_output_path)}")
+
+    if 'od' in base_states:
+        output_path = od_path(year, OUTPUT_FOLDER, service)
+        with probe.phase('write'):
+            save_od(base_states['od'], output_path)
+        written.append(output_path)
+        print(f"Saved: {os.path.basename(output_path)}")
+
+    probe.count(rows_in=sum(len(state['sums']) for state in base_states.values()),
+                rows_out=sum(len(table) for table in kpi.values()) + len(bonus_final),
+                bytes_written=sum(path_size(p) for p in written))
+    records.append(probe.finish(months=len(sources), months_rescanned=len(records)))
+    return records
+
+def zone_timeseries_path(year, service, folder=OUTPUT_FOLDER):
+    return os.path.join(folder, f"kpi_{kpi_name('zone_hourly_timeseries', service)}_{year}.parquet")
+
 
-total_trips_year = kpi['monthly']['trips'].sum()
-total_money_year = kpi['monthly']['total_money'].sum()
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Aggregate cleaned trips into KPI tables, one set per year.')
+    add_service_arguments(parser, 'Years to aggregate, each into its own kpi_*_<year> tables')
+    parser.add_argument('--sketch-alpha', type=float, default=SKETCH_ALPHA,
+                        help=f'Relative error bound of the percentile columns (default: {SKETCH_ALPHA})')
+    parser.add_argument('--fingerprint', choices=['mtime', 'hash'], default='mtime',
+                        help='How to tell a cleaned file changed: size+mtime (default) or sha256 of its content')
+    parser.add_argument('--full', action='store_true',
+                        help='Ignore the stored per-month states and rescan every file')
+    parser.add_argument('--source', choices=['flat', 'dataset'], default='flat',
+                        help='Read clean_*.parquet files (default) or the partitioned dataset of clean_data.py')
+    parser.add_argument('--kpi-format', nargs='+', choices=KPI_FORMATS, default=['parquet', 'csv'],
+                        help='Formats of the kpi_* tables: parquet, ipc (memory-mapped Arrow) and/or csv '
+                             '(default: parquet csv)')
+    parser.add_argument('--zone-timeseries', action='store_true',
+                        help='Also write the (date, hour, PULocationID) series to kpi_zone_hourly_timeseries_<year>.parquet')
+    parser.add_argument('--od', action='store_true',
+                        help='Also write the (month, PU, DO) origin-destination matrix to kpi_od_<year>.npz')
+    parser.add_argument('--od-hourly', action='store_true',
+                        help='Key the origin-destination matrix by pickup hour as well (implies --od)')
+    args = parser.parse_args(argv)
 
-for key, filename in output_path.items():
-    kpi[key]['trip_pct'] = (kpi[key]['trips'] / total_trips_year) * 100
-    kpi[key]['money_pct'] = (kpi[key]['total_money'] / total_money_year) * 100
+    base_keys = month_bases(args.zone_timeseries, args.od, args.od_hourly)
 
-    kpi[key].to_csv(os.path.join(OUTPUT_FOLDER, filename), index=False)
-    print(f"Saved: {filename}")
+    records = []   # run log (instrument.py): one line per scanned month + one per year's KPI tables
+    for year in args.years:
+        year_records = aggregate_year(year, args.service, args, base_keys)
+        if year_records is not None:
+            records += year_records
+    if not records:
+        raise FileNotFoundError('No cleaned parquet files found in processed/. Please run cleaning first.')
+    append_records(records, RUN_LOG_PATH)
 
 
-# kpi bonus
-bonus_output_path = os.path.join(OUTPUT_FOLDER, f'kpi_hourly_timeseries_{YEAR}.csv')
-bonus_final.to_csv(bonus_output_path, index=False)
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,162 @@
+import pandas as pd
+import numpy as np
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import hashlib
+import time
+import os
+
+from bonus_PredictiveModel import (
+    FORECAST_DAYS, LAG, load_kpi_daily, baseline_forecast, fit_linear_regression,
+    forecast_linear_regression, fit_sarimax, forecast_sarimax, sarimax_spec
+)
+from model_cache import series_hash
+from paths import PROCESSED_FOLDER, REPORTS_FOLDER
+
+# ============= ROLLING-ORIGIN BACKTEST =============#
+# Every fold trains on all days before its origin and forecasts the next `horizon` days;
+# origins move forward by `step` days. Each (model, fold) runs in its own worker and its
+# errors are cached, so adding a model only runs that model's folds.
+
+REPORTS_PATH = REPORTS_FOLDER
+CACHE_FOLDER = os.path.join(PROCESSED_FOLDER, 'backtest_cache')
+
+INITIAL_DAYS = 180   # training days of the first fold
+STEP_DAYS = 14
+
+# name -> (spec, forecast(train, future_dates)); the spec is part of the cache key,
+# so changing a model's configuration recomputes its folds
+def _baseline(train, future_dates):
+    return baseline_forecast(train['trips'], len(future_dates))
+
+def _linear_reg(train, future_dates):
+    model = fit_linear_regression(train)
+    return forecast_linear_regression(model, train['trips'], future_dates)
+
+def _arima(train, future_dates):
+    return np.asarray(forecast_sarimax(fit_sarimax(train), future_dates))
+
+MODELS = {
+    'Baseline': ('baseline_last365', _baseline),
+    'Linear_Reg': (f'linreg_lag{LAG}', _linear_reg),
+    'ARIMA': (sarimax_spec(), _arima),
+}
+
+# Index of the first test day of every fold
+def rolling_origins(n_days, initial=INITIAL_DAYS, horizon=FORECAST_DAYS, step=STEP_DAYS):
+    return list(range(initial, n_days - horizon + 1, step))
+
+def fold_cache_path(model, train, test, folder=CACHE_FOLDER):
+    spec = MODELS[model][0]
+    key = hashlib.sha256(f'{model}|{spec}|{series_hash(train["trips"])}|{series_hash(test["trips"])}'.encode())
+    return os.path.join(folder, f'{model}__{key.hexdigest()[:24]}.parquet')
+
+# One model on one fold -> one row per forecast day (runs inside a worker process)
+def run_fold(job):
+    model, fold, train, test = job
+    start = time.perf_counter()
+    forecast = MODELS[model][1](train, test.index)
+    seconds = time.perf_counter() - start
+
+    return pd.DataFrame({
+        'model': model,
+        'fold': fold,
+        'origin': test.index[0],
+        'horizon': np.arange(1, len(test) + 1),
+        'date': test.index,
+        'actual': test['trips'].to_numpy(dtype=np.float64),
+        'forecast': np.asarray(forecast, dtype=np.float64),
+        'fit_seconds': seconds,
+    })
+
+# RMSE / MAE / MAPE (%) of every group; MAPE skips days with 0 actual trips
+def error_metrics(df, group_cols):
+    err = df['forecast'] - df['actual']
+    nonzero = df['actual'] != 0
+    parts = pd.DataFrame({
+        'sq': err ** 2,
+        'abs': err.abs(),
+        'ape': (err.abs() / df['actual'].where(nonzero)) * 100,
+    })
+    for col in group_cols:
+        parts[col] = df[col]
+    grouped = parts.groupby(group_cols)
+    return pd.DataFrame({
+        'RMSE': np.sqrt(grouped['sq'].mean()),
+        'MAE': grouped['abs'].mean(),
+        'MAPE (%)': grouped['ape'].mean(),
+        'n': grouped.size(),
+    }).reset_index()
+
+def backtest(data, models, initial=INITIAL_DAYS, horizon=FORECAST_DAYS, step=STEP_DAYS, workers=1,
+             use_cache=True, cache_folder=CACHE_FOLDER):
+    origins = rolling_origins(len(data), initial, horizon, step)
+    if not origins:
+        raise ValueError(f'{len(data)} days are too few for {initial} training days + {horizon} forecast days')
+
+    results, jobs, paths = [], [], []
+    for model in models:
+        for fold, origin in enumerate(origins):
+            train, test = data.iloc[:origin], data.iloc[origin:origin + horizon]
+            path = fold_cache_path(model, train, test, cache_folder)
+            if use_cache and os.path.exists(path):
+                # The cached fold number is the one of the run that wrote it
+                results.append(pd.read_parquet(path).assign(fold=fold))
+            else:
+                jobs.append((model, fold, train, test))
+                paths.append(path)
+
+    print(f"{len(origins)} folds x {len(models)} models: {len(results)} cached, {len(jobs)} to run")
+
+    if workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+            new_results = list(pool.map(run_fold, jobs))
+    else:
+        new_results = [run_fold(job) for job in jobs]
+
+    if use_cache:
+        os.makedirs(cache_folder, exist_ok=True)
+        for path, result in zip(paths, new_results):
+            result.to_parquet(path, index=False)
+
+    return pd.concat(results + new_results, ignore_index=True).sort_values(['model', 'fold', 'horizon'])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Rolling-origin backtest of the forecasting models on kpi_daily.')
+    parser.add_argument('--models', nargs='+', choices=list(MODELS), default=list(MODELS),
+                        help='Models to evaluate (default: all)')
+    parser.add_argument('--initial', type=int, default=INITIAL_DAYS,
+                        help=f'Training days of the first fold (default: {INITIAL_DAYS})')
+    parser.add_argument('--horizon', type=int, default=FORECAST_DAYS,
+                        help=f'Days forecast by every fold (default: {FORECAST_DAYS})')
+    parser.add_argument('--step', type=int, default=STEP_DAYS,
+                        help=f'Days between two fold origins (default: {STEP_DAYS})')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Number of (model, fold) fits to run in parallel (default: 1)')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Recompute every fold and leave the fold cache untouched')
+    args = parser.parse_args(argv)
+
+    for name in ['initial', 'horizon', 'step', 'workers']:
+        if getattr(args, name) < 1:
+            parser.error(f'--{name} must be at least 1')
+
+    data = load_kpi_daily()
+    folds = backtest(data, args.models, args.initial, args.horizon, args.step, args.workers, not args.no_cache)
+
+    by_horizon = error_metrics(folds, ['model', 'horizon'])
+    by_fold = error_metrics(folds, ['model', 'fold', 'origin'])
+    timing = folds.groupby(['model', 'fold'], as_index=False)['fit_seconds'].first()
+    by_fold = by_fold.merge(timing, on=['model', 'fold'])
+
+    os.makedirs(REPORTS_PATH, exist_ok=True)
+    by_horizon.to_csv(os.path.join(REPORTS_PATH, 'backtest_by_horizon.csv'), index=False)
+    by_fold.to_csv(os.path.join(REPORTS_PATH, 'backtest_by_fold.csv'), index=False)
+
+    print(error_metrics(folds, ['model']))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,224 @@
+import pandas as pd
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+import argparse
+import json
+import os
+import platform
+import time
+from datetime import datetime
+
+import synthetic
+from clean_data import process_month
+from schema import to_arrow
+from reader import read_parquet, month_window_filter
+from aggregate import (
+    BASE_KEYS, ZONE_TIME_KEYS, OD_KEYS, BASE_SKETCH_COLS, SKETCH_COLS, READ_COLUMNS,
+    add_key_columns, apply_agg, finalize_state, zone_timeseries
+)
+from bonus_AnomalyDetection import GROUP_KEYS, add_features, grouped_zscores, flag_anomalies
+from bonus_PredictiveModel import (
+    FORECAST_DAYS, fit_linear_regression, forecast_linear_regression, fit_sarimax, forecast_sarimax
+)
+from instrument import Probe
+from paths import PROCESSED_FOLDER, REPORTS_FOLDER
+
+# ------------------------------
+# BENCHMARK SUITE
+# ------------------------------
+# Times the hot paths on synthetic months (synthetic.py) of several sizes:
+#   clean.*      process_month and writing the cleaned file
+#   aggregate.*  reading it back, the key columns and apply_agg of every base
+#   anomaly.*    scoring the city series and every zone's series
+#   forecast.*   fitting + forecasting one daily series (same size at every scale)
+# Every case runs --repeat times and keeps the fastest run. Results go to
+# reports/benchmark_latest.json and are compared with reports/benchmark_baseline.json
+# (--save-baseline makes the current run the baseline).
+BENCH_FOLDER = os.path.join(PROCESSED_FOLDER, 'benchmark')
+BASELINE_PATH = os.path.join(REPORTS_FOLDER, 'benchmark_baseline.json')
+LATEST_PATH = os.path.join(REPORTS_FOLDER, 'benchmark_latest.json')
+DEFAULT_SCALES = ['100k', '1M']
+BENCH_MONTH = '2019-03'
+TOLERANCE = 0.25       # slower than baseline by more than this fraction = regression
+NOISE_FLOOR = 0.01     # seconds; differences below it are never a regression
+
+def environment():
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'pyarrow': pa.__version__,
+    }
+
+# Synthetic raw month of n_rows, generated once per (size, seed); the file keeps the TLC
+# name (clean_data reads the month from it), so each size gets its own folder
+def scale_folder(n_rows, seed=0):
+    return os.path.join(BENCH_FOLDER, f'{n_rows}_seed{seed}')
+
+def raw_month(n_rows, seed=0):
+    folder = scale_folder(n_rows, seed)
+    os.makedirs(folder, exist_ok=True)
+    path = os.path.join(folder, f'yellow_tripdata_{BENCH_MONTH}.parquet')
+    if not os.path.exists(path):
+        print(f'Generating: {path}')
+        synthetic.write_raw_month(path, BENCH_MONTH, n_rows, seed)
+    return path
+
+def selected(case, cases):
+    return not cases or any(case.startswith(prefix) for prefix in cases)
+
+# Run fn repeat times; the result of the last run is handed back for the next cases.
+# Cases not selected still run once when a later case needs their output, unrecorded.
+def run_case(results, case, scale, repeat, fn, cases=None):
+    if not selected(case, cases):
+        return fn()
+
+    runs = []
+    probe = Probe('benchmark', case)
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = fn()
+        runs.append(time.perf_counter() - start)
+    record = probe.finish()
+
+    rows = len(out) if hasattr(out, '__len__') and not isinstance(out, dict) else None
+    results.append({
+        'case': case, 'scale': scale, 'rows_out': rows, 'seconds': min(runs),
+        'runs': [round(r, 5) for r in runs], 'peak_rss_mb': record['peak_rss_mb'],
+    })
+    print(f'{case:<34} {scale:>10}  {min(runs):8.4f}s')
+    return out
+
+# add_key_columns / add_features / grouped_zscores only (re)write their own columns,
+# so repeated runs on the same frame time the same work
+def bench_scale(n_rows, repeat, seed, cases):
+    results = []
+    path = raw_month(n_rows, seed)
+
+    clean_df = run_case(results, 'clean.process_month', n_rows, repeat, lambda: process_month(path)[0], cases)
+    clean_path = os.path.join(scale_folder(n_rows, seed), f'clean_{BENCH_MONTH}.parquet')
+    run_case(results, 'clean.write', n_rows, repeat,
+             lambda: pq.write_table(to_arrow(clean_df, BENCH_MONTH), clean_path), cases)
+    del clean_df
+
+    df = run_case(results, 'aggregate.read', n_rows, repeat, lambda: read_parquet(
+        clean_path, READ_COLUMNS, month_window_filter('tpep_pickup_datetime', BENCH_MONTH)), cases)
+    df = run_case(results, 'aggregate.add_key_columns', n_rows, repeat, lambda: add_key_columns(df), cases)
+
+    base_keys = dict(BASE_KEYS, zone_time=ZONE_TIME_KEYS, od=OD_KEYS)
+    states = {}
+    for base, keys in base_keys.items():
+        sketch_cols = BASE_SKETCH_COLS.get(base, SKETCH_COLS)
+        states[base] = run_case(results, f'aggregate.apply_agg[{base}]', n_rows, repeat,
+                                lambda keys=keys, sketch_cols=sketch_cols: apply_agg(df, keys, sketch_cols=sketch_cols),
+                                cases)
+
+    city = finalize_state(states['time'])
+    zones = zone_timeseries(states['zone_time'])
+    run_case(results, 'anomaly.city', n_rows, repeat,
+             lambda: flag_anomalies(grouped_zscores(add_features(city))), cases)
+    run_case(results, 'anomaly.zones', n_rows, repeat,
+             lambda: flag_anomalies(grouped_zscores(add_features(zones), ['PULocationID'] + GROUP_KEYS)), cases)
+    return results
+
+# One year of daily trips with a weekly cycle, a yearly swing and noise
+def daily_series(seed=0, year=2019):
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range(f'{year}-01-01', f'{year}-12-31', freq='D')
+    season = 1 + 0.1 * np.sin(2 * np.pi * dates.dayofyear / 365)
+    trips = 250_000 * synthetic.DOW_PROFILE[dates.dayofweek] * season * rng.lognormal(0, 0.05, len(dates))
+    return pd.DataFrame({'trips': trips.round()}, index=pd.Index(dates, name='date'))
+
+def bench_forecast(repeat, seed, cases):
+    results = []
+    data = daily_series(seed)
+    future = pd.date_range(data.index[-1] + pd.Timedelta(days=1), periods=FORECAST_DAYS, freq='D')
+    for case, fn in [
+        ('forecast.linear_regression', lambda: forecast_linear_regression(fit_linear_regression(data), data['trips'], future)),
+        ('forecast.sarimax', lambda: forecast_sarimax(fit_sarimax(data), future)),
+    ]:
+        if selected(case, cases):
+            run_case(results, case, len(data), repeat, fn)
+    return results
+
+def case_key(result):
+    return f"{result['case']}@{result['scale']}"
+
+# Current results with their baseline time and ratio; regression when slower than
+# baseline by more than tolerance and by more than the noise floor
+def compare(results, baseline, tolerance=TOLERANCE):
+    base = {case_key(r): r['seconds'] for r in baseline.get('results', [])}
+    rows = []
+    for r in results:
+        before = base.get(case_key(r))
+        ratio = r['seconds'] / before if before else np.nan
+        regression = bool(before and ratio > 1 + tolerance and r['seconds'] - before > NOISE_FLOOR)
+        rows.append({'case': r['case'], 'scale': r['scale'], 'seconds': r['seconds'],
+                     'baseline': before, 'ratio': ratio, 'regression': regression})
+    return pd.DataFrame(rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the pipeline hot paths on synthetic TLC months.')
+    parser.add_argument('--scales', nargs='+', default=DEFAULT_SCALES,
+                        help=f'Rows per synthetic month, e.g. 100k 1M 10M (default: {" ".join(DEFAULT_SCALES)})')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per case, fastest kept (default: 3)')
+    parser.add_argument('--cases', nargs='+', default=None,
+                        help='Only keep cases starting with these prefixes, e.g. clean aggregate.apply_agg')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--baseline', default=BASELINE_PATH, help='Baseline to compare with')
+    parser.add_argument('--output', default=LATEST_PATH, help='Where to write this run')
+    parser.add_argument('--save-baseline', action='store_true', help='Also write this run as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE,
+                        help=f'Allowed slowdown before a case counts as a regression (default: {TOLERANCE})')
+    parser.add_argument('--fail-on-regression', action='store_true', help='Exit with status 1 on a regression')
+    args = parser.parse_args(argv)
+
+    if args.repeat < 1:
+        parser.error('--repeat must be at least 1')
+    scales = [synthetic.parse_rows(s) for s in args.scales]
+
+    results = []
+    for n_rows in scales:
+        results += bench_scale(n_rows, args.repeat, args.seed, args.cases)
+    results += bench_forecast(args.repeat, args.seed, args.cases)
+
+    run = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'environment': environment(),
+        'repeat': args.repeat,
+        'seed': args.seed,
+        'results': results,
+    }
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(run, f, indent=2)
+    print(f'\nSaved: {args.output}')
+
+    regressions = 0
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        table = compare(results, baseline, args.tolerance)
+        print(f"\nAgainst {args.baseline} ({baseline.get('created')}):")
+        print(table.to_string(index=False, float_format=lambda x: f'{x:.4f}'))
+        regressions = int(table['regression'].sum())
+        if baseline.get('environment') != run['environment']:
+            print('Note: the baseline was recorded in another environment')
+    else:
+        print(f'No baseline at {args.baseline} (--save-baseline records one)')
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(run, f, indent=2)
+        print(f'Saved baseline: {args.baseline}')
+
+    if regressions and args.fail_on_regression:
+        raise SystemExit(f'{regressions} case(s) slower than the baseline')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,72 +1,178 @@
 import pandas as pd
 import numpy as np
+import pyarrow.parquet as pq
+import argparse
 import os
 
-script_dir = os.path.dirname(os.path.abspath(__file__))
-
-INPUT_FILE = os.path.join(script_dir, '..', 'processed', 'kpi_hourly_timeseries_2019.csv')
-OUTPUT_FILE = os.path.join(script_dir, '..', 'reports', 'anomalies_2019.csv')
-
-df = pd.read_csv(INPUT_FILE)
-
-df['revenue_per_mile'] = df['total_money'] / df['distance_sum']
-df['revenue_per_mile'] = df['revenue_per_mile'].replace([np.inf, -np.inf], np.nan).fillna(0)
-
-df['date'] = pd.to_datetime(df['date'])
-df['dow'] = df['date'].dt.dayofweek
-
-# Z score calculation
-def calculate_zscore(series):
-    std = series.std()
-    # Nếu dữ liệu không biến động (std=0) hoặc chỉ có 1 dòng (std=NaN) -> Z-score = 0
-    if std == 0 or np.isnan(std):
-        return 0
-    return (series - series.mean()) / std
-
-groups = df.groupby(['dow', 'hour'])
-
-df['z_trips'] = groups['trips'].transform(calculate_zscore)
-df['z_rev_mile'] = groups['revenue_per_mile'].transform(calculate_zscore)
-df['z_speed'] = groups['speed_mean'].transform(calculate_zscore)
-
-# DETECT ANOMALIES
-THRESHOLD = 3 
-
-# Rule 1: Volume 
-df['anomaly_volume'] = np.abs(df['z_trips']) > THRESHOLD
-
-# Rule 2: Congestion 
-df['anomaly_congestion'] = df['z_speed'] < -THRESHOLD
-
-# Rule 3: Price 
-df['anomaly_price'] = df['z_rev_mile'] > THRESHOLD
-
-# reason
-def categorize_anomaly(row):
-    reasons = []
-    if row['anomaly_volume']:
-        if row['z_trips'] > 0: reasons.append('High Demand')
-        else: reasons.append('Low Demand')
-    
-    if row['anomaly_congestion']: reasons.append('Traffic Jam')
-    if row['anomaly_price']: reasons.append('High Price')
-    
-    if not reasons: return 'Normal'
-    return ', '.join(reasons)
-
-df['anomaly_type'] = df.apply(categorize_anomaly, axis=1)
-
-
-anomalies_df = df[df['anomaly_type'] != 'Normal'].copy()
-
-cols_to_export = [
+from reader import read_parquet
+from kpi_store import load_kpi
+from aggregate import zone_timeseries_path
+from services import DEFAULT_SERVICE, kpi_name, output_name, add_service_arguments
+from paths import PROCESSED_FOLDER, REPORTS_FOLDER, ZONE_LOOKUP_PATH
+
+KPI_FOLDER = PROCESSED_FOLDER
+YEAR = 2019
+
+# Zone mode (--by-zone): aggregate.py --zone-timeseries output + TLC zone lookup
+ZONE_LOOKUP_FILE = ZONE_LOOKUP_PATH
+ZONES_PER_CHUNK = 32
+
+THRESHOLD = 3
+
+# z-score column -> metric it scores
+METRICS = {
+    'z_trips': 'trips',
+    'z_rev_mile': 'revenue_per_mile',
+    'z_speed': 'speed_mean',
+}
+GROUP_KEYS = ['dow', 'hour']
+
+# Anomaly flags as bits of one mask; LABELS[mask] is the row's anomaly_type
+HIGH_DEMAND, LOW_DEMAND, TRAFFIC_JAM, HIGH_PRICE = 1, 2, 4, 8
+FLAG_NAMES = [(HIGH_DEMAND, 'High Demand'), (LOW_DEMAND, 'Low Demand'),
+              (TRAFFIC_JAM, 'Traffic Jam'), (HIGH_PRICE, 'High Price')]
+LABELS = np.array([
+    ', '.join(name for bit, name in FLAG_NAMES if mask & bit) or 'Normal'
+    for mask in range(16)
+], dtype=object)
+
+EXPORT_COLS = [
     'date', 'dow', 'hour',
     'trips', 'speed_mean', 'revenue_per_mile',
     'z_trips', 'z_speed', 'z_rev_mile',
     'anomaly_type'
 ]
 
-final_cols = [c for c in cols_to_export if c in anomalies_df.columns]
-final_output = anomalies_df[final_cols]
+# reports/anomalies[_<kind>][_<service>]_<year>.csv (kind: None = city, 'zone', 'borough')
+def output_path(year=YEAR, service=DEFAULT_SERVICE, kind=None):
+    name = f'anomalies_{kind}' if kind else 'anomalies'
+    return os.path.join(REPORTS_FOLDER, f'{output_name(name, service, year)}.csv')
+
+# (date, hour) series of aggregate.py, dates already parsed by the KPI store
+def load_hourly_timeseries(year=YEAR, folder=KPI_FOLDER, service=DEFAULT_SERVICE):
+    return load_kpi(kpi_name('hourly_timeseries', service), year, folder)
+
+def add_features(df):
+    df['revenue_per_mile'] = df['total_money'] / df['distance_sum']
+    df['revenue_per_mile'] = df['revenue_per_mile'].replace([np.inf, -np.inf], np.nan).fillna(0)
+
+    df['date'] = pd.to_datetime(df['date'])
+    df['dow'] = df['date'].dt.dayofweek
+    return df
+
+# Z score of every metric against its (dow, hour) group, all from one grouping:
+# groups are numbered once and mean / std are bincounts over those numbers.
+# A group without variation (std = 0) or with a single row (std = NaN) gets z = 0.
+def grouped_zscores(df, group_keys=GROUP_KEYS, metrics=METRICS):
+    codes = df.groupby(group_keys, sort=False).ngroup().to_numpy()
+    n_groups = codes.max() + 1 if len(codes) else 0
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for z_col, col in metrics.items():
+            values = df[col].to_numpy(dtype='float64')
+            # NaNs are left out of their group's mean and std, as in groupby().transform
+            ok = ~np.isnan(values)
+            n = np.bincount(codes[ok], minlength=n_groups).astype('float64')
+            dev = values - (np.bincount(codes[ok], weights=values[ok], minlength=n_groups) / n)[codes]
+            std = np.sqrt(np.bincount(codes[ok], weights=dev[ok] * dev[ok], minlength=n_groups) / (n - 1))[codes]
+
+            valid = np.isfinite(std) & (std > 0)
+            z = np.zeros(len(values))
+            z[valid] = dev[valid] / std[valid]
+            df[z_col] = z
+    return df
 
-final_output.to_csv(OUTPUT_FILE, index=False)
+# DETECT ANOMALIES
+def flag_anomalies(df, threshold=THRESHOLD):
+    # Rule 1: Volume
+    df['anomaly_volume'] = np.abs(df['z_trips']) > threshold
+    # Rule 2: Congestion
+    df['anomaly_congestion'] = df['z_speed'] < -threshold
+    # Rule 3: Price
+    df['anomaly_price'] = df['z_rev_mile'] > threshold
+
+    # reason
+    df['anomaly_type'] = LABELS[anomaly_mask(df['z_trips'], df['z_speed'], df['z_rev_mile'], threshold)]
+    return df
+
+# Same rules as flag_anomalies, straight from z-scores (arrays or scalars) to the label mask
+def anomaly_mask(z_trips, z_speed, z_rev_mile, threshold=THRESHOLD):
+    volume = np.abs(z_trips) > threshold
+    return (
+        np.where(volume & (z_trips > 0), HIGH_DEMAND, 0)
+        | np.where(volume & (z_trips <= 0), LOW_DEMAND, 0)
+        | np.where(z_speed < -threshold, TRAFFIC_JAM, 0)
+        | np.where(z_rev_mile > threshold, HIGH_PRICE, 0)
+    )
+
+# ------------------------------
+# PER ZONE + BOROUGH ROLLUP
+# ------------------------------
+def load_zone_lookup(path=ZONE_LOOKUP_FILE):
+    lookup = pd.read_csv(path, usecols=['LocationID', 'Borough', 'Zone'])
+    lookup = lookup.rename(columns={'LocationID': 'PULocationID'})
+    return lookup.fillna({'Borough': 'Unknown', 'Zone': 'Unknown'})
+
+# Every zone is scored against its own (dow, hour) profile. Zones never share a group,
+# so the series is read and scored a chunk of zones at a time. Each chunk also adds its
+# trips / money / distance / speed-weighted sums to the borough series, which is scored
+# per (Borough, dow, hour) at the end. Hours without trips are not in the series.
+def score_zones(path=None, lookup=None, zones_per_chunk=ZONES_PER_CHUNK, threshold=THRESHOLD):
+    path = path or zone_timeseries_path(YEAR, DEFAULT_SERVICE, KPI_FOLDER)
+    lookup = load_zone_lookup() if lookup is None else lookup
+    borough_map = dict(zip(lookup['PULocationID'], lookup['Borough']))
+
+    zones = np.unique(pq.read_table(path, columns=['PULocationID'])['PULocationID'].to_numpy())
+    zone_anomalies, borough_parts = [], []
+
+    for start in range(0, len(zones), zones_per_chunk):
+        chunk = zones[start:start + zones_per_chunk].tolist()
+        df = read_parquet(path, filters=[('PULocationID', 'in', chunk)])
+        df = flag_anomalies(grouped_zscores(add_features(df), ['PULocationID'] + GROUP_KEYS), threshold)
+        zone_anomalies.append(df[df['anomaly_type'] != 'Normal'])
+
+        df['Borough'] = df['PULocationID'].map(borough_map).fillna('Unknown')
+        df['speed_sum'] = df['speed_mean'] * df['trips']
+        borough_parts.append(
+            df.groupby(['Borough', 'date', 'hour'])[['trips', 'total_money', 'distance_sum', 'speed_sum']].sum()
+        )
+
+    zone_df = pd.concat(zone_anomalies, ignore_index=True).merge(lookup, on='PULocationID', how='left')
+
+    boroughs = pd.concat(borough_parts)
+    boroughs = boroughs.groupby(level=list(range(boroughs.index.nlevels))).sum().reset_index()
+    boroughs['speed_mean'] = boroughs['speed_sum'] / boroughs['trips']
+    boroughs = flag_anomalies(grouped_zscores(add_features(boroughs), ['Borough'] + GROUP_KEYS), threshold)
+    borough_df = boroughs[boroughs['anomaly_type'] != 'Normal']
+
+    return (
+        zone_df[['PULocationID', 'Zone', 'Borough'] + EXPORT_COLS],
+        borough_df[['Borough'] + EXPORT_COLS].reset_index(drop=True)
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Detect anomalies in hourly taxi activity.')
+    parser.add_argument('--by-zone', action='store_true',
+                        help='Score every pickup zone and borough from the zone timeseries '
+                             '(aggregate.py --zone-timeseries) instead of the city-wide series')
+    add_service_arguments(parser, 'Years of KPI tables to score, each on its own')
+    args = parser.parse_args(argv)
+
+    for year in args.years:
+        if args.by_zone:
+            zone_df, borough_df = score_zones(zone_timeseries_path(year, args.service, KPI_FOLDER))
+            zone_df.to_csv(output_path(year, args.service, 'zone'), index=False)
+            borough_df.to_csv(output_path(year, args.service, 'borough'), index=False)
+            continue
+
+        df = load_hourly_timeseries(year, service=args.service)
+        df = flag_anomalies(grouped_zscores(add_features(df)))
+
+        anomalies_df = df[df['anomaly_type'] != 'Normal']
+        final_cols = [c for c in EXPORT_COLS if c in anomalies_df.columns]
+        anomalies_df[final_cols].to_csv(output_path(year, args.service), index=False)
+
+
+if __name__ == '__main__':
+    main()
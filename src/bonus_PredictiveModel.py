@@ -3,160 +3,301 @@ import numpy as np
 from sklearn.linear_model import LinearRegression
 from statsmodels.tsa.statespace.sarimax import SARIMAX
 from pandas.tseries.holiday import USFederalHolidayCalendar
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor
+import argparse
 import os
 import warnings
 warnings.filterwarnings('ignore')
 
+from dataset import load_borough_map
+from model_cache import load_entry, save_entry, match_entry
+from kpi_store import load_kpi
+from services import DEFAULT_SERVICE, kpi_name, output_name, add_service_arguments
+from paths import PROCESSED_FOLDER, REPORTS_FOLDER, ZONE_LOOKUP_PATH
+
 # ================ CONFIG ================#
-DATA_PATH = 'processed'
-REPORTS_PATH = 'reports'
+DATA_PATH = PROCESSED_FOLDER
+REPORTS_PATH = REPORTS_FOLDER
 YEAR = 2019
 FORECAST_DAYS = 60
 
-os.makedirs(REPORTS_PATH, exist_ok=True)
+# Zones / boroughs with fewer days of trips than this are not forecast
+MIN_SERIES_DAYS = 28
+
+LAG = 7
+ARIMA_ORDER = (2, 1, 1)
+ARIMA_SEASONAL_ORDER = (1, 0, 1, 7)
+
+# Column order of the Linear Regression feature matrix
+FEATURE_NAMES = (
+    ['is_holiday']
+    + [f'day_{d}' for d in range(7)]
+    + [f'month_{m}' for m in range(1, 13)]
+    + [f'lag_{LAG}']
+)
 
 # =============== LOAD DATA =============#
-def load_kpi_daily(year=YEAR, folder=DATA_PATH):
-    file_path = os.path.join(folder, f'kpi_daily_{year}.csv')
-    print(f"Loading: {file_path}")
-    
-    df = pd.read_csv(
-        file_path,
-        usecols=['date', 'trips'],
-        parse_dates=['date'],
-        index_col='date'
-    )
-    df = df.asfreq('D')
+def load_kpi_daily(year=YEAR, folder=DATA_PATH, service=DEFAULT_SERVICE):
+    name = kpi_name('daily', service)
+    print(f"Loading: kpi_{name}_{year}")
+
+    df = load_kpi(name, year, folder, columns=['date', 'trips']).set_index('date')
+    # Fill missing days to prevent crashes
+    df = df.asfreq('D').ffill()
     print(f"Loaded: {len(df)} days")
     return df
 
-data = load_kpi_daily()
+# Long (level, series, date, trips) table of daily pickups per zone or per borough,
+# from the kpi_daily_pickup table of aggregate.py
+def load_daily_series(level, year=YEAR, folder=DATA_PATH, lookup_path=ZONE_LOOKUP_PATH, service=DEFAULT_SERVICE):
+    name = kpi_name('daily_pickup', service)
+    print(f"Loading: kpi_{name}_{year} (by {level})")
+
+    df = load_kpi(name, year, folder, columns=['date', 'PULocationID', 'trips'])
+    if level == 'borough':
+        df['series'] = df['PULocationID'].map(load_borough_map(lookup_path)).fillna('Unknown')
+    else:
+        df['series'] = df['PULocationID'].astype(str)
+
+    df = df.groupby(['series', 'date'], as_index=False)['trips'].sum()
+    df.insert(0, 'level', level)
+    return df
+
+# One (level, series, daily frame) per series of a long table. Every series covers the
+# same days; a day without pickups in a zone is 0 trips.
+def split_series(long_df, min_days=MIN_SERIES_DAYS):
+    dates = pd.date_range(long_df['date'].min(), long_df['date'].max(), freq='D')
+    items = []
+    for (level, series), group in long_df.groupby(['level', 'series'], sort=False):
+        if len(group) < min_days:
+            print(f"Skipped {level} {series}: only {len(group)} days with trips")
+            continue
+        data = group.set_index('date')[['trips']].reindex(dates, fill_value=0)
+        data.index.name = 'date'
+        items.append((level, series, data))
+    return items
 
 # ============= BASELINE FORECAST ============#
-print("\nCalculating Baseline...")
-last_year = data['trips'].iloc[-365:]
-baseline_future = np.tile(last_year.values, (FORECAST_DAYS // 365) + 1)[:FORECAST_DAYS]
+# Repeat the last year
+def baseline_forecast(y, horizon=FORECAST_DAYS):
+    last_year = np.asarray(y)[-365:]
+    return np.tile(last_year, (horizon // len(last_year)) + 1)[:horizon]
 
 # ========== LINEAR REGRESSION FORECAST =======#
-print("\nCalculating Linear Regression...")
-def get_calendar_features(date):
-    day_num = date.dayofweek
-    month_num = date.month
-    
-    feats = {'is_holiday': 0} # Default, updated later
-    
-    # One-Hot Day of Week
-    for d in range(7):
-        feats[f'day_{d}'] = 1 if day_num == d else 0
-        
-    # One-Hot Month
-    for m in range(1, 13):
-        feats[f'month_{m}'] = 1 if month_num == m else 0
-        
-    return feats
-
-# Fill missing data to prevent crashes
-data = data.asfreq('D').fillna(method='ffill')
-start_date = data.index[0] # Still needed for the 'days_from_start' calculation below
-
-train_rows = []
-for date in data.index:
-    row = get_calendar_features(date)
-    
-    # Lag 7: If we are in the first week (Jan 1-7), we "borrow" data from Dec 25-31
-    days_from_start = (date - start_date).days
-    
-    if days_from_start < 7:
-        lag_value = data['trips'].iloc[-(7 - days_from_start)]
-        row['lag_7'] = lag_value
-    else:
-        row['lag_7'] = data.loc[date - pd.Timedelta(days=7), 'trips']
-    
-    row['target'] = data.loc[date, 'trips']
-    train_rows.append(row)
-
-train_df = pd.DataFrame(train_rows)
-
-# Holidays
-cal = USFederalHolidayCalendar()
-holidays = cal.holidays(start=data.index.min(), end=data.index.max())
-train_df['is_holiday'] = data.index.isin(holidays).astype(int)
-
-# Train
-X_train = train_df.drop(columns=['target'])
-y_train = train_df['target']
-
-model = LinearRegression()
-model.fit(X_train, y_train)
-
-# Forecast
-history = data['trips'].tolist()
-future_predictions = []
-current_date = data.index[-1] + pd.Timedelta(days=1)
-
-for i in range(FORECAST_DAYS):
-    feat_dict = get_calendar_features(current_date)
-    feat_dict['is_holiday'] = 1 if current_date in cal.holidays() else 0
-    feat_dict['lag_7'] = history[-7]
-    
-    this_day_X = pd.DataFrame([feat_dict])
-    this_day_X = this_day_X[X_train.columns] 
-    
-    pred = model.predict(this_day_X)[0]
-    
-    future_predictions.append(pred)
-    history.append(pred)
-    current_date += pd.Timedelta(days=1)
-
-# Save results
-future_dates=pd.date_range(data.index[-1] + pd.Timedelta(days=1), periods=FORECAST_DAYS)
-results = pd.DataFrame({
-    'Date': future_dates, 
-    'Forecast': future_predictions
-})
+# Holiday flag for every date, with the federal calendar built once for the whole range
+def holiday_flags(dates):
+    cal = USFederalHolidayCalendar()
+    holidays = cal.holidays(start=dates.min(), end=dates.max())
+    return dates.isin(holidays).astype(np.float64)
 
-# =============== ARIMA FORECAST =============#
-print("\nTraining ARIMA...")
+# Calendar features + lag column for a whole DatetimeIndex in one go.
+# The lag column is left at 0 when lag_values is None (the forecaster fills it in).
+def build_features(dates, lag_values=None):
+    X = np.zeros((len(dates), len(FEATURE_NAMES)))
+    X[:, 0] = holiday_flags(dates)
+    X[:, 1:8] = np.eye(7)[dates.dayofweek]
+    X[:, 8:20] = np.eye(12)[dates.month - 1]
+    if lag_values is not None:
+        X[:, -1] = lag_values
+    return X
+
+# Lag 7 of the training series: the first week "borrows" the last week of the series
+def training_lags(y, lag=LAG):
+    return np.roll(np.asarray(y, dtype=np.float64), lag)
+
+def fit_linear_regression(data):
+    y = data['trips'].to_numpy(dtype=np.float64)
+    X_train = build_features(data.index, training_lags(y))
+    model = LinearRegression()
+    model.fit(X_train, y)
+    return model
+
+# Recursive forecast: a day's lag is a value LAG days earlier (real or predicted), so each
+# block of LAG days only needs the block before it -> one matrix product per block
+def forecast_linear_regression(model, y, future_dates, lag=LAG):
+    y = np.asarray(y, dtype=np.float64)
+    horizon = len(future_dates)
+    X = build_features(future_dates)
+
+    history = np.empty(len(y) + horizon)
+    history[:len(y)] = y
+    for start in range(0, horizon, lag):
+        end = min(start + lag, horizon)
+        X[start:end, -1] = history[len(y) + start - lag:len(y) + end - lag]
+        history[len(y) + start:len(y) + end] = X[start:end] @ model.coef_ + model.intercept_
 
+    return history[len(y):]
+
+# =============== ARIMA FORECAST =============#
 def create_exog(dates):
     exog = pd.DataFrame(index=dates)
     # Holidays are the ONLY external thing we need
-    cal = USFederalHolidayCalendar()
-    holidays = cal.holidays(start=dates.min(), end=dates.max())
-    exog['is_holiday'] = exog.index.isin(holidays).astype(int)
+    exog['is_holiday'] = holiday_flags(dates).astype(int)
     return exog
-y_train_log = np.log(data['trips'])
-exog_train = create_exog(data.index)
-exog_future = create_exog(future_dates)
-
-arima_model = SARIMAX(
-    y_train_log,
-    exog=exog_train,
-    order=(2, 1, 1),              
-    seasonal_order=(1, 0, 1, 7)
-)
 
-fitted = arima_model.fit(disp=False)
+# Names the model configuration in the model cache (model_cache.py)
+def sarimax_spec(log_offset=0):
+    order = '-'.join(map(str, ARIMA_ORDER))
+    seasonal = '-'.join(map(str, ARIMA_SEASONAL_ORDER))
+    return f'sarimax_{order}_{seasonal}_log{log_offset}'
+
+# log_offset > 0 (e.g. 1) lets series with days of 0 trips be modelled on log(trips + offset).
+# With a cache_name the fitted model is cached: the same data reuses it as is, and data with
+# new days appended starts from the cached fit instead of a cold optimisation:
+#   warm_start='refit'  -> re-optimise from the cached parameters (start_params)
+#   warm_start='append' -> keep the cached parameters and only extend the state (no optimisation)
+def fit_sarimax(data, log_offset=0, cache_name=None, warm_start='refit'):
+    # statsmodels only extends a model (append) along a daily datetime64[ns] index; the
+    # KPI store hands back datetime64[us] dates
+    data = data.set_axis(pd.DatetimeIndex(data.index, freq='D').as_unit('ns'))
+    y_train_log = np.log(data['trips'] + log_offset)
+    exog = create_exog(data.index)
+    arima_model = SARIMAX(
+        y_train_log,
+        exog=exog,
+        order=ARIMA_ORDER,
+        seasonal_order=ARIMA_SEASONAL_ORDER
+    )
+    if cache_name is None:
+        return arima_model.fit(disp=False)
+
+    spec = sarimax_spec(log_offset)
+    entry = load_entry(cache_name, spec)
+    status = match_entry(entry[0], data['trips']) if entry is not None else None
+
+    if status == 'exact':
+        return entry[1]
+    if status == 'prefix' and warm_start == 'append':
+        n_obs = entry[0]['n_obs']
+        fitted = entry[1].append(y_train_log.iloc[n_obs:], exog=exog.iloc[n_obs:])
+    elif status == 'prefix':
+        fitted = arima_model.fit(start_params=entry[1].params, disp=False)
+    else:
+        fitted = arima_model.fit(disp=False)
+
+    save_entry(cache_name, spec, data['trips'], fitted)
+    return fitted
+
+def forecast_sarimax(fitted, future_dates, log_offset=0):
+    arima_log = fitted.forecast(steps=len(future_dates), exog=create_exog(future_dates))
+    return np.exp(arima_log + 0.25 * fitted.mse) - log_offset
+
+# =========== BATCH FORECAST (MANY SERIES) ===========#
+# All three models for one series (runs inside a worker process when --workers > 1)
+# cache_tag: (service, year) the series comes from, so each one keeps its own cached model
+def forecast_series(item, horizon=FORECAST_DAYS, use_cache=True, warm_start='refit',
+                    cache_tag=(DEFAULT_SERVICE, YEAR)):
+    level, series, data = item
+    future_dates = pd.date_range(data.index[-1] + pd.Timedelta(days=1), periods=horizon)
+
+    model = fit_linear_regression(data)
+    results = pd.DataFrame({
+        'level': level,
+        'series': series,
+        'Date': future_dates,
+        'Baseline': baseline_forecast(data['trips'], horizon),
+        'Linear_Reg': forecast_linear_regression(model, data['trips'], future_dates),
+    })
+
+    try:
+        cache_name = output_name(f'{level}_{series}', *cache_tag) if use_cache else None
+        fitted = fit_sarimax(data, log_offset=1, cache_name=cache_name, warm_start=warm_start)
+        results['ARIMA'] = np.asarray(forecast_sarimax(fitted, future_dates, log_offset=1))
+    except (ValueError, np.linalg.LinAlgError) as e:
+        print(f"ARIMA failed for {level} {series}: {e}")
+        results['ARIMA'] = np.nan
+    return results
+
+# Every series of every level, fitted independently across a process pool
+def forecast_many(levels, workers=1, horizon=FORECAST_DAYS, use_cache=True, warm_start='refit',
+                  year=YEAR, service=DEFAULT_SERVICE):
+    long_df = pd.concat([load_daily_series(level, year, service=service) for level in levels], ignore_index=True)
+    items = split_series(long_df)
+    print(f"Forecasting {len(items)} series with {workers} worker(s)...")
+
+    run_series = partial(forecast_series, horizon=horizon, use_cache=use_cache, warm_start=warm_start,
+                         cache_tag=(service, year))
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(items) or 1)) as pool:
+            results = list(pool.map(run_series, items, chunksize=4))
+    else:
+        results = [run_series(item) for item in items]
+
+    return pd.concat(results, ignore_index=True)
+
+
+# Outputs are named after the year forecast from and the service (services.output_name):
+# forecast_results_2020.csv / historical_data_2019.csv for 2019 yellow trips
+def forecast_city(use_cache=True, warm_start='refit', year=YEAR, service=DEFAULT_SERVICE):
+    data = load_kpi_daily(year, service=service)
+    future_dates = pd.date_range(data.index[-1] + pd.Timedelta(days=1), periods=FORECAST_DAYS)
+
+    print("\nCalculating Baseline...")
+    baseline_future = baseline_forecast(data['trips'])
+
+    print("\nCalculating Linear Regression...")
+    model = fit_linear_regression(data)
+    future_predictions = forecast_linear_regression(model, data['trips'], future_dates)
+
+    print("\nTraining ARIMA...")
+    cache_name = output_name('city', service, year) if use_cache else None
+    fitted = fit_sarimax(data, cache_name=cache_name, warm_start=warm_start)
+    arima_future = forecast_sarimax(fitted, future_dates)
+
+    # ============= SAVE RESULTS =============#
+    print("\nSaving predictions...")
+
+    results = pd.DataFrame({
+        'Date': future_dates,
+        'Baseline': baseline_future,
+        'Linear_Reg': future_predictions,
+        'ARIMA': np.asarray(arima_future)
+    })
+
+    # Save to reports folder
+    results.to_csv(f"{REPORTS_PATH}/{output_name('forecast_results', service, year + 1)}.csv", index=False)
+
+    historical = data[['trips']].copy()
+    historical.columns = ['Historical']
+    historical.index.name = 'date'
+    historical.to_csv(f"{REPORTS_PATH}/{output_name('historical_data', service, year)}.csv")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Forecast daily taxi trips.')
+    parser.add_argument('--by', nargs='+', choices=['city', 'zone', 'borough'], default=['city'],
+                        help='city: one city-wide forecast (default); zone / borough: one forecast per '
+                             'pickup zone / borough, written together to forecast_by_series_*.csv')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Number of series to fit in parallel in zone / borough mode (default: 1)')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Fit every SARIMAX from scratch and leave the model cache untouched')
+    parser.add_argument('--warm-start', choices=['refit', 'append'], default='refit',
+                        help='When days were added since the cached fit: re-optimise from the cached '
+                             'parameters (default) or keep them and only append the new days')
+    add_service_arguments(parser, 'Years of KPI tables to forecast from, each into the next year')
+    args = parser.parse_args(argv)
+
+    if args.workers < 1:
+        parser.error('--workers must be at least 1')
 
-arima_log = fitted.forecast(steps=FORECAST_DAYS, exog=exog_future)
-arima_future = np.exp(arima_log + 0.25 * fitted.mse)
+    os.makedirs(REPORTS_PATH, exist_ok=True)
 
-# ============= SAVE RESULTS =============#
-print("\nSaving predictions...")
+    levels = [level for level in ['zone', 'borough'] if level in args.by]
+    for year in args.years:
+        if 'city' in args.by:
+            forecast_city(not args.no_cache, args.warm_start, year, args.service)
 
-results = pd.DataFrame({
-    'Date': future_dates,
-    'Baseline': baseline_future,
-    'Linear_Reg': future_predictions,
-    'ARIMA': arima_future
-})
+        if levels:
+            results = forecast_many(levels, args.workers, use_cache=not args.no_cache, warm_start=args.warm_start,
+                                    year=year, service=args.service)
+            output_path = f"{REPORTS_PATH}/{output_name('forecast_by_series', args.service, year + 1)}.csv"
+            results.to_csv(output_path, index=False)
+            print(f"Saved: {output_path}")
 
-# Save to reports folder
-results.to_csv(f'{REPORTS_PATH}/forecast_results_{YEAR + 1}.csv', index=False)
+    print("\nDone!")
 
-historical = data[['trips']].copy()
-historical.columns = ['Historical']
-historical.index.name = 'date'
-historical.to_csv(f'{REPORTS_PATH}/historical_data_{YEAR}.csv')
 
-print("\nDone!")
+if __name__ == '__main__':
+    main()
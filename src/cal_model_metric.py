@@ -1,42 +1,48 @@
 import pandas as pd
 import numpy as np
 from sklearn.metrics import mean_squared_error, mean_absolute_error
+import argparse
 import os
 
+from truth import load_truth
+from dataset import dataset_path
+from query import scan
+from services import DEFAULT_SERVICE, PICKUP_COLUMN, output_name, add_service_arguments
+from paths import RAW_FOLDER, PROCESSED_FOLDER, REPORTS_FOLDER
+
 # ============= CALCULATE MODEL PERFOMANCE METRICS (RMSE, MAE & MAPE) =============#
 
 # Run after bonus.py
 # Only run this if you have data from 2020 in raw/
 # The pre-calculated metrics is in reports/
 
-REAL_FOLDER = 'raw'
-FORECAST_FOLDER = 'reports'
-OUTPUT_FOLDER = 'reports'
+REAL_FOLDER = RAW_FOLDER
+FORECAST_FOLDER = REPORTS_FOLDER
+OUTPUT_FOLDER = REPORTS_FOLDER
 MODELS = ['Baseline', 'Linear_Reg', 'ARIMA']
 
-# Only predict the first 2 months
+# 'raw': count every trip in raw/ (default)
+# 'dataset': count cleaned trips from the partitioned dataset (clean_data.py --years 2020 --output dataset)
+REAL_SOURCE = 'raw'
+
+# Forecasts of the year after the training data (Jan & Feb 2020). The evaluation window
+# defaults to the days in the forecast file; --start / --end pick any other window.
+# --years scores several forecast years, each into model_performance_metrics[_<service>]_<year>.csv
 YEAR = 2020
-MONTHS = [1, 2] # Jan, Feb
-
-# Function for loading real data
-def load_real_data(data_dir, year, months):
-    daily_counts = []
-    
-    for month in months:
-        file_name = f'yellow_tripdata_{year}-{month:02d}.parquet'
-        file_path = os.path.join(data_dir, file_name)
-        df = pd.read_parquet(file_path, engine='pyarrow')
-
-        df["tpep_pickup_datetime"] = pd.to_datetime(df["tpep_pickup_datetime"])
-        mask = (df["tpep_pickup_datetime"].dt.year == year) & \
-                (df["tpep_pickup_datetime"].dt.month == month)
-        df = df.loc[mask].copy()
-        df['Date'] = df['tpep_pickup_datetime'].dt.normalize()
-
-        daily_agg = df.groupby('Date').size().reset_index(name='Real_Data')
-        daily_counts.append(daily_agg)
-
-    full_df = pd.concat(daily_counts, ignore_index=True)
+
+# Function for loading real data: daily counts of the raw files streamed and cached by truth.py
+def load_real_data(data_dir, start, end, use_cache=True, service=DEFAULT_SERVICE):
+    return load_truth(start, end, data_dir, use_cache, service=service)
+
+# Same daily counts from the partitioned dataset: only the year=/month= partitions
+# the window touches are opened, and only their pickup column is read
+def load_real_data_from_dataset(root, start, end):
+    periods = pd.period_range(start, pd.Timestamp(end) - pd.Timedelta(days=1), freq='M')
+    df = scan(root, columns=[PICKUP_COLUMN], years=sorted({p.year for p in periods}),
+              months=sorted({p.month for p in periods}), start=start, end=end)
+    df['Date'] = df[PICKUP_COLUMN].dt.normalize()
+
+    full_df = df.groupby('Date').size().reset_index(name='Real_Data')
     full_df.sort_values('Date', inplace=True)
     return full_df
 
@@ -48,29 +54,64 @@ def calculate_mape(y_true, y_pred):
         return np.nan
     return np.mean(np.abs((y_true[mask] - y_pred[mask]) / y_true[mask])) * 100
 
-# Load real and prediction data
-df_truth = load_real_data(REAL_FOLDER, YEAR, MONTHS)
-df_forecast = pd.read_csv(os.path.join(FORECAST_FOLDER, f'forecast_results_{YEAR}.csv'))
-
-# Merge
-date_col = 'Date' if 'Date' in df_forecast.columns else 'date'
-df_forecast[date_col] = pd.to_datetime(df_forecast[date_col])
-eval_df = pd.merge(df_forecast, df_truth, left_on=date_col, right_on='Date', how='inner')
-# Save to forecast results csv
-eval_df.to_csv(f'{OUTPUT_FOLDER}/forecast_results_{YEAR}.csv', index=False)
-
-# Calculate
-metrics = {}
-for model in MODELS:
-    y_true = eval_df['Real_Data']
-    y_pred = eval_df[model]
-    
-    metrics[model] = {
-        'RMSE': np.sqrt(mean_squared_error(y_true, y_pred)),
-        'MAE': mean_absolute_error(y_true, y_pred),
-        'MAPE (%)': calculate_mape(y_true, y_pred)
-    }
-
-# Save
-metrics_df = pd.DataFrame(metrics).T
-metrics_df.to_csv('reports/model_performance_metrics.csv')
\ No newline at end of file
+
+# Score the forecasts of one year; returns the metrics table
+def score_year(year, service, source=REAL_SOURCE, start=None, end=None, use_cache=True):
+    forecast_path = os.path.join(FORECAST_FOLDER, f"{output_name('forecast_results', service, year)}.csv")
+
+    # Load prediction and real data
+    df_forecast = pd.read_csv(forecast_path)
+    # A previous run already added the real counts to this file
+    df_forecast = df_forecast.drop(columns=['Real_Data'], errors='ignore')
+    date_col = 'Date' if 'Date' in df_forecast.columns else 'date'
+    df_forecast[date_col] = pd.to_datetime(df_forecast[date_col])
+
+    start = pd.Timestamp(start) if start else df_forecast[date_col].min()
+    end = pd.Timestamp(end) if end else df_forecast[date_col].max() + pd.Timedelta(days=1)
+    if source == 'dataset':
+        df_truth = load_real_data_from_dataset(dataset_path(PROCESSED_FOLDER, service), start, end)
+    else:
+        df_truth = load_real_data(REAL_FOLDER, start, end, use_cache, service)
+
+    # Merge
+    eval_df = pd.merge(df_forecast, df_truth, left_on=date_col, right_on='Date', how='inner')
+    # Save to forecast results csv
+    eval_df.to_csv(os.path.join(OUTPUT_FOLDER, os.path.basename(forecast_path)), index=False)
+
+    # Calculate
+    metrics = {}
+    for model in MODELS:
+        y_true = eval_df['Real_Data']
+        y_pred = eval_df[model]
+
+        metrics[model] = {
+            'RMSE': np.sqrt(mean_squared_error(y_true, y_pred)),
+            'MAE': mean_absolute_error(y_true, y_pred),
+            'MAPE (%)': calculate_mape(y_true, y_pred)
+        }
+
+    # Save
+    metrics_df = pd.DataFrame(metrics).T
+    metrics_df.to_csv(os.path.join(OUTPUT_FOLDER, f"{output_name('model_performance_metrics', service, year)}.csv"))
+    return metrics_df
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Score the forecasts against real trip counts.')
+    parser.add_argument('--source', choices=['raw', 'dataset'], default=REAL_SOURCE,
+                        help=f'Where the real trips come from (default: {REAL_SOURCE})')
+    parser.add_argument('--start', default=None,
+                        help='First day to evaluate, e.g. 2020-01-01 (default: first day of the forecast)')
+    parser.add_argument('--end', default=None,
+                        help='Day after the last one to evaluate (default: day after the last forecast day)')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Recount the raw files instead of using processed/truth_cache/')
+    add_service_arguments(parser, 'Forecast years to score', default_years=[YEAR])
+    args = parser.parse_args(argv)
+
+    for year in args.years:
+        score_year(year, args.service, args.source, args.start, args.end, not args.no_cache)
+
+
+if __name__ == '__main__':
+    main()
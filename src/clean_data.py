@@ -1,24 +1,50 @@
 import pandas as pd
 import numpy as np
-import glob
+import pyarrow.parquet as pq
 import os
 import gc
+import argparse
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor
 
-script_dir = os.path.dirname(os.path.abspath(__file__))
+from qa_rules import evaluate_qa_mask, count_rule_failures, select_rules
+from dedup import (
+    row_hashes, find_duplicates, add_hashes,
+    load_boundary_hashes, save_boundary_hashes, near_month_end
+)
+from dataset import write_month, load_borough_map, partition_dir, dataset_path
+from schema import to_arrow, enforce_schema
+from services import (
+    DEFAULT_SERVICE, PICKUP_COLUMN, DROPOFF_COLUMN, service_config, rename_frame, raw_files, output_name,
+    add_service_arguments
+)
+from aggregate import FUSED_BASES, READ_COLUMNS, aggregate_month, merge_states, source_state_folder
+from state_store import fingerprint, save_month_states
+from truth import day_counts, save_month_days
+from instrument import Probe, path_size, append_records, RUN_LOG_PATH
+from paths import RAW_FOLDER, PROCESSED_FOLDER, REPORTS_FOLDER, ZONE_LOOKUP_PATH
 
-input_folder = os.path.join(script_dir, '..', 'raw')
-output_folder = os.path.join(script_dir, '..', 'processed')
-report_folder = os.path.join(script_dir, '..', 'reports')
+input_folder = RAW_FOLDER
+output_folder = PROCESSED_FOLDER
+report_folder = REPORTS_FOLDER
+dedup_folder = os.path.join(output_folder, 'dedup_hashes')
+zone_lookup_path = ZONE_LOOKUP_PATH
 
-# List to collect QA results for every month
-all_qa_stats = []
+# Boundary hashes of one service (the default service keeps the old folder)
+def service_dedup_folder(service):
+    return dedup_folder if service == DEFAULT_SERVICE else os.path.join(dedup_folder, service)
 
-def process_month(file_path):
+def get_month_str(file_path):
     filename = os.path.basename(file_path)
-    month_str = filename.split('_')[-1].replace('.parquet', '') 
-    
-    # Load Data
-    df = pd.read_parquet(file_path, engine='pyarrow')
+    return filename.split('_')[-1].replace('.parquet', '')
+
+# Raw frame of any service -> the clean schema's columns, types and derived metrics
+def prepare_frame(df, service=DEFAULT_SERVICE):
+    df = rename_frame(df, service)
+    service_fill = service_config(service)['fill']
+    for col, value in service_fill.items():
+        if col not in df.columns:
+            df[col] = value
 
     # Fix Types
     float_cols = [
@@ -31,11 +57,11 @@ def process_month(file_path):
     df[exist_float_cols] = df[exist_float_cols].astype('float32')
     
     # Fix Dates
-    df['tpep_pickup_datetime'] = pd.to_datetime(df['tpep_pickup_datetime'])
-    df['tpep_dropoff_datetime'] = pd.to_datetime(df['tpep_dropoff_datetime'])
+    df[PICKUP_COLUMN] = pd.to_datetime(df[PICKUP_COLUMN])
+    df[DROPOFF_COLUMN] = pd.to_datetime(df[DROPOFF_COLUMN])
 
     # Calc Derived Metrics
-    df['trip_duration'] = (df['tpep_dropoff_datetime'] - df['tpep_pickup_datetime']).dt.total_seconds() / 60
+    df['trip_duration'] = (df[DROPOFF_COLUMN] - df[PICKUP_COLUMN]).dt.total_seconds() / 60
     
     # Avoid division by zero for speed
     df['avg_speed'] = np.where(
@@ -49,110 +75,362 @@ def process_month(file_path):
         'passenger_count': 1, 'RatecodeID': 1, 'store_and_fwd_flag': 'N',
         'congestion_surcharge': 0, 'airport_fee': 0, 'avg_speed': 0
     }
-    df.fillna(values_to_fill, inplace=True)
+    df.fillna({col: value for col, value in values_to_fill.items() if col not in service_fill}, inplace=True)
+    return df
 
-    # Apply Rules & Collect Stats
-    df, qa_stats = apply_qa_rules(df, month_str)
-    
-    # Add stats to our global list
-    all_qa_stats.append(qa_stats)
+# Rejected rows only: position in the raw file + which rules they failed
+def build_qa_audit(qa_mask, row_offset=0):
+    rejected = np.flatnonzero(qa_mask)
+    return pd.DataFrame({'row': rejected + row_offset, 'qa_mask': qa_mask[rejected]})
 
-    # Return ONLY valid rows and drop duplicates
-    valid_df = df[df['is_valid_trip'] & ~df.duplicated()].copy()
-    
-    # Drop the temporary columns we created
-    cols_to_drop = [c for c in valid_df.columns if c.startswith('qa_')] + ['is_valid_trip']
-    valid_df.drop(columns=cols_to_drop, inplace=True)
+# dedup_keys: columns that identify a trip (None = all columns)
+# across_months: also drop trips already kept by the previous month's file
+# probe (instrument.py) collects the time spent in each phase
+# fused: accumulator from new_fused() to aggregate the month from this scan (--aggregate)
+# qa_audit: also return the audit of the rejected rows (else None)
+def process_month(file_path, dedup_keys=None, across_months=False, probe=None, service=DEFAULT_SERVICE, fused=None,
+                  qa_audit=False):
+    month_str = get_month_str(file_path)
+    probe = probe or Probe('clean', month_str)
+    hash_folder = service_dedup_folder(service)
     
-    return valid_df
+    # Load Data
+    with probe.phase('read'):
+        df = pd.read_parquet(file_path, engine='pyarrow')
+    with probe.phase('prepare'):
+        df = prepare_frame(df, service)
+
+    # Apply Rules & Collect Stats
+    with probe.phase('dedup'):
+        hashes = row_hashes(df, dedup_keys)
+        seen = load_boundary_hashes(hash_folder, month_str) if across_months else None
+        is_duplicate = find_duplicates(hashes, seen)
+    with probe.phase('qa'):
+        qa_mask, qa_counts = apply_qa_rules(df, month_str, service_rules(service))
+
+    # Keep ONLY valid rows and drop duplicates
+    keep = (qa_mask == 0) & ~is_duplicate
+    qa_stats = build_qa_stats(month_str, qa_counts, (~keep).sum())
+
+    with probe.phase('filter'):
+        valid_df = df[keep]
+    if fused is not None:
+        feed_fused(fused, df, valid_df, probe)
+
+    if across_months:
+        with probe.phase('dedup'):
+            near_end = near_month_end(month_str, valid_df[PICKUP_COLUMN])
+            save_boundary_hashes(hash_folder, month_str, hashes[keep][near_end])
+
+    probe.count(rows_in=len(df), rows_out=len(valid_df))
+    return valid_df, qa_stats, build_qa_audit(qa_mask) if qa_audit else None
+
+# Same as process_month + save, but reads the raw file batch_size rows at a time
+# and appends each cleaned batch to the output, so memory does not grow with the month
+# save_path=None skips the flat file; dataset_root writes each batch into the month's partition
+def process_month_streaming(file_path, save_path, batch_size, dedup_keys=None, across_months=False,
+                            dataset_root=None, borough_map=None, compact_time=False, probe=None,
+                            service=DEFAULT_SERVICE, fused=None, qa_audit=False):
+    month_str = get_month_str(file_path)
+    probe = probe or Probe('clean', month_str)
+    raw_file = pq.ParquetFile(file_path)
+    hash_folder = service_dedup_folder(service)
+    rules = service_rules(service)
+
+    writer = None
+    qa_counts = {}
+    audit_parts = []
+    n_dropped = 0
+    n_read = 0
+    n_parts = 0
+    # Sorted hashes of every row kept so far, to catch duplicates across batches
+    seen_hashes = load_boundary_hashes(hash_folder, month_str) if across_months else None
+    boundary_hashes = []
+
+    batches = raw_file.iter_batches(batch_size=batch_size)
+    while True:
+        with probe.phase('read'):
+            batch = next(batches, None)
+            if batch is None:
+                break
+            df = batch.to_pandas()
+        with probe.phase('prepare'):
+            df = prepare_frame(df, service)
+
+        # Duplicates inside this batch or of a row from an earlier batch
+        with probe.phase('dedup'):
+            hashes = row_hashes(df, dedup_keys)
+            is_duplicate = find_duplicates(hashes, seen_hashes)
+
+        with probe.phase('qa'):
+            qa_mask, batch_counts = apply_qa_rules(df, month_str, rules)
+        for key, value in batch_counts.items():
+            qa_counts[key] = qa_counts.get(key, 0) + value
+        if qa_audit:
+            audit_parts.append(build_qa_audit(qa_mask, n_read))
+        n_read += len(df)
+
+        keep = (qa_mask == 0) & ~is_duplicate
+        n_dropped += (~keep).sum()
+
+        with probe.phase('dedup'):
+            seen_hashes = add_hashes(seen_hashes, hashes[keep])
+
+        with probe.phase('filter'):
+            valid_df = df[keep]
+        probe.count(rows_in=len(df), rows_out=len(valid_df))
+        if fused is not None:
+            feed_fused(fused, df, valid_df, probe)
+        if across_months:
+            near_end = near_month_end(month_str, valid_df[PICKUP_COLUMN])
+            boundary_hashes.append(hashes[keep][near_end])
+
+        if valid_df.empty:
+            continue
+
+        with probe.phase('write'):
+            if dataset_root:
+                write_month(valid_df, dataset_root, month_str, borough_map, part_index=n_parts)
+            n_parts += 1
+
+            if save_path:
+                table = to_arrow(valid_df, month_str, compact_time)
+                if writer is None:
+                    writer = pq.ParquetWriter(save_path, table.schema)
+                else:
+                    table = table.cast(writer.schema)
+                writer.write_table(table)
+                del table
+
+        del df, valid_df
+        gc.collect()
+
+    if writer is not None:
+        with probe.phase('write'):
+            writer.close()
+    if n_parts == 0:
+        print(f'\n{file_path}: No data')
+
+    if across_months:
+        with probe.phase('dedup'):
+            save_boundary_hashes(hash_folder, month_str, np.concatenate(boundary_hashes or [np.empty(0, dtype=np.uint64)]))
 
-def apply_qa_rules(df, month_str):
-    n_total = len(df)
+    audit_df = None
+    if qa_audit:
+        audit_df = pd.concat(audit_parts, ignore_index=True) if audit_parts else build_qa_audit(np.empty(0, dtype=np.uint16))
+    return build_qa_stats(month_str, qa_counts, n_dropped), audit_df
+
+# Rules live in qa_rules.py; register_qa_rule() there adds one without touching this function
+# rules: subset of QA_RULES (None = all); the bits of qa_mask follow its order
+def apply_qa_rules(df, month_str, rules=None):
     current_month_dt = pd.to_datetime(month_str)
     next_month_dt = current_month_dt + pd.DateOffset(months=1)
 
-    # --- RULES ---
-    df['qa_dropoff_after_pickup'] = df['trip_duration'] > 0
-    df['qa_timedate'] = (df['tpep_pickup_datetime'] >= current_month_dt) & (df['tpep_pickup_datetime'] < next_month_dt)
-    
-    # Duration: < 10 hours (600 mins)
-    df['qa_duration'] = (df['trip_duration'] > 0) & (df['trip_duration'] < 600) 
-    
-    # Distance: > 0 miles OR 0 miles with > $0 fare
-    df['qa_distance'] = ((df['trip_distance'] > 0) | ((df['trip_distance'] == 0) & (df['total_amount'] > 0)))
+    qa_mask = evaluate_qa_mask(df, current_month_dt, next_month_dt, rules)
+
+    qa_counts = {'total_rows': len(df)}
+    qa_counts.update(count_rule_failures(qa_mask, rules))
     
-    # Speed: < 70 mph
-    df['qa_speed'] = (df['avg_speed'] >= 0) & (df['avg_speed'] <= 70) 
+    return qa_mask, qa_counts
 
-    # Payment Type: 0 to 4
-    df['qa_payment_type'] = (df['payment_type'] >= 0) & (df['payment_type'] <= 4)
+# QA rules that apply to the service (services.py)
+def service_rules(service):
+    return select_rules(service_config(service)['rules'])
 
-    # Total Amount: > $0 and < $1000 AND matches sum of components
-    df['qa_total_amount'] = (df['total_amount'] > 0) & (df['total_amount'] < 1000)
-    
-    # Tip: >= $0 and <= total_amount
-    df['qa_tip_amount'] = (df['tip_amount'] >= 0) & (df['tip_amount'] <= df['total_amount'])
-    
-    # Non-Negative Charges
-    df['qa_non_neg_amount'] = (
-        (df['fare_amount'] >= 0) & (df['extra'] >= 0) & (df['mta_tax'] >= 0) & 
-        (df['improvement_surcharge'] >= 0) & (df['tolls_amount'] >= 0) & 
-        (df['congestion_surcharge'] >= 0) & (df['airport_fee'] >= 0)
-    )
 
-    # Location IDs: 1 to 265 but PULocationID must be in NYC
-    df['qa_locationID'] = (
-        (df['PULocationID'] > 0) & (df['PULocationID'] <= 263) & 
-        (df['DOLocationID'] > 0) & (df['DOLocationID'] <= 265)
-    )
-    
-    # RatecodeID: 1 to 6
-    df['qa_ratecodeID'] = (df['RatecodeID'] > 0) & (df['RatecodeID'] <= 6)
-    
-    # VendorID: 1, 2, 6, 7
-    df['qa_vendorID'] = df['VendorID'].isin([1, 2, 6, 7]) 
+# ------------------------------
+# OPTIONAL: AGGREGATE WHILE CLEANING (--aggregate)
+# ------------------------------
+# The raw month is already in memory while it is cleaned, so the same scan also counts
+# its trips per pickup day (truth.py) and builds its aggregate.py month states from the
+# rows kept. Both are stored where those scripts look for them, under the fingerprint of
+# the file they describe, so cal_model_metric.py and aggregate.py skip the month until it
+# changes. States are built from the rows as aggregate.py would read them back
+# (READ_COLUMNS in the clean schema, pickups inside the month).
+def new_fused(month_str):
+    return {'month': month_str, 'counts': np.zeros(pd.Timestamp(month_str).days_in_month, dtype='int64'),
+            'states': []}
+
+def feed_fused(fused, raw_df, valid_df, probe):
+    month_str = fused['month']
+    with probe.phase('aggregate'):
+        pickups = raw_df[PICKUP_COLUMN].dropna().to_numpy(dtype='datetime64[us]').astype('int64')
+        fused['counts'] += day_counts(pickups, month_str)
 
-    # Passenger Count: 0 to 9
-    df['qa_passenger_count'] = (df['passenger_count'] >= 0) & (df['passenger_count'] <= 9)
+        df = enforce_schema(valid_df[READ_COLUMNS])
+        start = pd.Timestamp(month_str)
+        in_month = (df[PICKUP_COLUMN] >= start) & (df[PICKUP_COLUMN] < start + pd.DateOffset(months=1))
+        if in_month.any():
+            fused['states'].append(aggregate_month(df[in_month].copy(), FUSED_BASES, probe=probe))
 
-    # --- VALIDATION ---
-    qa_cols = [col for col in df.columns if col.startswith('qa_')]
-    df['is_valid_trip'] = df[qa_cols].all(axis=1)
+# Save the day counts against the raw file and the states against every cleaned output
+# written: the flat file and / or the month's dataset partition
+def save_fused(fused, file_path, save_path, month_root, probe):
+    with probe.phase('write'):
+        save_month_days(file_path, fused['month'], fused['counts'])
+        if not fused['states']:
+            return
+        states = fused['states'][0] if len(fused['states']) == 1 else {
+            base: merge_states([s[base] for s in fused['states']]) for base in FUSED_BASES
+        }
+        if save_path:
+            save_month_states(save_path, fingerprint(save_path), states, source_state_folder('flat'))
+        if month_root:
+            period = pd.Period(fused['month'], freq='M')
+            month_dir = partition_dir(month_root, period.year, period.month)
+            name = f"clean_{os.path.basename(file_path).replace('.parquet', '')}"
+            save_month_states(month_dir, fingerprint(month_dir), states, source_state_folder('dataset'), name)
 
-    # --- STATS COLLECTION ---
+
+# Turn raw fail counts (possibly summed over several batches) into the report row
+def build_qa_stats(month_str, qa_counts, n_invalid):
+    n_total = qa_counts.get('total_rows', 0)
     stats = {'month': month_str, 'total_rows': n_total}
     
     # Calculate fail percentage for each rule
-    for col in qa_cols:
-        n_fail = (~df[col]).sum()
-        stats[f'{col}_fail_pct'] = round((n_fail / n_total) * 100, 2)
+    for col, n_fail in qa_counts.items():
+        if col == 'total_rows':
+            continue
+        stats[f'{col}_fail_pct'] = round((n_fail / n_total) * 100, 2) if n_total else 0.0
     
-    n_invalid = (~(df['is_valid_trip'] & ~df.duplicated())).sum()
     stats['total_dropped_count'] = n_invalid
-    stats['total_dropped_pct'] = round((n_invalid / n_total) * 100, 2)
+    stats['total_dropped_pct'] = round((n_invalid / n_total) * 100, 2) if n_total else 0.0
     
-    return df, stats
+    return stats
+
+# Clean one raw file, save it and return its QA stats and its run-log record
+# (runs inside a worker process when --workers > 1)
+# output: 'flat' (clean_*.parquet), 'dataset' (partitioned, see dataset.py) or 'both'
+# compact_time: store the flat file's timestamps as int32 seconds into the month (schema.py)
+# service: TLC service of the raw file (services.py); aggregate: see new_fused()
+def clean_month(file_path, batch_size=None, qa_audit=False, dedup_keys=None, across_months=False,
+                output='flat', borough_map=None, compact_time=False, service=DEFAULT_SERVICE, aggregate=False):
+    print(f'Processing: {os.path.basename(file_path)}')
+    month_str = get_month_str(file_path)
+    probe = Probe('clean', month_str)
+    fused = new_fused(month_str) if aggregate else None
+
+    raw_name = os.path.basename(file_path)
+    save_path = os.path.join(output_folder, f'clean_{raw_name}') if output in ('flat', 'both') else None
+    month_root = dataset_path(output_folder, service) if output in ('dataset', 'both') else None
+
+    if batch_size:
+        qa_stats, audit_df = process_month_streaming(
+            file_path, save_path, batch_size, dedup_keys, across_months, month_root, borough_map, compact_time, probe,
+            service, fused, qa_audit
+        )
+    else:
+        clean_df, qa_stats, audit_df = process_month(file_path, dedup_keys, across_months, probe, service, fused, qa_audit)
+
+        if clean_df is not None and not clean_df.empty:
+            with probe.phase('write'):
+                if save_path:
+                    pq.write_table(to_arrow(clean_df, month_str, compact_time), save_path)
+                if month_root:
+                    write_month(clean_df, month_root, month_str, borough_map)
+        else:
+            print(f'\n{file_path}: No data')
+
+        del clean_df
+        gc.collect()
+
+    # Keep the failed-rule bitmask of every rejected row (decode with qa_rules.decode_qa_mask)
+    audit_path = os.path.join(output_folder, f'qa_audit_{raw_name}')
+    if qa_audit:
+        with probe.phase('write'):
+            audit_df.to_parquet(audit_path, index=False)
+
+    if fused is not None:
+        save_fused(fused, file_path, save_path, month_root, probe)
+
+    written = [save_path, audit_path if qa_audit else None]
+    if month_root:
+        period = pd.Period(month_str, freq='M')
+        written.append(partition_dir(month_root, period.year, period.month))
+    probe.count(bytes_read=path_size(file_path), bytes_written=sum(path_size(p) for p in written if p))
+    return qa_stats, probe.finish()
 
 # --- MAIN ---
-raw_files = sorted(glob.glob(os.path.join(input_folder, 'yellow_tripdata_2019-*.parquet')))
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Clean raw TLC trip parquet files month by month.')
+    add_service_arguments(parser, 'Years of the raw files to clean')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Number of months to clean in parallel (default: 1, sequential)')
+    parser.add_argument('--batch-size', type=int, default=None,
+                        help='Stream each month in batches of this many rows instead of loading it whole')
+    parser.add_argument('--qa-audit', action='store_true',
+                        help='Also save the QA bitmask of every rejected row to processed/qa_audit_*.parquet')
+    parser.add_argument('--dedup-keys', default=None,
+                        help='Comma-separated columns that identify a trip for deduplication (default: all columns)')
+    parser.add_argument('--dedup-across-months', action='store_true',
+                        help='Also drop trips already kept near the end of the previous month (needs --workers 1). '
+                             'Only useful with --dedup-keys that leave out the pickup time: a copy with the '
+                             'same pickup is outside the month and already dropped by qa_timedate')
+    parser.add_argument('--output', choices=['flat', 'dataset', 'both'], default='flat',
+                        help='flat clean_*.parquet files (default), a year=/month= partitioned dataset '
+                             'in processed/clean_<service prefix>/, or both')
+    parser.add_argument('--partition-borough', action='store_true',
+                        help='Also partition the dataset by pickup borough (needs raw/taxi_zone_lookup.csv)')
+    parser.add_argument('--compact-time', action='store_true',
+                        help='Store pickup/dropoff in clean_*.parquet as int32 seconds since the start of the month')
+    parser.add_argument('--aggregate', action='store_true',
+                        help='Also build the aggregate.py month states and the truth.py day counts from '
+                             'the same scan, so neither script reads the month again')
+    args = parser.parse_args(argv)
 
-for file in raw_files:
-    print(f'Processing: {os.path.basename(file)}')
+    if args.workers < 1:
+        parser.error('--workers must be at least 1')
+    if args.batch_size is not None and args.batch_size < 1:
+        parser.error('--batch-size must be at least 1')
+    if args.dedup_across_months and args.workers > 1:
+        parser.error('--dedup-across-months reads the previous month\'s hashes, so months must run in order (--workers 1)')
+    if args.dedup_across_months and (not args.dedup_keys or PICKUP_COLUMN in args.dedup_keys.split(',')):
+        print(f'Note: --dedup-keys include {PICKUP_COLUMN}, so --dedup-across-months drops nothing '
+              f'(copies of last month\'s trips already fail qa_timedate)')
+    if args.partition_borough and args.output == 'flat':
+        parser.error('--partition-borough only applies to --output dataset or both')
 
-    clean_df = process_month(file)
-    
-    if clean_df is not None and not clean_df.empty:
-        output_name = os.path.basename(file)
-        save_path = os.path.join(output_folder, f'clean_{output_name}')
-        clean_df.to_parquet(save_path, index=False)
+    run_month = partial(
+        clean_month,
+        batch_size=args.batch_size,
+        qa_audit=args.qa_audit,
+        dedup_keys=args.dedup_keys.split(',') if args.dedup_keys else None,
+        across_months=args.dedup_across_months,
+        output=args.output,
+        borough_map=load_borough_map(zone_lookup_path) if args.partition_borough else None,
+        compact_time=args.compact_time,
+        service=args.service,
+        aggregate=args.aggregate
+    )
+
+    files = raw_files(args.service, args.years, input_folder)
+
+    if args.workers > 1:
+        # Each month is independent: stats come back from the workers, nothing is shared
+        with ProcessPoolExecutor(max_workers=min(args.workers, len(files) or 1)) as pool:
+            results = list(pool.map(run_month, files))
     else:
-        print(f'\n{file}: No data')
+        results = [run_month(file) for file in files]
+    all_qa_stats = [qa_stats for qa_stats, _ in results]
+
+    # One line per month in reports/run_log.jsonl (see instrument.py)
+    append_records([record for _, record in results], RUN_LOG_PATH)
+
+    # --- SAVE REPORT ---
+    # One report per service (qa_summary[_<service>].csv); months cleaned again replace
+    # their old rows, the other years already in it are kept
+    if all_qa_stats:
+        report_path = os.path.join(report_folder, f"{output_name('qa_summary', args.service)}.csv")
+        report_df = pd.DataFrame(all_qa_stats)
+        if os.path.exists(report_path):
+            previous = pd.read_csv(report_path)
+            previous = previous[~previous['month'].isin(report_df['month'])]
+            report_df = pd.concat([previous, report_df], ignore_index=True)
+        # Keep the report in month order whatever order the workers finished in
+        report_df = report_df.sort_values('month', ignore_index=True)
+        report_df.to_csv(report_path, index=False)
+        print(report_df[['month', 'total_dropped_pct']])
 
-    del clean_df
-    gc.collect()
 
-# --- SAVE REPORT ---
-if all_qa_stats:
-    report_df = pd.DataFrame(all_qa_stats)
-    report_df.to_csv(os.path.join(report_folder, 'qa_summary.csv'), index=False)
-    print(report_df[['month', 'total_dropped_pct']])
\ No newline at end of file
+if __name__ == '__main__':
+    main()
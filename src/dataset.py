@@ -0,0 +1,60 @@
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import os
+import shutil
+
+from schema import enforce_schema
+from services import DEFAULT_SERVICE, service_config
+
+# ------------------------------
+# HIVE-PARTITIONED CLEAN DATASET
+# ------------------------------
+# Layout: <root>/year=2019/month=1/[pickup_borough=Manhattan/]part-*.parquet
+# Rows are sorted by pickup time inside each file and every row group carries min/max
+# statistics, so readers (query.py) can skip whole partitions and row groups.
+DATASET_NAME = 'clean_yellow_tripdata'
+ROW_GROUP_SIZE = 1_000_000
+SORT_COLUMN = 'tpep_pickup_datetime'
+
+# Dataset of one service: processed/clean_<prefix>/ (DATASET_NAME for yellow)
+def dataset_path(folder, service=DEFAULT_SERVICE):
+    return os.path.join(folder, f"clean_{service_config(service)['prefix']}")
+
+def partition_columns(by_borough=False):
+    return ['year', 'month'] + (['pickup_borough'] if by_borough else [])
+
+# LocationID -> Borough from the TLC taxi zone lookup
+def load_borough_map(lookup_path):
+    lookup = pd.read_csv(lookup_path, usecols=['LocationID', 'Borough'])
+    return dict(zip(lookup['LocationID'], lookup['Borough'].fillna('Unknown')))
+
+# Write one cleaned month into its partition. part_index lets the streaming cleaner add
+# one file per batch; the first write (part_index 0) removes the whole month first, so files
+# of an earlier layout (flat vs by borough, boroughs no longer present) cannot survive it.
+def write_month(df, root, month_str, borough_map=None, part_index=0):
+    period = pd.Period(month_str, freq='M')
+    if part_index == 0:
+        shutil.rmtree(partition_dir(root, period.year, period.month), ignore_errors=True)
+    df = enforce_schema(df).assign(year=period.year, month=period.month)
+    if borough_map is not None:
+        df['pickup_borough'] = df['PULocationID'].map(borough_map).fillna('Unknown')
+
+    table = pa.Table.from_pandas(df.sort_values(SORT_COLUMN), preserve_index=False)
+    by_borough = borough_map is not None
+
+    ds.write_dataset(
+        table,
+        root,
+        format='parquet',
+        partitioning=partition_columns(by_borough),
+        partitioning_flavor='hive',
+        basename_template=f'part-{part_index}-{{i}}.parquet',
+        existing_data_behavior='overwrite_or_ignore',
+        max_rows_per_group=ROW_GROUP_SIZE,
+        min_rows_per_group=min(ROW_GROUP_SIZE, max(len(df), 1)),
+        file_options=ds.ParquetFileFormat().make_write_options(write_statistics=True),
+    )
+
+def partition_dir(root, year, month):
+    return os.path.join(root, f'year={year}', f'month={month}')
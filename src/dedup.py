@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+import os
+
+# ------------------------------
+# HASH-BASED DEDUPLICATION
+# ------------------------------
+# Rows are reduced to one 64-bit hash over the key columns, and duplicates are found on
+# the hashes only. None = every column, which matches the old full-row df.duplicated().
+DEDUP_KEYS = None
+
+# Trips picked up this close to the end of a month are remembered for the next month
+BOUNDARY_HOURS = 24
+
+def row_hashes(df, keys=None):
+    keys = DEDUP_KEYS if keys is None else keys
+    if keys:
+        missing = [c for c in keys if c not in df.columns]
+        if missing:
+            raise KeyError(f'Dedup key columns not found: {missing}')
+        df = df[keys]
+    return pd.util.hash_pandas_object(df, index=False).to_numpy()
+
+# True for every repeat of an earlier row (first occurrence is kept, like df.duplicated())
+# and for every row already present in seen, a sorted array of hashes
+def find_duplicates(hashes, seen=None):
+    is_duplicate = pd.Series(hashes).duplicated().to_numpy()
+    if seen is not None and len(seen):
+        pos = np.searchsorted(seen, hashes).clip(max=len(seen) - 1)
+        is_duplicate |= seen[pos] == hashes
+    return is_duplicate
+
+# seen stays sorted; the stable sort is close to a merge of two sorted runs
+def add_hashes(seen, new_hashes):
+    new_hashes = np.unique(new_hashes)
+    if seen is None or not len(seen):
+        return new_hashes
+    return np.sort(np.concatenate([seen, new_hashes]), kind='stable')
+
+
+# ------------------------------
+# HASHES KEPT ACROSS MONTH FILES
+# ------------------------------
+def boundary_hash_path(folder, month_str):
+    return os.path.join(folder, f'boundary_{month_str}.npy')
+
+def previous_month_str(month_str):
+    return (pd.Period(month_str, freq='M') - 1).strftime('%Y-%m')
+
+# Hashes saved by the previous month, or an empty set if it has not been cleaned yet
+def load_boundary_hashes(folder, month_str):
+    path = boundary_hash_path(folder, previous_month_str(month_str))
+    if not os.path.exists(path):
+        return np.empty(0, dtype=np.uint64)
+    return np.load(path)
+
+# Kept trips that start in the last BOUNDARY_HOURS of the month: these are the trips
+# that can show up again in the next month's file
+def near_month_end(month_str, pickup_times):
+    month_end = pd.Period(month_str, freq='M').end_time
+    return np.asarray(pickup_times >= month_end - pd.Timedelta(hours=BOUNDARY_HOURS))
+
+def save_boundary_hashes(folder, month_str, hashes):
+    os.makedirs(folder, exist_ok=True)
+    np.save(boundary_hash_path(folder, month_str), np.unique(hashes))
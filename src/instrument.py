@@ -0,0 +1,172 @@
+import cProfile
+import json
+import os
+import sys
+import time
+import tracemalloc
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:   # Windows
+    resource = None
+
+from paths import REPORTS_FOLDER
+
+# ------------------------------
+# RUN LOG
+# ------------------------------
+# reports/run_log.jsonl (next to qa_summary.csv) gets one JSON line per unit of work:
+#   stage, unit (a month, 'kpi', or null for a whole pipeline stage), wall_seconds,
+#   rows_in / rows_out, bytes_read / bytes_written, peak_rss_mb and the seconds spent
+#   in each phase (read, qa, dedup, groupby, write, ...).
+# Every line of one run carries the same run_id, also across worker processes.
+RUN_LOG_PATH = os.path.join(REPORTS_FOLDER, 'run_log.jsonl')
+PROFILE_FOLDER = os.path.join(REPORTS_FOLDER, 'profiles')
+RUN_ID_ENV = 'TAXI_RUN_ID'
+TRACEMALLOC_TOP = 25
+
+def run_id():
+    if RUN_ID_ENV not in os.environ:
+        os.environ[RUN_ID_ENV] = f'{datetime.now():%Y%m%dT%H%M%S}-{os.getpid()}'
+    return os.environ[RUN_ID_ENV]
+
+# Size of a file, or of every file under a directory (a dataset partition)
+def path_size(path):
+    if os.path.isdir(path):
+        return sum(os.path.getsize(os.path.join(d, f)) for d, _, files in os.walk(path) for f in files)
+    return os.path.getsize(path) if os.path.exists(path) else 0
+
+# ------------------------------
+# PEAK MEMORY
+# ------------------------------
+# On Linux the peak RSS (VmHWM) can be reset, so each unit reports its own peak even when
+# one worker process handles several months. Elsewhere it is the peak of the process so far.
+_process_peak_mb = 0.0
+
+def reset_peak_rss():
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        pass
+
+def peak_rss_mb():
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == 'darwin' else peak / 1024   # bytes on macOS, kB elsewhere
+
+# ------------------------------
+# PROBE
+# ------------------------------
+# One probe per unit of work:
+#   probe = Probe('clean', '2019-01')
+#   with probe.phase('read'): ...
+#   probe.count(rows_in=n, bytes_read=size)
+#   record = probe.finish()
+class Probe:
+    def __init__(self, stage, unit=None):
+        reset_peak_rss()
+        self.stage = stage
+        self.unit = unit
+        self.started_at = datetime.now().isoformat(timespec='seconds')
+        self.start = time.perf_counter()
+        self.counts = defaultdict(int)
+        self.phases = defaultdict(float)
+        self.extra = {}
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] += time.perf_counter() - start
+
+    def count(self, **counts):
+        for key, value in counts.items():
+            self.counts[key] += int(value)
+
+    def finish(self, **extra):
+        global _process_peak_mb
+        peak = peak_rss_mb()
+        if peak is not None:
+            _process_peak_mb = max(_process_peak_mb, peak)
+
+        record = {
+            'run_id': run_id(),
+            'stage': self.stage,
+            'unit': self.unit,
+            'started_at': self.started_at,
+            'pid': os.getpid(),
+            'wall_seconds': round(time.perf_counter() - self.start, 4),
+            'rows_in': self.counts.get('rows_in'),
+            'rows_out': self.counts.get('rows_out'),
+            'bytes_read': self.counts.get('bytes_read'),
+            'bytes_written': self.counts.get('bytes_written'),
+            'peak_rss_mb': None if peak is None else round(peak, 1),
+            'phases': {name: round(seconds, 4) for name, seconds in self.phases.items()},
+        }
+        record.update(self.extra)
+        record.update(extra)
+        return record
+
+# A whole stage: its peak is the highest seen by any unit run in this process as well
+# (their resets hide it from VmHWM). profile / trace dump cProfile stats and the top
+# tracemalloc allocations to reports/profiles/<run_id>/<stage>.*
+@contextmanager
+def stage_probe(stage, profile=False, trace=False, folder=PROFILE_FOLDER):
+    global _process_peak_mb
+    _process_peak_mb = 0.0
+    probe = Probe(stage)
+    profiler = cProfile.Profile() if profile else None
+    if trace:
+        tracemalloc.start()
+    if profiler:
+        profiler.enable()
+    try:
+        yield probe
+    finally:
+        if profiler:
+            profiler.disable()
+        out_dir = os.path.join(folder, run_id())
+        if profiler or trace:
+            os.makedirs(out_dir, exist_ok=True)
+        if profiler:
+            probe.extra['profile'] = os.path.join(out_dir, f'{stage}.prof')
+            profiler.dump_stats(probe.extra['profile'])
+        if trace:
+            snapshot = tracemalloc.take_snapshot()
+            probe.extra['tracemalloc_peak_mb'] = round(tracemalloc.get_traced_memory()[1] / 2**20, 1)
+            tracemalloc.stop()
+            probe.extra['tracemalloc'] = os.path.join(out_dir, f'{stage}.tracemalloc.txt')
+            with open(probe.extra['tracemalloc'], 'w') as f:
+                for stat in snapshot.statistics('lineno')[:TRACEMALLOC_TOP]:
+                    f.write(f'{stat}\n')
+
+def stage_record(probe):
+    record = probe.finish()
+    if _process_peak_mb and (record['peak_rss_mb'] or 0) < _process_peak_mb:
+        record['peak_rss_mb'] = round(_process_peak_mb, 1)
+    return record
+
+def append_records(records, path=RUN_LOG_PATH):
+    if not records:
+        return
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'a') as f:
+        f.write(''.join(json.dumps(record, default=str) + '\n' for record in records))
+
+def read_run_log(path=RUN_LOG_PATH):
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
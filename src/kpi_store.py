@@ -0,0 +1,95 @@
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import os
+
+from paths import PROCESSED_FOLDER
+
+# ------------------------------
+# KPI STORE
+# ------------------------------
+# processed/kpi_<name>_<year>.<ext>, written by aggregate.py in one or more formats:
+#   'parquet' -> compressed columnar file
+#   'ipc'     -> uncompressed Arrow IPC file (.arrow), read through a memory map
+#   'csv'     -> for humans; dates come back as strings and have to be parsed again
+# Every format loads back with the same column types (KPI_DTYPES), so downstream code
+# never re-parses dates or rebuilds months.
+KPI_FOLDER = PROCESSED_FOLDER
+KPI_FORMATS = ['parquet', 'ipc', 'csv']
+EXTENSIONS = {'parquet': 'parquet', 'ipc': 'arrow', 'csv': 'csv'}
+READ_ORDER = ['ipc', 'parquet', 'csv']   # fastest first
+
+DAY_NAMES = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+
+KPI_DTYPES = {
+    'date': 'datetime64[us]',
+    'week_start': 'datetime64[us]',
+    'month': pd.PeriodDtype('M'),
+    'dow': 'int8',
+    'hour': 'int8',
+    'day': pd.CategoricalDtype(DAY_NAMES),
+    'PULocationID': 'uint16',
+    'DOLocationID': 'uint16',
+    'payment_type': 'int8',
+}
+
+def kpi_path(name, year, folder=KPI_FOLDER, fmt='parquet'):
+    return os.path.join(folder, f'kpi_{name}_{year}.{EXTENSIONS[fmt]}')
+
+def apply_kpi_types(df):
+    casts = {col: dtype for col, dtype in KPI_DTYPES.items() if col in df.columns and df[col].dtype != dtype}
+    return df.astype(casts) if casts else df
+
+# Write one KPI table in every format asked for; files of this table in other formats
+# are removed so a loader never picks up a stale copy
+def write_kpi(df, name, year, folder=KPI_FOLDER, formats=('parquet', 'csv')):
+    for fmt in KPI_FORMATS:
+        path = kpi_path(name, year, folder, fmt)
+        if fmt not in formats:
+            if os.path.exists(path):
+                os.remove(path)
+            continue
+
+        if fmt == 'csv':
+            df.to_csv(path, index=False)
+            continue
+
+        table = pa.Table.from_pandas(apply_kpi_types(df), preserve_index=False)
+        if fmt == 'parquet':
+            pq.write_table(table, path)
+        else:
+            with pa.OSFile(path, 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+
+# Fastest format of a KPI table on disk
+def kpi_format(name, year, folder=KPI_FOLDER):
+    fmt = next((f for f in READ_ORDER if os.path.exists(kpi_path(name, year, folder, f))), None)
+    if fmt is None:
+        raise FileNotFoundError(f'No kpi_{name}_{year} table in {folder}. Please run aggregate.py first.')
+    return fmt
+
+# fmt=None picks the fastest format on disk
+def load_kpi(name, year, folder=KPI_FOLDER, columns=None, fmt=None, memory_map=True):
+    if fmt is None:
+        fmt = kpi_format(name, year, folder)
+    path = kpi_path(name, year, folder, fmt)
+
+    if fmt == 'ipc':
+        source = pa.memory_map(path, 'r') if memory_map else pa.OSFile(path, 'rb')
+        with source:
+            table = pa.ipc.open_file(source).read_all()
+            if columns is not None:
+                table = table.select(columns)
+            df = table.to_pandas()
+    elif fmt == 'parquet':
+        df = pq.read_table(path, columns=columns, memory_map=memory_map).to_pandas()
+    else:
+        header = pd.read_csv(path, nrows=0).columns
+        date_cols = [c for c in header if c in KPI_DTYPES and KPI_DTYPES[c] == 'datetime64[us]']
+        if columns is not None:
+            date_cols = [c for c in date_cols if c in columns]
+        df = pd.read_csv(path, usecols=columns, parse_dates=date_cols)
+        if columns is not None:
+            df = df[columns]
+
+    return apply_kpi_types(df)
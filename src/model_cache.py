@@ -0,0 +1,68 @@
+import numpy as np
+import hashlib
+import json
+import os
+import re
+from statsmodels.iolib.smpickle import load_pickle
+
+from paths import PROCESSED_FOLDER
+
+# ------------------------------
+# FITTED-MODEL CACHE
+# ------------------------------
+# processed/model_cache/<series>__<spec>.pkl holds the last fitted SARIMAX results of one
+# series (parameters + state), next to a .json with the hash of the training data it saw.
+# spec names the model configuration (order, seasonal order, transform), so a change of
+# configuration never reuses a model fitted with another one.
+CACHE_FOLDER = os.path.join(PROCESSED_FOLDER, 'model_cache')
+
+# Hash of a daily series: its dates and its values
+def series_hash(y):
+    digest = hashlib.sha256()
+    digest.update(np.ascontiguousarray(y.index.asi8).tobytes())
+    digest.update(np.ascontiguousarray(y.to_numpy(dtype=np.float64)).tobytes())
+    return digest.hexdigest()
+
+def entry_paths(name, spec, folder=CACHE_FOLDER):
+    stem = re.sub(r'[^A-Za-z0-9_.-]+', '_', f'{name}__{spec}')
+    return os.path.join(folder, f'{stem}.pkl'), os.path.join(folder, f'{stem}.json')
+
+# How the cached model relates to the series y:
+#   'exact'  -> fitted on exactly y
+#   'prefix' -> fitted on the first n_obs days of y (y only has new days appended)
+#   None     -> nothing usable
+def match_entry(meta, y):
+    n_obs = meta['n_obs']
+    if n_obs == len(y) and meta['data_hash'] == series_hash(y):
+        return 'exact'
+    if n_obs < len(y) and meta['data_hash'] == series_hash(y.iloc[:n_obs]):
+        return 'prefix'
+    return None
+
+# (meta, fitted results) or None
+def load_entry(name, spec, folder=CACHE_FOLDER):
+    model_path, meta_path = entry_paths(name, spec, folder)
+    if not os.path.exists(meta_path) or not os.path.exists(model_path):
+        return None
+    with open(meta_path) as f:
+        meta = json.load(f)
+    return meta, load_pickle(model_path)
+
+# y is the series the model was fitted on (before any transform)
+def save_entry(name, spec, y, fitted, folder=CACHE_FOLDER):
+    os.makedirs(folder, exist_ok=True)
+    model_path, meta_path = entry_paths(name, spec, folder)
+    if os.path.exists(meta_path):
+        os.remove(meta_path)
+
+    fitted.save(model_path)
+    meta = {
+        'name': name,
+        'spec': spec,
+        'n_obs': len(y),
+        'end': str(y.index[-1].date()),
+        'data_hash': series_hash(y),
+    }
+    # Meta last: a model without its meta is never loaded
+    with open(meta_path, 'w') as f:
+        json.dump(meta, f, indent=2)
@@ -0,0 +1,196 @@
+import pandas as pd
+import numpy as np
+import argparse
+import os
+
+from sketch import DEFAULT_ALPHA, sketch_from_counts
+from services import DEFAULT_SERVICE, SERVICES, kpi_name
+from paths import PROCESSED_FOLDER
+
+# ------------------------------
+# ORIGIN-DESTINATION MATRIX
+# ------------------------------
+# processed/kpi_od_<year>.npz, written by aggregate.py --od from its (month, [hour,] PU, DO)
+# base. Each period is one sparse 265 x 265 matrix (row = pickup zone, column = dropoff
+# zone, LocationID - 1) stored as COO arrays sorted by period, so a period is a contiguous
+# slice. Next to the sums, the trip-duration sketch of every cell is kept as
+# (cell, bucket, count) triples, so a percentile is read from the cells asked for only.
+OD_FOLDER = PROCESSED_FOLDER
+N_ZONES = 265
+
+# Query value name -> column of the aggregate state
+VALUES = {
+    'trips': 'trips',
+    'revenue': 'total_amount_sum',
+    'distance': 'trip_distance_sum',
+    'duration': 'trip_duration_sum',
+}
+
+def od_path(year, folder=OD_FOLDER, service=DEFAULT_SERVICE):
+    return os.path.join(folder, f"kpi_{kpi_name('od', service)}_{year}.npz")
+
+# state: the 'od' base state of aggregate.py (sums indexed by month, [hour,] PU, DO)
+def save_od(state, path):
+    sums = state['sums'].sort_index()
+    keys = sums.index.to_frame(index=False)
+    periods = keys['month'].astype(str)
+    period_names, period_codes = np.unique(periods.to_numpy(dtype=str), return_inverse=True)
+
+    arrays = {
+        'periods': period_names,
+        'period_offsets': np.searchsorted(period_codes, np.arange(len(period_names) + 1)),
+        'pu': (keys['PULocationID'].to_numpy() - 1).astype('int16'),
+        'do': (keys['DOLocationID'].to_numpy() - 1).astype('int16'),
+        'alpha': np.float64(state['alpha']),
+    }
+    if 'hour' in keys.columns:
+        arrays['hour'] = keys['hour'].to_numpy().astype('int8')
+    for name, col in VALUES.items():
+        arrays[name] = sums[col].to_numpy(dtype='int64' if name == 'trips' else 'float64')
+
+    # Sketch counts keyed by the position of their cell in the arrays above
+    counts = state['sketches']['trip_duration']
+    cell = pd.Series(np.arange(len(sums)), index=sums.index)
+    arrays['sketch_cell'] = cell.reindex(counts.index.droplevel('bucket')).to_numpy().astype('int32')
+    arrays['sketch_bucket'] = counts.index.get_level_values('bucket').to_numpy().astype('int32')
+    arrays['sketch_count'] = counts.to_numpy().astype('int64')
+
+    np.savez(path, **arrays)
+
+
+class ODMatrix:
+    def __init__(self, arrays):
+        self.arrays = arrays
+        self.periods = [str(p) for p in arrays['periods']]
+        self.hourly = 'hour' in arrays
+        self.alpha = float(arrays.get('alpha', DEFAULT_ALPHA))
+
+    @classmethod
+    def load(cls, year, folder=OD_FOLDER, service=DEFAULT_SERVICE):
+        path = od_path(year, folder, service)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f'No OD matrix at {path}. Please run aggregate.py --od first.')
+        with np.load(path) as data:
+            return cls({name: data[name] for name in data.files})
+
+    # Positions of the cells in the given periods ('2019-03', ...) and hours (needs --od-hourly)
+    def _cells(self, periods=None, hours=None):
+        offsets = self.arrays['period_offsets']
+        if periods is None:
+            cells = np.arange(offsets[-1])
+        else:
+            unknown = [p for p in periods if p not in self.periods]
+            if unknown:
+                raise KeyError(f'Periods not in the OD matrix: {unknown}')
+            ids = [self.periods.index(p) for p in periods]
+            cells = np.concatenate([np.arange(offsets[i], offsets[i + 1]) for i in ids] or [np.empty(0, 'int64')])
+        if hours is not None:
+            if not self.hourly:
+                raise ValueError('This OD matrix has no hour key; build it with aggregate.py --od-hourly')
+            cells = cells[np.isin(self.arrays['hour'][cells], list(hours))]
+        return cells
+
+    # Sparse PU x DO matrix of one value, summed over the selected periods / hours
+    # (scipy is imported here so aggregate.py, which writes the matrices, does not need it)
+    def matrix(self, value='trips', periods=None, hours=None):
+        import scipy.sparse as sp
+        cells = self._cells(periods, hours)
+        return sp.coo_matrix(
+            (self.arrays[value][cells], (self.arrays['pu'][cells], self.arrays['do'][cells])),
+            shape=(N_ZONES, N_ZONES)
+        ).tocsr()
+
+    # One row per non-empty (PU, DO) pair, summed over the selected periods / hours
+    def pairs(self, periods=None, hours=None):
+        cells = self._cells(periods, hours)
+        pair_ids = self.arrays['pu'][cells].astype('int64') * N_ZONES + self.arrays['do'][cells]
+        unique_ids, codes = np.unique(pair_ids, return_inverse=True)
+
+        df = pd.DataFrame({
+            'PULocationID': (unique_ids // N_ZONES + 1).astype('uint16'),
+            'DOLocationID': (unique_ids % N_ZONES + 1).astype('uint16'),
+        })
+        for name in VALUES:
+            df[name] = np.bincount(codes, weights=self.arrays[name][cells], minlength=len(unique_ids))
+        df['trips'] = df['trips'].astype('int64')
+        df['duration_mean'] = df['duration'] / df['trips']
+        return df
+
+    # Duration percentile of given pairs (over the selected periods / hours) from their sketches
+    def duration_quantile(self, pairs, q=0.5, periods=None, hours=None):
+        cells = self._cells(periods, hours)
+        pair_ids = self.arrays['pu'][cells].astype('int64') * N_ZONES + self.arrays['do'][cells]
+        cell_pair = np.full(len(self.arrays['trips']), -1, dtype='int64')
+        cell_pair[cells] = pair_ids
+
+        wanted = (pairs['PULocationID'].to_numpy().astype('int64') - 1) * N_ZONES + pairs['DOLocationID'].to_numpy() - 1
+        sketch_pairs = cell_pair[self.arrays['sketch_cell']]
+        rows = np.flatnonzero(np.isin(sketch_pairs, wanted))
+        out = np.full(len(wanted), np.nan)
+        for i, pair_id in enumerate(wanted):
+            hit = rows[sketch_pairs[rows] == pair_id]
+            if len(hit):
+                out[i] = sketch_from_counts(
+                    self.arrays['sketch_bucket'][hit], self.arrays['sketch_count'][hit], self.alpha
+                ).quantile(q)
+        return pd.Series(out, index=pairs.index)
+
+    # k biggest pairs by `by`, with their median trip duration
+    def top_pairs(self, k=10, by='revenue', periods=None, hours=None):
+        top = self.pairs(periods, hours).nlargest(k, by).reset_index(drop=True)
+        top['duration_p50'] = self.duration_quantile(top, 0.5, periods, hours)
+        return top
+
+    # Flows of one zone: direction 'pickup' = its row (where trips from it go),
+    # 'dropoff' = its column (where trips to it come from); largest first
+    def zone_slice(self, zone, direction='pickup', value='trips', periods=None, hours=None):
+        matrix = self.matrix(value, periods, hours)
+        if direction == 'pickup':
+            line, other = matrix[zone - 1], 'DOLocationID'
+        elif direction == 'dropoff':
+            line, other = matrix.T.tocsr()[zone - 1], 'PULocationID'
+        else:
+            raise ValueError(f"direction must be 'pickup' or 'dropoff', got {direction}")
+        line.sum_duplicates()
+        series = pd.Series(line.data, index=pd.Index(line.indices + 1, name=other), name=value)
+        return series[series != 0].sort_values(ascending=False)
+
+    # Pairs sorted by `by` with their cumulative share of the total and the share of pairs
+    # needed to reach it (the Pareto curve of routes)
+    def pareto(self, by='revenue', periods=None, hours=None):
+        df = self.pairs(periods, hours).sort_values(by, ascending=False, ignore_index=True)
+        total = df[by].sum()
+        df['share'] = df[by] / total
+        df['cum_share'] = df['share'].cumsum()
+        df['pair_share'] = np.arange(1, len(df) + 1) / len(df)
+        return df
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Query the origin-destination matrix written by aggregate.py --od.')
+    parser.add_argument('--year', type=int, default=2019)
+    parser.add_argument('--service', choices=list(SERVICES), default=DEFAULT_SERVICE)
+    parser.add_argument('--by', choices=list(VALUES), default='revenue',
+                        help='Value to rank pairs by (default: revenue)')
+    parser.add_argument('--top', type=int, default=20, help='Number of pairs to show (default: 20)')
+    parser.add_argument('--periods', nargs='+', default=None, help='Months to include, e.g. 2019-03 (default: all)')
+    parser.add_argument('--hours', nargs='+', type=int, default=None, help='Pickup hours to include (needs --od-hourly)')
+    parser.add_argument('--zone', type=int, default=None,
+                        help='Show the flows of this zone (see --direction) instead of the top pairs')
+    parser.add_argument('--direction', choices=['pickup', 'dropoff'], default='pickup')
+    args = parser.parse_args(argv)
+
+    od = ODMatrix.load(args.year, service=args.service)
+    if args.zone is not None:
+        print(od.zone_slice(args.zone, args.direction, args.by, args.periods, args.hours).head(args.top))
+        return
+
+    print(od.top_pairs(args.top, args.by, args.periods, args.hours).to_string(index=False))
+    pareto = od.pareto(args.by, args.periods, args.hours)
+    for share in [0.5, 0.8]:
+        n_pairs = int(np.searchsorted(pareto['cum_share'].to_numpy(), share) + 1)
+        print(f'{share:.0%} of {args.by} comes from {n_pairs} of {len(pareto)} pairs ({n_pairs / len(pareto):.1%})')
+
+
+if __name__ == '__main__':
+    main()
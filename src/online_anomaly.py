@@ -0,0 +1,146 @@
+import pandas as pd
+import numpy as np
+import argparse
+import os
+
+from bonus_AnomalyDetection import (
+    THRESHOLD, METRICS, LABELS, EXPORT_COLS, load_hourly_timeseries, add_features, anomaly_mask
+)
+from services import DEFAULT_SERVICE, output_name, add_service_arguments
+from paths import PROCESSED_FOLDER, REPORTS_FOLDER
+
+# One detector state per service, carried from one year to the next; alerts go to
+# reports/anomalies_online[_<service>]_<year>.csv
+def state_path(service=DEFAULT_SERVICE):
+    return os.path.join(PROCESSED_FOLDER, f"{output_name('anomaly_online_state', service)}.npz")
+
+def output_path(year, service=DEFAULT_SERVICE):
+    return os.path.join(REPORTS_FOLDER, f"{output_name('anomalies_online', service, year)}.csv")
+
+# ------------------------------
+# ONLINE ANOMALY DETECTOR
+# ------------------------------
+# Same rules and labels as bonus_AnomalyDetection.py, but every hour is scored the moment it
+# arrives, against what was seen *before* it: each (dow, hour) bucket keeps an exponentially
+# weighted mean / variance per metric, updated in O(1). Nothing looks at future hours.
+HALFLIFE = 8    # observations of a bucket (= weeks) for an old value's weight to halve
+WARMUP = 4      # a bucket only raises alerts once it has seen this many weeks
+CLIP = THRESHOLD  # values update the state clipped to mean +- CLIP * std, so one outlier
+                  # does not blow up the variance it is judged against next week
+
+class OnlineAnomalyDetector:
+    def __init__(self, halflife=HALFLIFE, warmup=WARMUP, threshold=THRESHOLD, clip=CLIP):
+        self.halflife = halflife
+        self.warmup = warmup
+        self.threshold = threshold
+        self.clip = clip
+        self.count = np.zeros((7, 24), dtype='int64')
+        self.mean = np.zeros((7, 24, len(METRICS)))
+        self.var = np.zeros((7, 24, len(METRICS)))
+        self.last_seen = None   # timestamp of the last hour consumed
+
+    @property
+    def alpha(self):
+        return 1 - 0.5 ** (1 / self.halflife)
+
+    # Score one hour (values in METRICS order) and fold it into its bucket -> z-scores
+    def update(self, dow, hour, values):
+        values = np.asarray(values, dtype='float64')
+        mean, var, n = self.mean[dow, hour], self.var[dow, hour], self.count[dow, hour]
+        # A young bucket's EWMA variance only carries 1 - (1 - alpha)^(n - 1) of its weight
+        std = np.sqrt(var / (1 - (1 - self.alpha) ** (n - 1))) if n > 1 else np.zeros_like(var)
+
+        z = np.zeros(len(values))
+        if n >= self.warmup:
+            scored = std > 0
+            z[scored] = (values[scored] - mean[scored]) / std[scored]
+            values = np.where(scored, np.clip(values, mean - self.clip * std, mean + self.clip * std), values)
+
+        if n == 0:
+            self.mean[dow, hour] = values
+        else:
+            delta = values - mean
+            self.mean[dow, hour] = mean + self.alpha * delta
+            self.var[dow, hour] = (1 - self.alpha) * (var + self.alpha * delta * delta)
+        self.count[dow, hour] = n + 1
+        return z
+
+    def save(self, path):
+        np.savez(
+            path, count=self.count, mean=self.mean, var=self.var,
+            params=np.array([self.halflife, self.warmup, self.threshold, self.clip], dtype='float64'),
+            last_seen=np.array(str(self.last_seen) if self.last_seen is not None else '')
+        )
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as state:
+            halflife, warmup, threshold, clip = state['params']
+            detector = cls(halflife, int(warmup), threshold, clip)
+            detector.count = state['count']
+            detector.mean = state['mean']
+            detector.var = state['var']
+            last_seen = str(state['last_seen'])
+        detector.last_seen = pd.Timestamp(last_seen) if last_seen else None
+        return detector
+
+# Feed the hours of df newer than the detector's last one, in time order.
+# Returns those hours with their z-scores and anomaly_type.
+def detect_stream(df, detector):
+    df = add_features(df)
+    df['timestamp'] = df['date'] + pd.to_timedelta(df['hour'], unit='h')
+    df = df.sort_values('timestamp')
+    if detector.last_seen is not None:
+        df = df[df['timestamp'] > detector.last_seen]
+    df = df.reset_index(drop=True)
+
+    values = df[list(METRICS.values())].to_numpy(dtype='float64')
+    dows, hours = df['dow'].to_numpy(), df['hour'].to_numpy()
+    z = np.zeros_like(values)
+    for i in range(len(df)):
+        z[i] = detector.update(dows[i], hours[i], values[i])
+
+    for j, z_col in enumerate(METRICS):
+        df[z_col] = z[:, j]
+    mask = anomaly_mask(df['z_trips'], df['z_speed'], df['z_rev_mile'], detector.threshold)
+    df['anomaly_type'] = LABELS[mask]
+    if len(df):
+        detector.last_seen = df['timestamp'].iloc[-1]
+    return df
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Score hourly KPIs for anomalies as they arrive.')
+    parser.add_argument('--input', default=None,
+                        help='Hourly timeseries CSV (date, hour, trips, speed_mean, total_money, distance_sum); '
+                             'default: the hourly_timeseries KPI table of aggregate.py')
+    parser.add_argument('--state', default=None,
+                        help='Detector state; only hours after the last one it saw are scored '
+                             '(default: processed/anomaly_online_state[_<service>].npz)')
+    parser.add_argument('--reset', action='store_true',
+                        help='Start from an empty state and rescore every hour')
+    add_service_arguments(parser, 'Years of hourly KPIs to stream through the detector, in order '
+                                  '(with --input: the year its alerts are filed under)')
+    args = parser.parse_args(argv)
+
+    state = args.state or state_path(args.service)
+    resume = os.path.exists(state) and not args.reset
+    detector = OnlineAnomalyDetector.load(state) if resume else OnlineAnomalyDetector()
+
+    years = args.years[:1] if args.input else args.years
+    for year in years:
+        hourly = pd.read_csv(args.input) if args.input else load_hourly_timeseries(year, service=args.service)
+        scored = detect_stream(hourly, detector)
+        anomalies_df = scored.loc[scored['anomaly_type'] != 'Normal', EXPORT_COLS]
+
+        # New alerts are appended to the alerts of earlier runs
+        path = output_path(year, args.service)
+        append = resume and os.path.exists(path)
+        anomalies_df.to_csv(path, mode='a' if append else 'w', header=not append, index=False)
+        print(f"{year}: scored {len(scored)} new hours, {len(anomalies_df)} anomalies (up to {detector.last_seen})")
+
+    detector.save(state)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,15 @@
+import os
+
+# ------------------------------
+# PROJECT FOLDERS
+# ------------------------------
+# Resolved from the repository root, so every script and pipeline stage reads and writes
+# the same files whatever directory it is started from.
+script_dir = os.path.dirname(os.path.abspath(__file__))
+
+ROOT = os.path.abspath(os.path.join(script_dir, '..'))
+RAW_FOLDER = os.path.join(ROOT, 'raw')
+PROCESSED_FOLDER = os.path.join(ROOT, 'processed')
+REPORTS_FOLDER = os.path.join(ROOT, 'reports')
+FIGURES_FOLDER = os.path.join(ROOT, 'figures')
+ZONE_LOOKUP_PATH = os.path.join(RAW_FOLDER, 'taxi_zone_lookup.csv')
@@ -0,0 +1,249 @@
+import argparse
+import glob
+import importlib
+import os
+import shlex
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+from services import (
+    DEFAULT_SERVICE, DEFAULT_YEARS, file_pattern, raw_path, kpi_name, output_name, add_service_arguments
+)
+from paths import RAW_FOLDER, PROCESSED_FOLDER, REPORTS_FOLDER
+from instrument import stage_probe, stage_record, append_records, run_id, RUN_LOG_PATH
+
+# ------------------------------
+# PIPELINE STAGES
+# ------------------------------
+# Every stage is the main(argv) of one script, the stages it needs, and the files it reads
+# and writes for one year and TLC service (glob patterns, each input pattern must match at
+# least one file; names from services.py). A stage is fresh, and skipped, when all its
+# outputs of every --years year exist and the oldest one is newer than the newest input.
+# Stages whose dependencies are done run concurrently.
+# 'years' is the offset of the years passed to the script (--years / --service), None for
+# stages that take neither: the metrics stage scores the year after the KPI year, and the
+# figures stage always draws the report year of render.py.
+REPORT_YEAR = 2019
+
+def _processed(name):
+    return os.path.join(PROCESSED_FOLDER, name)
+
+def _report(name):
+    return os.path.join(REPORTS_FOLDER, name)
+
+def _kpi(name, year, service):
+    return _processed(f'kpi_{kpi_name(name, service)}_{year}.*')
+
+STAGES = {
+    'clean': {
+        'module': 'clean_data',
+        'deps': [],
+        'years': 0,
+        'inputs': lambda year, service: [file_pattern(service, year, RAW_FOLDER)],
+        'outputs': lambda year, service: [file_pattern(service, year, PROCESSED_FOLDER, clean=True),
+                                          _report(f"{output_name('qa_summary', service)}.csv")],
+    },
+    'aggregate': {
+        'module': 'aggregate',
+        'deps': ['clean'],
+        'years': 0,
+        'inputs': lambda year, service: [file_pattern(service, year, PROCESSED_FOLDER, clean=True)],
+        'outputs': lambda year, service: [_kpi('daily', year, service), _kpi('hourly_timeseries', year, service),
+                                          _kpi('daily_pickup', year, service)],
+    },
+    'forecast': {
+        'module': 'bonus_PredictiveModel',
+        'deps': ['aggregate'],
+        'years': 0,
+        'inputs': lambda year, service: [_kpi('daily', year, service)],
+        'outputs': lambda year, service: [_report(f"{output_name('forecast_results', service, year + 1)}.csv"),
+                                          _report(f"{output_name('historical_data', service, year)}.csv")],
+    },
+    'anomaly': {
+        'module': 'bonus_AnomalyDetection',
+        'deps': ['aggregate'],
+        'years': 0,
+        'inputs': lambda year, service: [_kpi('hourly_timeseries', year, service)],
+        'outputs': lambda year, service: [_report(f"{output_name('anomalies', service, year)}.csv")],
+    },
+    'backtest': {
+        'module': 'backtest',
+        'deps': ['aggregate'],
+        'years': None,
+        'inputs': lambda year, service: [_kpi('daily', REPORT_YEAR, DEFAULT_SERVICE)],
+        'outputs': lambda year, service: [_report('backtest_by_horizon.csv'), _report('backtest_by_fold.csv')],
+    },
+    'metrics': {
+        'module': 'cal_model_metric',
+        'deps': ['forecast'],
+        'years': 1,
+        'inputs': lambda year, service: [_report(f"{output_name('forecast_results', service, year + 1)}.csv"),
+                                         raw_path(service, year + 1, 1), raw_path(service, year + 1, 2)],
+        'outputs': lambda year, service: [
+            _report(f"{output_name('model_performance_metrics', service, year + 1)}.csv")
+        ],
+    },
+    # After metrics (which adds Real_Data to the forecast) when it can run; render.py
+    # itself only redraws the figures whose inputs changed
+    'figures': {
+        'module': 'render',
+        'deps': ['aggregate', 'forecast', 'metrics'],
+        'years': None,
+        'inputs': lambda year, service: [_kpi(name, REPORT_YEAR, DEFAULT_SERVICE) for name in
+                                         ['daily', 'hourly', 'weekly', 'monthly_payment_type', 'monthly_pickup',
+                                          'monthly_dropoff']]
+                                        + [_report(f'forecast_results_{REPORT_YEAR + 1}.csv'),
+                                           _report(f'historical_data_{REPORT_YEAR}.csv')],
+        'outputs': lambda year, service: [_processed(os.path.join('plot_cache', 'figures.json'))],
+    },
+}
+
+DEFAULT_TARGETS = ['forecast', 'anomaly', 'metrics', 'figures']
+
+# Targets plus everything they depend on, dependencies first
+def resolve(targets):
+    order = []
+    def visit(name):
+        if name not in order:
+            for dep in STAGES[name]['deps']:
+                visit(dep)
+            order.append(name)
+    for target in targets:
+        visit(target)
+    return order
+
+def _mtimes(patterns):
+    matches = [sorted(glob.glob(pattern)) for pattern in patterns]
+    return matches, [os.path.getmtime(f) for files in matches for f in files]
+
+# Patterns of one side ('inputs' / 'outputs') of a stage over every year, without repeats
+def stage_files(name, side, years=DEFAULT_YEARS, service=DEFAULT_SERVICE):
+    return list(dict.fromkeys(pattern for year in years for pattern in STAGES[name][side](year, service)))
+
+# --years / --service of the stage's script (see 'years' above)
+def service_argv(name, years=DEFAULT_YEARS, service=DEFAULT_SERVICE):
+    offset = STAGES[name]['years']
+    if offset is None:
+        return []
+    return ['--years', ','.join(str(year + offset) for year in years), '--service', service]
+
+# 'missing' (an input pattern matches nothing), 'fresh' or 'stale'
+def stage_status(name, years=DEFAULT_YEARS, service=DEFAULT_SERVICE):
+    inputs, input_times = _mtimes(stage_files(name, 'inputs', years, service))
+    if any(not files for files in inputs):
+        return 'missing'
+    outputs, output_times = _mtimes(stage_files(name, 'outputs', years, service))
+    if any(not files for files in outputs):
+        return 'stale'
+    return 'fresh' if min(output_times) >= max(input_times) else 'stale'
+
+# Runs in a worker process when --workers > 1; returns the stage's run-log record
+def run_stage(name, argv, profile=False, trace=False):
+    with stage_probe(name, profile, trace) as probe:
+        importlib.import_module(STAGES[name]['module']).main(argv)
+    return stage_record(probe)
+
+# profile / trace: cProfile and tracemalloc dumps of every stage that runs (instrument.py)
+def run_pipeline(targets, workers=1, force=False, dry_run=False, stage_args=None, profile=False, trace=False,
+                 years=DEFAULT_YEARS, service=DEFAULT_SERVICE):
+    order = resolve(targets)
+    stage_args = {name: service_argv(name, years, service) + (stage_args or {}).get(name, []) for name in order}
+    run_id()   # shared by the stages and their workers
+    results = {}   # name -> (status, seconds)
+    pending, running = list(order), {}
+
+    def start_ready(pool):
+        for name in list(pending):
+            deps = STAGES[name]['deps']
+            if any(dep not in results for dep in deps):
+                continue
+            pending.remove(name)
+
+            if any(results[dep][0] in ('failed', 'blocked') for dep in deps):
+                results[name] = ('blocked', 0.0)
+                continue
+            upstream_ran = any(results[dep][0] in ('ran', 'would run') for dep in deps)
+            status = stage_status(name, years, service)
+            if status == 'missing' and not (dry_run and upstream_ran):
+                print(f'[{name}] skipped: missing inputs {stage_files(name, "inputs", years, service)}')
+                results[name] = ('missing inputs', 0.0)
+            elif status == 'fresh' and not force and not upstream_ran:
+                print(f'[{name}] up to date')
+                results[name] = ('fresh', 0.0)
+            elif dry_run:
+                print(f'[{name}] would run: {STAGES[name]["module"]}.main({stage_args[name]})')
+                results[name] = ('would run', 0.0)
+            elif pool is None:
+                print(f'[{name}] running')
+                collect(name, lambda: run_stage(name, stage_args[name], profile, trace))
+            else:
+                print(f'[{name}] started')
+                running[pool.submit(run_stage, name, stage_args[name], profile, trace)] = name
+
+    def collect(name, get_record):
+        try:
+            record = get_record()
+            append_records([record], RUN_LOG_PATH)
+            results[name] = ('ran', record['wall_seconds'])
+            print(f'[{name}] done in {results[name][1]:.1f}s')
+        except (Exception, SystemExit) as e:
+            results[name] = ('failed', 0.0)
+            print(f'[{name}] FAILED: {e!r}')
+
+    if workers > 1 and not dry_run:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            while pending or running:
+                start_ready(pool)
+                if running:
+                    finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        collect(running.pop(future), future.result)
+    else:
+        while pending:
+            start_ready(None)
+
+    return {name: results[name] for name in order}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run the pipeline stages that are out of date.')
+    parser.add_argument('targets', nargs='*', metavar='STAGE',
+                        help=f'Stages to bring up to date, with everything they depend on: '
+                             f'{", ".join(STAGES)} (default: {" ".join(DEFAULT_TARGETS)})')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Number of independent stages to run at the same time (default: 1)')
+    parser.add_argument('--force', action='store_true',
+                        help='Run every stage of the plan even if its outputs are up to date')
+    parser.add_argument('--dry-run', action='store_true',
+                        help='Only print which stages would run')
+    parser.add_argument('--profile', action='store_true',
+                        help='Save a cProfile dump of every stage that runs to reports/profiles/<run id>/')
+    parser.add_argument('--tracemalloc', action='store_true',
+                        help='Save the top memory allocations of every stage that runs to reports/profiles/<run id>/')
+    parser.add_argument('--stage-args', nargs=2, action='append', default=[], metavar=('STAGE', 'ARGS'),
+                        help='Command-line arguments for one stage, e.g. --stage-args clean "--workers 8"')
+    add_service_arguments(parser, 'Years of raw data to run the stages on')
+    args = parser.parse_args(argv)
+
+    if args.workers < 1:
+        parser.error('--workers must be at least 1')
+    unknown = [name for name in args.targets if name not in STAGES]
+    if unknown:
+        parser.error(f'Unknown stage(s): {" ".join(unknown)} (choose from {", ".join(STAGES)})')
+    stage_args = {}
+    for name, stage_argv in args.stage_args:
+        if name not in STAGES:
+            parser.error(f'Unknown stage in --stage-args: {name}')
+        stage_args[name] = shlex.split(stage_argv)
+
+    results = run_pipeline(args.targets or DEFAULT_TARGETS, args.workers, args.force, args.dry_run, stage_args,
+                           args.profile, args.tracemalloc, args.years, args.service)
+
+    print('\nStage       Status          Time')
+    for name, (status, seconds) in results.items():
+        print(f'{name:<11} {status:<15} {seconds:6.1f}s')
+    if any(status in ('failed', 'blocked') for status, _ in results.values()):
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
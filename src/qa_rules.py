@@ -0,0 +1,133 @@
+import numpy as np
+
+# ------------------------------
+# QA RULES AS DATA
+# ------------------------------
+# Every rule is a name, a boolean expression (pandas eval syntax) that is True for rows
+# that PASS, and the columns the expression reads. Month bounds are available as
+# @month_start / @month_end. Rule i owns bit i of the per-row qa_mask: bit set = rule failed.
+QA_RULES = []
+
+def register_qa_rule(name, expression, columns):
+    if any(rule['name'] == name for rule in QA_RULES):
+        raise ValueError(f'QA rule already registered: {name}')
+    QA_RULES.append({'name': name, 'expression': expression, 'columns': list(columns)})
+
+register_qa_rule('qa_dropoff_after_pickup', 'trip_duration > 0', ['trip_duration'])
+register_qa_rule(
+    'qa_timedate',
+    '(tpep_pickup_datetime >= @month_start) & (tpep_pickup_datetime < @month_end)',
+    ['tpep_pickup_datetime']
+)
+
+# Duration: < 10 hours (600 mins)
+register_qa_rule('qa_duration', '(trip_duration > 0) & (trip_duration < 600)', ['trip_duration'])
+
+# Distance: > 0 miles OR 0 miles with > $0 fare
+register_qa_rule(
+    'qa_distance',
+    '(trip_distance > 0) | ((trip_distance == 0) & (total_amount > 0))',
+    ['trip_distance', 'total_amount']
+)
+
+# Speed: < 70 mph
+register_qa_rule('qa_speed', '(avg_speed >= 0) & (avg_speed <= 70)', ['avg_speed'])
+
+# Payment Type: 0 to 4
+register_qa_rule('qa_payment_type', '(payment_type >= 0) & (payment_type <= 4)', ['payment_type'])
+
+# Total Amount: > $0 and < $1000
+register_qa_rule('qa_total_amount', '(total_amount > 0) & (total_amount < 1000)', ['total_amount'])
+
+# Tip: >= $0 and <= total_amount
+register_qa_rule(
+    'qa_tip_amount',
+    '(tip_amount >= 0) & (tip_amount <= total_amount)',
+    ['tip_amount', 'total_amount']
+)
+
+# Non-Negative Charges
+register_qa_rule(
+    'qa_non_neg_amount',
+    '(fare_amount >= 0) & (extra >= 0) & (mta_tax >= 0) & (improvement_surcharge >= 0)'
+    ' & (tolls_amount >= 0) & (congestion_surcharge >= 0) & (airport_fee >= 0)',
+    ['fare_amount', 'extra', 'mta_tax', 'improvement_surcharge', 'tolls_amount',
+     'congestion_surcharge', 'airport_fee']
+)
+
+# Location IDs: 1 to 265 but PULocationID must be in NYC
+register_qa_rule(
+    'qa_locationID',
+    '(PULocationID > 0) & (PULocationID <= 263) & (DOLocationID > 0) & (DOLocationID <= 265)',
+    ['PULocationID', 'DOLocationID']
+)
+
+# RatecodeID: 1 to 6
+register_qa_rule('qa_ratecodeID', '(RatecodeID > 0) & (RatecodeID <= 6)', ['RatecodeID'])
+
+# VendorID: 1, 2, 6, 7
+register_qa_rule('qa_vendorID', 'VendorID in [1, 2, 6, 7]', ['VendorID'])
+
+# Passenger Count: 0 to 9
+register_qa_rule('qa_passenger_count', '(passenger_count >= 0) & (passenger_count <= 9)', ['passenger_count'])
+
+
+# ------------------------------
+# ENGINE
+# ------------------------------
+def mask_dtype(n_rules):
+    for dtype in (np.uint8, np.uint16, np.uint32, np.uint64):
+        if n_rules <= np.iinfo(dtype).bits:
+            return dtype
+    raise ValueError(f'Too many QA rules for one bitmask: {n_rules}')
+
+# One pass over the rules, OR-ing each failure into a packed per-row mask.
+# No qa_* columns are added to df.
+def evaluate_qa_mask(df, month_start, month_end, rules=None):
+    rules = QA_RULES if rules is None else rules
+    dtype = mask_dtype(len(rules))
+    qa_mask = np.zeros(len(df), dtype=dtype)
+    context = {'month_start': month_start, 'month_end': month_end}
+
+    for bit, rule in enumerate(rules):
+        missing = [c for c in rule['columns'] if c not in df.columns]
+        if missing:
+            raise KeyError(f"QA rule {rule['name']} needs missing columns: {missing}")
+
+        passed = np.asarray(df.eval(rule['expression'], local_dict=context), dtype=bool)
+        np.bitwise_or(qa_mask, dtype(1 << bit), out=qa_mask, where=~passed)
+
+    return qa_mask
+
+# Fail count per rule, read back from the mask. Only rejected rows are looked at,
+# and they are collapsed to their distinct bit patterns first.
+def count_rule_failures(qa_mask, rules=None):
+    rules = QA_RULES if rules is None else rules
+    patterns, counts = np.unique(qa_mask[qa_mask != 0], return_counts=True)
+
+    fail_counts = {}
+    for bit, rule in enumerate(rules):
+        failed = (patterns >> bit) & 1 == 1
+        fail_counts[rule['name']] = int(counts[failed].sum())
+    return fail_counts
+
+# Names of the rules whose bits are set in one mask value
+def decode_qa_mask(value, rules=None):
+    rules = QA_RULES if rules is None else rules
+    return [rule['name'] for bit, rule in enumerate(rules) if (int(value) >> bit) & 1]
+
+# Registered rules with these names, in registration order (None = all of them)
+def select_rules(names=None):
+    if names is None:
+        return QA_RULES
+    unknown = [name for name in names if not any(rule['name'] == name for rule in QA_RULES)]
+    if unknown:
+        raise KeyError(f'Unknown QA rules: {unknown}')
+    return [rule for rule in QA_RULES if rule['name'] in names]
+
+def qa_rule_columns(rules=None):
+    rules = QA_RULES if rules is None else rules
+    columns = []
+    for rule in rules:
+        columns += [c for c in rule['columns'] if c not in columns]
+    return columns
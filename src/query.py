@@ -0,0 +1,53 @@
+import pyarrow.dataset as ds
+import pandas as pd
+import os
+import re
+
+# ------------------------------
+# QUERIES OVER THE PARTITIONED CLEAN DATASET
+# ------------------------------
+# Partition filters (year / month / pickup_borough) prune directories before any file is
+# opened; a time window on tpep_pickup_datetime prunes row groups through their statistics.
+
+def open_dataset(root):
+    if not os.path.isdir(root):
+        raise FileNotFoundError(f'No cleaned dataset at {root}. Run clean_data.py --output dataset first.')
+    return ds.dataset(root, format='parquet', partitioning='hive')
+
+def build_filter(years=None, months=None, boroughs=None, start=None, end=None):
+    conditions = []
+    if years is not None:
+        conditions.append(ds.field('year').isin(list(years)))
+    if months is not None:
+        conditions.append(ds.field('month').isin(list(months)))
+    if boroughs is not None:
+        conditions.append(ds.field('pickup_borough').isin(list(boroughs)))
+    if start is not None:
+        conditions.append(ds.field('tpep_pickup_datetime') >= pd.Timestamp(start))
+    if end is not None:
+        conditions.append(ds.field('tpep_pickup_datetime') < pd.Timestamp(end))
+
+    expression = None
+    for condition in conditions:
+        expression = condition if expression is None else expression & condition
+    return expression
+
+def scan(root, columns=None, years=None, months=None, boroughs=None, start=None, end=None):
+    dataset = open_dataset(root)
+    expression = build_filter(years, months, boroughs, start, end)
+    return dataset.to_table(columns=columns, filter=expression).to_pandas()
+
+# (year, month) partitions present on disk, sorted
+def list_months(root, years=None):
+    months = []
+    if not os.path.isdir(root):
+        return months
+    for year_dir in os.listdir(root):
+        year_match = re.fullmatch(r'year=(\d+)', year_dir)
+        if not year_match or (years is not None and int(year_match.group(1)) not in years):
+            continue
+        for month_dir in os.listdir(os.path.join(root, year_dir)):
+            month_match = re.fullmatch(r'month=(\d+)', month_dir)
+            if month_match:
+                months.append((int(year_match.group(1)), int(month_match.group(1))))
+    return sorted(months)
@@ -0,0 +1,60 @@
+import pandas as pd
+import pyarrow.parquet as pq
+
+from schema import COMPACT_TIME_COLUMNS, compact_month_start, expand_times, enforce_schema
+
+# ------------------------------
+# SHARED PARQUET READER
+# ------------------------------
+# Every stage reads only the columns it needs (columns=) and lets pyarrow skip row groups
+# / rows outside the window it cares about (filters=), instead of materialising whole files.
+
+# Source columns a set of group keys and value columns needs.
+# key_sources maps derived keys (e.g. 'date', 'hour') to the column they come from.
+def required_columns(group_keys, value_cols, key_sources=None):
+    key_sources = key_sources or {}
+    columns = []
+    for col in list(group_keys) + list(value_cols):
+        source = key_sources.get(col, col)
+        if source not in columns:
+            columns.append(source)
+    return columns
+
+# [start, end) on one timestamp column, as pyarrow filters
+def window_filter(column, start, end):
+    return [(column, '>=', pd.Timestamp(start)), (column, '<', pd.Timestamp(end))]
+
+def month_window_filter(column, month_str):
+    start = pd.Timestamp(month_str)
+    return window_filter(column, start, start + pd.DateOffset(months=1))
+
+# Files written with compact times (schema.py) are read through their int32 columns and
+# handed back with normal timestamps; every column comes back in the compact CLEAN_SCHEMA dtype
+def read_parquet(path, columns=None, filters=None):
+    arrow_schema = pq.read_schema(path)
+    month_start = compact_month_start(arrow_schema)
+    if month_start is not None:
+        columns, filters = _to_compact_time(columns, filters, month_start)
+
+    if columns is not None:
+        missing = [c for c in columns if c not in arrow_schema.names]
+        if missing:
+            raise KeyError(f'{path} has no columns {missing}')
+
+    df = pd.read_parquet(path, engine='pyarrow', columns=columns, filters=filters)
+    if month_start is not None:
+        df = expand_times(df, month_start)
+    return enforce_schema(df)
+
+def _to_compact_time(columns, filters, month_start):
+    if columns is not None:
+        columns = list(dict.fromkeys(COMPACT_TIME_COLUMNS.get(c, c) for c in columns))
+    if filters is not None:
+        compact_filters = []
+        for column, op, value in filters:
+            if column in COMPACT_TIME_COLUMNS:
+                column = COMPACT_TIME_COLUMNS[column]
+                value = int((pd.Timestamp(value) - month_start) // pd.Timedelta(seconds=1))
+            compact_filters.append((column, op, value))
+        filters = compact_filters
+    return columns, filters
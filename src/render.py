@@ -0,0 +1,467 @@
+import pandas as pd
+import matplotlib
+import matplotlib.pyplot as plt
+import matplotlib.ticker as mtick
+import matplotlib.dates as mdates
+import seaborn as sns
+import argparse
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from kpi_store import kpi_path, kpi_format, load_kpi
+from state_store import fingerprint
+from paths import PROCESSED_FOLDER, REPORTS_FOLDER, FIGURES_FOLDER, ZONE_LOOKUP_PATH
+
+# ------------------------------
+# REPORT FIGURES
+# ------------------------------
+# The charts of visualize.ipynb, drawn from small plot cubes: the pivots, hour means and
+# Pareto tables each chart needs, a few hundred rows at most. A cube is built once from its
+# KPI tables / reports and cached in processed/plot_cache/ under the fingerprints of those
+# files; a figure is re-rendered only when one of its cubes changed or its PNG is gone.
+# Figures are independent, so --workers renders them in separate processes.
+YEAR = 2019
+CACHE_FOLDER = os.path.join(PROCESSED_FOLDER, 'plot_cache')
+CUBE_MANIFEST = 'cubes.json'
+FIGURE_MANIFEST = 'figures.json'
+RENDER_VERSION = 1   # bump when a cube or a chart changes, so everything is redone
+TOP_ZONES = 50
+
+PAYMENT_LABELS = {
+    0: 'Unknown',
+    1: 'Credit Card',
+    2: 'Cash',
+    3: 'No Charge',
+    4: 'Dispute'
+}
+
+# ============ PLOT CUBES ============#
+def cube_daily():
+    return load_kpi('daily', YEAR, columns=['date', 'trips', 'total_money', 'distance_mean'])
+
+# Revenue per month (rows) and payment type (one column per label)
+def cube_payment_month():
+    df = load_kpi('monthly_payment_type', YEAR, columns=['month', 'payment_type', 'total_money'])
+    cube = df.pivot_table(index='month', columns='payment_type', values='total_money', aggfunc='sum')
+    cube = cube[[p for p in PAYMENT_LABELS if p in cube.columns]].rename(columns=PAYMENT_LABELS)
+    cube.index = cube.index.astype(str)
+    cube.columns.name = None
+    return cube.reset_index()
+
+# Top zones by trips with their cumulative share of all trips, for pickups and dropoffs
+def cube_zone_pareto():
+    lookup = pd.read_csv(ZONE_LOOKUP_PATH)
+    zone_map = dict(zip(lookup['LocationID'], lookup['Zone']))
+    parts = []
+    for side, name, loc_col in [('pickup', 'monthly_pickup', 'PULocationID'),
+                                ('dropoff', 'monthly_dropoff', 'DOLocationID')]:
+        df = load_kpi(name, YEAR, columns=[loc_col, 'trips'])
+        df_agg = df.groupby(loc_col, observed=True)['trips'].sum().sort_values(ascending=False).reset_index()
+        df_agg['cumulative_pct'] = (df_agg['trips'].cumsum() / df_agg['trips'].sum()) * 100
+        df_agg['zone_name'] = df_agg[loc_col].map(zone_map)
+        parts.append(df_agg.head(TOP_ZONES).rename(columns={loc_col: 'LocationID'}).assign(side=side))
+    return pd.concat(parts, ignore_index=True)
+
+def cube_hour_profile():
+    df = load_kpi('hourly', YEAR, columns=['hour', 'speed_mean'])
+    return df.groupby('hour').agg(speed_mean=('speed_mean', 'mean')).reset_index()
+
+def cube_dow_hour():
+    df = load_kpi('hourly', YEAR, columns=['dow', 'hour', 'day', 'trips', 'total_money'])
+    df = df.sort_values(['dow', 'hour'], ignore_index=True)
+    df['hourly_rev'] = df['total_money'] / df['trips']
+    return df
+
+def cube_weekly_duration():
+    return load_kpi('weekly', YEAR, columns=['week_start', 'duration_p50', 'duration_p95'])
+
+# Last 30 days before the forecast
+def cube_forecast_history():
+    hist = pd.read_csv(os.path.join(REPORTS_FOLDER, f'historical_data_{YEAR}.csv'), parse_dates=['date'])
+    return hist.tail(30).reset_index(drop=True)
+
+# Real_Data is added by cal_model_metric.py; until then its line stays empty
+def cube_forecast():
+    pred = pd.read_csv(os.path.join(REPORTS_FOLDER, f'forecast_results_{YEAR + 1}.csv'), parse_dates=['Date'])
+    if 'Real_Data' not in pred.columns:
+        pred['Real_Data'] = float('nan')
+    return pred
+
+# Cube name -> builder and the files it reads: ('kpi', name) is the KPI table load_kpi
+# picks, anything else a path
+CUBES = {
+    'daily': {'build': cube_daily, 'sources': [('kpi', 'daily')]},
+    'payment_month': {'build': cube_payment_month, 'sources': [('kpi', 'monthly_payment_type')]},
+    'zone_pareto': {'build': cube_zone_pareto,
+                    'sources': [('kpi', 'monthly_pickup'), ('kpi', 'monthly_dropoff'), ZONE_LOOKUP_PATH]},
+    'hour_profile': {'build': cube_hour_profile, 'sources': [('kpi', 'hourly')]},
+    'dow_hour': {'build': cube_dow_hour, 'sources': [('kpi', 'hourly')]},
+    'weekly_duration': {'build': cube_weekly_duration, 'sources': [('kpi', 'weekly')]},
+    'forecast_history': {'build': cube_forecast_history,
+                         'sources': [os.path.join(REPORTS_FOLDER, f'historical_data_{YEAR}.csv')]},
+    'forecast': {'build': cube_forecast,
+                 'sources': [os.path.join(REPORTS_FOLDER, f'forecast_results_{YEAR + 1}.csv')]},
+}
+
+def source_path(source):
+    if isinstance(source, tuple):
+        return kpi_path(source[1], YEAR, fmt=kpi_format(source[1], YEAR))
+    if not os.path.exists(source):
+        raise FileNotFoundError(f'No {source}')
+    return source
+
+def _digest(parts):
+    return hashlib.sha256('|'.join(parts).encode()).hexdigest()[:16]
+
+# Key of a cube's current inputs; raises FileNotFoundError when one is missing
+def cube_key(name):
+    paths = [source_path(source) for source in CUBES[name]['sources']]
+    return _digest([f'v{RENDER_VERSION}', name] + [f'{path}={fingerprint(path)}' for path in paths])
+
+def load_manifest(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+def save_manifest(manifest, path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+# Cubes by name with their keys, from the cache when their inputs did not change
+def load_cubes(names, cache_folder=CACHE_FOLDER, rebuild=False):
+    manifest_path = os.path.join(cache_folder, CUBE_MANIFEST)
+    manifest = load_manifest(manifest_path)
+    cubes, keys = {}, {}
+    for name in names:
+        key = cube_key(name)
+        path = os.path.join(cache_folder, f'{name}.parquet')
+        if not rebuild and manifest.get(name) == key and os.path.exists(path):
+            cubes[name] = pd.read_parquet(path)
+        else:
+            cubes[name] = CUBES[name]['build']()
+            os.makedirs(cache_folder, exist_ok=True)
+            cubes[name].to_parquet(path, index=False)
+            manifest[name] = key
+        keys[name] = key
+    save_manifest(manifest, manifest_path)
+    return cubes, keys
+
+# ============ FIGURES ============#
+def draw_daily_revenue(cubes):
+    df_plot = cubes['daily'].set_index('date')[['total_money']]
+    fig, ax = plt.subplots(figsize=(20, 6))
+    df_plot.plot(kind='line', color='green', linewidth=2, ax=ax, legend=False)
+    ax.set_xlim(pd.Timestamp(f'{YEAR}-01-01'), pd.Timestamp(f'{YEAR}-12-31'))
+    ax.set_title(f'Total Revenue per Day ({YEAR})', fontsize=16)
+    ax.set_ylabel('Total Daily Revenue ($)', fontsize=12)
+    ax.set_xlabel('Month', fontsize=12)
+    ax.grid(True)
+    return fig
+
+def draw_daily_trips_revenue(cubes):
+    df = cubes['daily']
+    fig, ax = plt.subplots(2, 1, figsize=(20, 12))
+    for axis, col, color, title, label in [
+        (ax[0], 'trips', 'orange', 'Total Trips per Day', 'Total Daily Trips'),
+        (ax[1], 'total_money', 'green', 'Total Revenue per Day', 'Total Daily Revenue ($)'),
+    ]:
+        axis.plot(df['date'], df[col], color=color, linewidth=2)
+        axis.set_xlim(pd.Timestamp(f'{YEAR}-01-01'), pd.Timestamp(f'{YEAR}-12-31'))
+        axis.set_title(f'{title} ({YEAR})', fontsize=16)
+        axis.set_ylabel(label, fontsize=12)
+        axis.grid(True)
+    return fig
+
+# Same as above on a dual axis
+def draw_revenue_vs_trip(cubes):
+    df = cubes['daily']
+    fig, ax1 = plt.subplots(figsize=(20, 8))
+
+    ax1.set_xlabel('Date')
+    ax1.set_ylabel('Total Revenue ($)', color='darkgreen', fontsize=14)
+    ax1.plot(df['date'], df['total_money'], color='darkgreen', linewidth=2, linestyle='-')
+    ax1.tick_params(axis='y', labelcolor='darkgreen')
+    ax1.yaxis.set_major_formatter(mtick.StrMethodFormatter('${x:,.0f}'))
+
+    ax2 = ax1.twinx()
+    ax2.set_ylabel('Total Trips', color='orange', fontsize=14)
+    ax2.plot(df['date'], df['trips'], color='orange', linewidth=2, linestyle='--')
+    ax2.tick_params(axis='y', labelcolor='orange')
+    ax2.yaxis.set_major_formatter(mtick.StrMethodFormatter('{x:,.0f}'))
+
+    ax2.set_title(f'Daily Revenue vs. Trip Volume ({YEAR})', fontsize=16)
+    ax1.set_xlim(pd.Timestamp(f'{YEAR}-01-01'), pd.Timestamp(f'{YEAR}-12-31'))
+    ax1.xaxis.set_major_locator(mdates.MonthLocator())
+    ax1.xaxis.set_major_formatter(mdates.DateFormatter('%b'))
+    return fig
+
+def draw_payment_type_month(cubes):
+    df = cubes['payment_month']
+    fig, ax = plt.subplots(figsize=(14, 8))
+    for label in df.columns.drop('month'):
+        ax.plot(df['month'], df[label], marker='o', label=label)
+
+    ax.set_title('Trip Volume by Payment Type per Month')
+    ax.set_yscale('log')
+    ax.set_ylabel('Number of Trips')
+    ax.set_xticks(range(len(df)), labels=[pd.Period(m).strftime('%b') for m in df['month']])
+    ax.set_xlabel('Month')
+    ax.legend()
+    ax.grid(True, which='both', alpha=0.2)
+    return fig
+
+def plot_pareto(ax, df, title):
+    x_positions = range(len(df))
+
+    # Bar Chart (Left Axis)
+    ax.bar(x_positions, df['trips'], color='steelblue', alpha=0.7, label='Volume')
+    ax.set_ylabel('Total Trips', color='steelblue', fontsize=12)
+    ax.tick_params(axis='y', labelcolor='steelblue')
+
+    # Line Chart (Right Axis)
+    ax2 = ax.twinx()
+    ax2.plot(x_positions, df['cumulative_pct'], color='crimson', marker='o', markersize=3, linewidth=2)
+    ax2.set_ylabel('Cumulative %', color='crimson', fontsize=12)
+    ax2.tick_params(axis='y', labelcolor='crimson')
+    ax2.set_ylim(0, 100)
+    ax2.yaxis.set_major_formatter(mtick.PercentFormatter())
+    ax2.axhline(50, color='gray', linestyle='--', linewidth=1, alpha=0.5)
+
+    ax.set_title(title, fontsize=16)
+    ax.set_xticks(x_positions)
+    ax.set_xticklabels(df['zone_name'], rotation=90, fontsize=8, ha='center')
+    ax.set_xlim(-0.5, len(df) - 0.5)   # Remove gaps at edges
+
+def draw_zone_pareto(cubes):
+    df = cubes['zone_pareto']
+    fig, axes = plt.subplots(2, 1, figsize=(24, 18))
+    plot_pareto(axes[0], df[df['side'] == 'pickup'], f'Top {TOP_ZONES} Pickup Zones by Total Trips ({YEAR})')
+    plot_pareto(axes[1], df[df['side'] == 'dropoff'], f'Top {TOP_ZONES} Dropoff Zones by Total Trips ({YEAR})')
+    fig.subplots_adjust(bottom=0.2, hspace=0.5)   # Make room for labels
+    return fig
+
+def draw_speed_per_hour(cubes):
+    fig, ax = plt.subplots(figsize=(20, 6))
+    cubes['hour_profile'].plot(kind='line', x='hour', y='speed_mean', color='orangered', linewidth=2, ax=ax, legend=False)
+    ax.set_title(f'Speed Mean per Hour ({YEAR})', fontsize=16)
+    ax.grid(True, alpha=0.2)
+    ax.set_ylabel('Speed (mph)', fontsize=12)
+    ax.set_xlabel(None)
+    ax.set_xticks(ticks=range(24), labels=[f'{h:02d}:00' for h in range(24)])
+    ax.set_xlim(0, 23)
+    return fig
+
+def draw_trips_per_dow(cubes):
+    df = cubes['dow_hour']
+    fig, ax = plt.subplots(figsize=(20, 6))
+    df.plot(kind='bar', x='dow', y='trips', color='blue', width=0.5, ax=ax, legend=False)
+    ax.set_title(f'Trips per Day of the Week ({YEAR})', fontsize=16)
+    ax.grid(True, alpha=0.2)
+    ax.set_ylabel('Number of Trips', fontsize=12)
+    ax.set_xlabel(None)
+    ax.set_xticks(ticks=[24 * i for i in range(7)], labels=list(df['day'].unique()), rotation=0)
+    return fig
+
+def draw_rev_vs_trip_hour(cubes):
+    df = cubes['dow_hour']
+    days = list(df['day'].unique())
+    fig, ax = plt.subplots(2, 1, figsize=(18, 12))
+    for axis, col, cmap, label, title in [
+        (ax[0], 'hourly_rev', 'Greens', 'Avg. $/Trip', 'Revenue per Trip'),
+        (ax[1], 'trips', 'Blues', 'Number of Trips/Hour', 'Trips per Hour'),
+    ]:
+        df_plot = df.pivot(index='day', columns='hour', values=col).reindex(days)
+        sns.heatmap(df_plot, ax=axis, cmap=cmap, linewidths=0.5, cbar_kws={'label': label})
+        axis.set_title(title, fontsize=16)
+        axis.set_ylabel(None)
+        axis.set_xlabel('Hour of Day')
+    fig.suptitle('Heatmap of Revenue per Trip vs Number of Trips per Hour', fontsize=24, y=0.95)
+    return fig
+
+def draw_daily_distance_mean(cubes):
+    df = cubes['daily']
+    fig, ax = plt.subplots(figsize=(10, 6))
+    sns.histplot(df['distance_mean'], bins=36, color='darkblue', stat='density', alpha=0.5, ax=ax)
+    sns.kdeplot(df['distance_mean'], color='orange', linewidth=2, ax=ax)
+    ax.set_title('Distribution of Daily Distance Mean', fontsize=16)
+    ax.set_xlabel('Distance (Miles)')
+    return fig
+
+def draw_duration_p50_vs_p95(cubes):
+    df = cubes['weekly_duration']
+    fig, ax = plt.subplots(figsize=(16, 6))
+    ax.plot(df['week_start'], df['duration_p50'], color='blue', linewidth=2, label='Typical Trip (Median)')
+    ax.plot(df['week_start'], df['duration_p95'], color='crimson', linewidth=2, linestyle='--', label='Bad Traffic (P95)')
+    ax.fill_between(df['week_start'], df['duration_p50'], df['duration_p95'], color='crimson', alpha=0.2)
+
+    ax.set_title(f'Trip Duration: Normal vs. Extreme ({YEAR})', fontsize=18)
+    ax.set_ylabel('Trip Duration (Minutes)', fontsize=12)
+    ax.set_xlim(pd.Timestamp(f'{YEAR}-01-01'), pd.Timestamp(f'{YEAR}-12-31'))
+    ax.xaxis.set_major_locator(mdates.MonthLocator())
+    ax.xaxis.set_major_formatter(mdates.DateFormatter('%b'))
+    ax.legend(loc='upper left', fontsize=12)
+    ax.grid(True, alpha=0.2)
+    return fig
+
+# (column, label, color, linestyle) of every forecast model
+MODEL_LINES = [
+    ('Baseline', 'Baseline', 'blue', '--'),
+    ('Linear_Reg', 'Linear Regression', 'orange', '-.'),
+    ('ARIMA', 'ARIMA', 'red', ':'),
+]
+
+def draw_forecast(cubes):
+    hist = cubes['forecast_history'].set_index('date')
+    pred = cubes['forecast'].set_index('Date')
+    fig, ax = plt.subplots(figsize=(18, 10))
+
+    ax.plot(hist.index, hist['Historical'], label='Historical', color='black', linewidth=2)
+    for col, label, color, linestyle in MODEL_LINES:
+        ax.plot(pred.index, pred[col], label=label, color=color, linestyle=linestyle, linewidth=2)
+    ax.plot(pred.index, pred['Real_Data'], label='Real Data', color='green', linestyle='-', linewidth=2)
+
+    ax.set_title(f'NYC Taxi Forecast - {YEAR}', fontsize=16, fontweight='bold')
+    ax.set_xlabel('Date')
+    ax.set_ylabel('Trips per Day')
+    ax.legend()
+    ax.grid(True, alpha=0.3)
+    ax.axvline(x=hist.index[-1], color='gray', linestyle='--', alpha=0.7)
+    ax.tick_params(axis='x', labelrotation=45)
+    return fig
+
+def draw_forecast_faceted(cubes):
+    pred = cubes['forecast'].set_index('Date')
+    fig, axes = plt.subplots(3, 1, figsize=(18, 15), sharex=True, sharey=True)
+    for i, (ax, (col, label, color, linestyle)) in enumerate(zip(axes, MODEL_LINES)):
+        ax.plot(pred.index, pred['Real_Data'], color='green', alpha=0.7, linewidth=3, label='Real Data')
+        ax.plot(pred.index, pred[col], color=color, linestyle=linestyle, linewidth=2, label=label)
+        ax.set_title(f'Model {i + 1}: {label} vs. Reality', fontweight='bold')
+        ax.legend(loc='upper right')
+        ax.grid(True, alpha=0.3)
+
+    fig.suptitle(f'Model Performance Breakdown ({YEAR + 1})', fontsize=28, y=0.93)
+    axes[-1].set_xlabel(None)
+    fig.text(0.06, 0.5, 'Trips per Day', va='center', rotation='vertical', fontsize=12)
+    return fig
+
+# Figure name (figures/<name>.png) -> cubes it reads, how it is drawn and savefig options
+SAVE_HIRES = {'dpi': 200, 'bbox_inches': 'tight'}
+FIGURES = {
+    'daily_revenue': {'cubes': ['daily'], 'draw': draw_daily_revenue},
+    'daily_trips_revenue': {'cubes': ['daily'], 'draw': draw_daily_trips_revenue},
+    'revenue_vs_trip': {'cubes': ['daily'], 'draw': draw_revenue_vs_trip},
+    'trip_payment_type_month': {'cubes': ['payment_month'], 'draw': draw_payment_type_month},
+    'pu_do_zones_by_total_trips': {'cubes': ['zone_pareto'], 'draw': draw_zone_pareto},
+    'speed_mean_per_hour': {'cubes': ['hour_profile'], 'draw': draw_speed_per_hour},
+    'trip_per_dow': {'cubes': ['dow_hour'], 'draw': draw_trips_per_dow},
+    'rev_vs_trip_hour': {'cubes': ['dow_hour'], 'draw': draw_rev_vs_trip_hour},
+    'daily_distance_mean': {'cubes': ['daily'], 'draw': draw_daily_distance_mean},
+    'duration_p50_vs_p95': {'cubes': ['weekly_duration'], 'draw': draw_duration_p50_vs_p95},
+    f'forecast_plot_{YEAR}': {'cubes': ['forecast_history', 'forecast'], 'draw': draw_forecast, 'save': SAVE_HIRES},
+    f'forecast_faceted_{YEAR + 1}': {'cubes': ['forecast'], 'draw': draw_forecast_faceted, 'save': SAVE_HIRES},
+}
+
+# For the notebook: draw one figure from the cached cubes, without saving it
+def figure(name, cache_folder=CACHE_FOLDER):
+    cubes, _ = load_cubes(FIGURES[name]['cubes'], cache_folder)
+    return FIGURES[name]['draw'](cubes)
+
+# Runs in a worker process when --workers > 1
+def render_figure(name, cubes, folder=FIGURES_FOLDER):
+    start = time.perf_counter()
+    spec = FIGURES[name]
+    fig = spec['draw'](cubes)
+    path = os.path.join(folder, f'{name}.png')
+    fig.savefig(path, **spec.get('save', {}))
+    plt.close(fig)
+    return time.perf_counter() - start
+
+# Renders the figures whose cubes changed since their last render; returns
+# name -> (status, seconds) for every figure asked for
+def render_all(names=None, workers=1, force=False, folder=FIGURES_FOLDER, cache_folder=CACHE_FOLDER):
+    names = names or list(FIGURES)
+    cube_names = list(dict.fromkeys(c for name in names for c in FIGURES[name]['cubes']))
+
+    # Cubes whose inputs are missing only skip the figures that use them
+    cubes, keys = {}, {}
+    for cube in cube_names:
+        try:
+            loaded, loaded_keys = load_cubes([cube], cache_folder, rebuild=force)
+        except FileNotFoundError as e:
+            print(f'[{cube}] skipped: {e}')
+            continue
+        cubes.update(loaded)
+        keys.update(loaded_keys)
+
+    manifest_path = os.path.join(cache_folder, FIGURE_MANIFEST)
+    manifest = load_manifest(manifest_path)
+    results, todo = {}, {}
+    for name in names:
+        if any(cube not in keys for cube in FIGURES[name]['cubes']):
+            results[name] = ('missing inputs', 0.0)
+            continue
+        key = _digest([name] + [keys[cube] for cube in FIGURES[name]['cubes']])
+        path = os.path.join(folder, f'{name}.png')
+        if not force and manifest.get(name) == key and os.path.exists(path):
+            results[name] = ('fresh', 0.0)
+        else:
+            todo[name] = key
+
+    def collect(name, get_seconds):
+        try:
+            results[name] = ('rendered', get_seconds())
+            manifest[name] = todo[name]
+            print(f'[{name}] rendered in {results[name][1]:.1f}s')
+        except Exception as e:
+            results[name] = ('failed', 0.0)
+            print(f'[{name}] FAILED: {e!r}')
+
+    os.makedirs(folder, exist_ok=True)
+    if workers > 1 and len(todo) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                pool.submit(render_figure, name, {c: cubes[c] for c in FIGURES[name]['cubes']}, folder): name
+                for name in todo
+            }
+            for future in as_completed(futures):
+                collect(futures[future], future.result)
+    else:
+        for name in todo:
+            collect(name, lambda: render_figure(name, cubes, folder))
+
+    save_manifest(manifest, manifest_path)
+    return {name: results[name] for name in names}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Render the report figures whose KPI inputs changed.')
+    parser.add_argument('figures', nargs='*', metavar='FIGURE',
+                        help=f'Figures to render (default: all): {", ".join(FIGURES)}')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Number of figures to render at the same time (default: 1)')
+    parser.add_argument('--force', action='store_true', help='Rebuild every cube and re-render every figure')
+    args = parser.parse_args(argv)
+
+    if args.workers < 1:
+        parser.error('--workers must be at least 1')
+    unknown = [name for name in args.figures if name not in FIGURES]
+    if unknown:
+        parser.error(f'Unknown figure(s): {" ".join(unknown)} (choose from {", ".join(FIGURES)})')
+
+    matplotlib.use('Agg')
+    results = render_all(args.figures, args.workers, args.force)
+
+    print('\nFigure                         Status          Time')
+    for name, (status, seconds) in results.items():
+        print(f'{name:<30} {status:<15} {seconds:6.1f}s')
+    if any(status == 'failed' for status, _ in results.values()):
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+import pandas as pd
+import pyarrow as pa
+
+# ------------------------------
+# COMPACT SCHEMA OF CLEANED TRIPS
+# ------------------------------
+# Narrowest dtype that holds every value a row can have once it passed the QA rules
+# (e.g. location IDs 1-265, payment type 0-4, passenger count 0-9).
+CLEAN_SCHEMA = {
+    'VendorID': 'int8',
+    'tpep_pickup_datetime': 'datetime64[us]',
+    'tpep_dropoff_datetime': 'datetime64[us]',
+    'passenger_count': 'int8',
+    'trip_distance': 'float32',
+    'RatecodeID': 'int8',
+    'store_and_fwd_flag': pd.CategoricalDtype(['N', 'Y']),   # dictionary-encoded in parquet
+    'PULocationID': 'uint16',
+    'DOLocationID': 'uint16',
+    'payment_type': 'int8',
+    'fare_amount': 'float32',
+    'extra': 'float32',
+    'mta_tax': 'float32',
+    'tip_amount': 'float32',
+    'tolls_amount': 'float32',
+    'improvement_surcharge': 'float32',
+    'total_amount': 'float32',
+    'congestion_surcharge': 'float32',
+    'airport_fee': 'float32',
+    'trip_duration': 'float32',
+    'avg_speed': 'float32',
+}
+
+# Integer columns a service does not report (all NaN, see services.py) stay nullable
+def _nullable(dtype):
+    return 'UInt' + dtype[4:] if dtype.startswith('uint') else dtype.capitalize()
+
+def enforce_schema(df):
+    casts = {}
+    for col, dtype in CLEAN_SCHEMA.items():
+        if col not in df.columns or df[col].dtype == dtype:
+            continue
+        if isinstance(dtype, str) and dtype.startswith(('int', 'uint')) and df[col].isna().any():
+            dtype = _nullable(dtype)
+        casts[col] = dtype
+    return df.astype(casts) if casts else df
+
+
+# ------------------------------
+# OPTIONAL: TIMESTAMPS AS INT32 SECONDS INTO THE MONTH
+# ------------------------------
+# Halves the two timestamp columns. The month start is kept in the parquet schema
+# metadata, and reader.read_parquet turns the columns back into timestamps.
+COMPACT_TIME_COLUMNS = {
+    'tpep_pickup_datetime': 'tpep_pickup_seconds',
+    'tpep_dropoff_datetime': 'tpep_dropoff_seconds',
+}
+MONTH_START_KEY = b'month_start'
+
+def compact_times(df, month_str):
+    month_start = pd.Timestamp(month_str)
+    for col, compact_col in COMPACT_TIME_COLUMNS.items():
+        if col in df.columns:
+            seconds = (df[col] - month_start) // pd.Timedelta(seconds=1)
+            df = df.drop(columns=col).assign(**{compact_col: seconds.astype('int32')})
+    return df
+
+def expand_times(df, month_start):
+    for col, compact_col in COMPACT_TIME_COLUMNS.items():
+        if compact_col in df.columns:
+            times = month_start + pd.to_timedelta(df[compact_col].astype('int64'), unit='s')
+            df = df.drop(columns=compact_col).assign(**{col: times.astype(CLEAN_SCHEMA[col])})
+    return df
+
+# Month start of a file written with compact times, else None
+def compact_month_start(arrow_schema):
+    metadata = arrow_schema.metadata or {}
+    if MONTH_START_KEY not in metadata:
+        return None
+    return pd.Timestamp(metadata[MONTH_START_KEY].decode())
+
+# Cleaned month -> arrow table in the compact schema (optionally with compact times)
+def to_arrow(df, month_str=None, compact_time=False):
+    df = enforce_schema(df)
+    if compact_time:
+        df = compact_times(df, month_str)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    if compact_time:
+        metadata = dict(table.schema.metadata or {})
+        metadata[MONTH_START_KEY] = str(pd.Timestamp(month_str)).encode()
+        table = table.replace_schema_metadata(metadata)
+    return table
@@ -0,0 +1,104 @@
+import argparse
+import glob
+import os
+import re
+
+from paths import RAW_FOLDER
+
+# ------------------------------
+# TLC SERVICES
+# ------------------------------
+# Every service is read into the one clean schema of schema.py (the yellow column names):
+#   prefix   raw files are <prefix>_<YYYY-MM>.parquet in raw/
+#   columns  raw name -> pipeline name, applied as soon as a file is read
+#   rules    QA rules (qa_rules.py) that apply; None = all of them
+#   fill     columns the service does not have, added with this value so the rules and
+#            aggregations that read them still run. They skip clean_data's default fills,
+#            so a NaN column stays NaN and its KPI columns come out NaN (not reported)
+# Outputs of the default service keep their old names; the others get the service name
+# after the output name (kpi_daily_green_2019, qa_summary_green.csv, ...).
+PICKUP_COLUMN = 'tpep_pickup_datetime'
+DROPOFF_COLUMN = 'tpep_dropoff_datetime'
+DEFAULT_SERVICE = 'yellow'
+DEFAULT_YEARS = [2019]
+
+SERVICES = {
+    'yellow': {
+        'prefix': 'yellow_tripdata',
+        'columns': {},
+        'rules': None,
+        'fill': {},
+    },
+    'green': {
+        'prefix': 'green_tripdata',
+        'columns': {'lpep_pickup_datetime': PICKUP_COLUMN, 'lpep_dropoff_datetime': DROPOFF_COLUMN},
+        'rules': None,
+        'fill': {'airport_fee': 0},
+    },
+    'fhv': {
+        'prefix': 'fhv_tripdata',
+        'columns': {'pickup_datetime': PICKUP_COLUMN, 'dropOff_datetime': DROPOFF_COLUMN,
+                    'PUlocationID': 'PULocationID', 'DOlocationID': 'DOLocationID'},
+        'rules': ['qa_dropoff_after_pickup', 'qa_timedate', 'qa_duration', 'qa_locationID'],
+        'fill': {'payment_type': 0, 'trip_distance': float('nan'), 'total_amount': float('nan'),
+                 'passenger_count': float('nan'), 'avg_speed': float('nan')},
+    },
+}
+
+def service_config(service):
+    if service not in SERVICES:
+        raise KeyError(f'Unknown service: {service} (choose from {", ".join(SERVICES)})')
+    return SERVICES[service]
+
+def raw_path(service, year, month, folder=RAW_FOLDER):
+    return os.path.join(folder, f"{service_config(service)['prefix']}_{year}-{month:02d}.parquet")
+
+# Raw files of the service in the given years, in month order
+def raw_files(service, years, folder=RAW_FOLDER):
+    prefix = service_config(service)['prefix']
+    files = []
+    for year in sorted(years):
+        files += sorted(glob.glob(os.path.join(folder, f'{prefix}_{year}-*.parquet')))
+    return files
+
+# Glob pattern of the service's files of one year, raw (clean=False) or cleaned
+def file_pattern(service, year, folder, clean=False):
+    return os.path.join(folder, f"{'clean_' if clean else ''}{service_config(service)['prefix']}_{year}-*.parquet")
+
+def output_name(name, service=DEFAULT_SERVICE, year=None):
+    parts = [name] + ([service] if service != DEFAULT_SERVICE else []) + ([str(year)] if year is not None else [])
+    return '_'.join(parts)
+
+# Name under which kpi_store keeps the service's KPI table (it adds kpi_ and the year)
+def kpi_name(name, service=DEFAULT_SERVICE):
+    return output_name(name, service)
+
+# Raw columns renamed to the pipeline's names
+def rename_frame(df, service):
+    mapping = service_config(service)['columns']
+    return df.rename(columns=mapping) if mapping else df
+
+# Pipeline column names -> the service's raw names, to read only some raw columns
+def source_columns(columns, service):
+    reverse = {new: old for old, new in service_config(service)['columns'].items()}
+    return [reverse.get(c, c) for c in columns]
+
+# '2019', '2019-2024' or '2019,2021' -> sorted list of years (argparse type)
+def parse_years(value):
+    years = set()
+    for part in value.split(','):
+        match = re.fullmatch(r'(\d{4})(?:-(\d{4}))?', part.strip())
+        if not match:
+            raise argparse.ArgumentTypeError(f'Not a year or year range: {part}')
+        first, last = int(match.group(1)), int(match.group(2) or match.group(1))
+        if last < first:
+            raise argparse.ArgumentTypeError(f'Year range ends before it starts: {part}')
+        years.update(range(first, last + 1))
+    return sorted(years)
+
+# --years / --service, shared by every stage script
+def add_service_arguments(parser, years_help='Years to process', default_years=DEFAULT_YEARS):
+    parser.add_argument('--years', type=parse_years, default=default_years,
+                        help=f"{years_help}: 2019, 2019-2024 or 2019,2021 (default: {','.join(map(str, default_years))})")
+    parser.add_argument('--service', choices=list(SERVICES), default=DEFAULT_SERVICE,
+                        help=f'TLC service of the raw files (default: {DEFAULT_SERVICE})')
@@ -0,0 +1,172 @@
+import numpy as np
+import pandas as pd
+import struct
+import zlib
+
+# ------------------------------
+# MERGEABLE QUANTILE SKETCH
+# ------------------------------
+# Log-bucket sketch (DDSketch style). A value x > 0 goes to bucket ceil(log_gamma(x)) with
+# gamma = (1 + alpha) / (1 - alpha); the bucket's representative value is within `alpha`
+# relative error of every value in it. So a quantile read from the sketch is within
+# alpha of the true order statistic, whatever the group size, and merging two sketches
+# is just adding bucket counts. Values <= 0 share one zero bucket (reported as 0).
+DEFAULT_ALPHA = 0.01
+ZERO_BUCKET = np.iinfo(np.int32).min
+
+def _gamma(alpha):
+    if not 0 < alpha < 1:
+        raise ValueError(f'Sketch alpha must be between 0 and 1, got {alpha}')
+    return (1 + alpha) / (1 - alpha)
+
+def to_bucket(values, alpha=DEFAULT_ALPHA):
+    values = np.asarray(values, dtype='float64')
+    buckets = np.full(len(values), ZERO_BUCKET, dtype='int32')
+    positive = values > 0
+    buckets[positive] = np.ceil(np.log(values[positive]) / np.log(_gamma(alpha)))
+    return buckets
+
+def bucket_value(buckets, alpha=DEFAULT_ALPHA):
+    gamma = _gamma(alpha)
+    buckets = np.asarray(buckets)
+    return np.where(buckets == ZERO_BUCKET, 0.0, 2 * gamma ** buckets.astype('float64') / (gamma + 1))
+
+# Index of the first bucket whose cumulative count passes rank q * (n - 1),
+# the same rank Series.quantile interpolates at
+def _rank_position(cum_counts, total, q):
+    return np.searchsorted(cum_counts, q * (total - 1), side='right')
+
+
+class QuantileSketch:
+    def __init__(self, alpha=DEFAULT_ALPHA):
+        self.alpha = alpha
+        self.zero_count = 0
+        self.offset = 0                              # bucket id of counts[0]
+        self.counts = np.zeros(0, dtype='int64')    # dense counts for buckets offset..offset+len-1
+
+    @property
+    def count(self):
+        return int(self.zero_count + self.counts.sum())
+
+    def add(self, values):
+        buckets = to_bucket(values, self.alpha)
+        self.zero_count += int((buckets == ZERO_BUCKET).sum())
+        buckets = buckets[buckets != ZERO_BUCKET]
+        if len(buckets):
+            self._add_counts(int(buckets.min()), np.bincount(buckets - buckets.min()))
+        return self
+
+    def merge(self, other):
+        if other.alpha != self.alpha:
+            raise ValueError(f'Cannot merge sketches with alpha {self.alpha} and {other.alpha}')
+        self.zero_count += other.zero_count
+        if len(other.counts):
+            self._add_counts(other.offset, other.counts)
+        return self
+
+    def _add_counts(self, offset, counts):
+        if not len(self.counts):
+            self.offset, self.counts = offset, counts.astype('int64')
+            return
+        low = min(self.offset, offset)
+        high = max(self.offset + len(self.counts), offset + len(counts))
+        merged = np.zeros(high - low, dtype='int64')
+        merged[self.offset - low:self.offset - low + len(self.counts)] += self.counts
+        merged[offset - low:offset - low + len(counts)] += counts
+        self.offset, self.counts = low, merged
+
+    def quantile(self, q):
+        total = self.count
+        if total == 0:
+            return np.nan
+        cum = np.concatenate([[self.zero_count], self.zero_count + np.cumsum(self.counts)])
+        pos = _rank_position(cum, total, q)
+        if pos == 0:
+            return 0.0
+        return float(bucket_value(self.offset + pos - 1, self.alpha))
+
+    # Compact form: header + zlib of the dense counts (narrowest unsigned int that fits)
+    def to_bytes(self):
+        width = 4 if not len(self.counts) or self.counts.max() < 2 ** 32 else 8
+        counts = self.counts.astype('<u4' if width == 4 else '<u8')
+        header = struct.pack('<dqiiB', self.alpha, self.zero_count, self.offset, len(counts), width)
+        return header + zlib.compress(counts.tobytes())
+
+    @classmethod
+    def from_bytes(cls, data):
+        size = struct.calcsize('<dqiiB')
+        alpha, zero_count, offset, n, width = struct.unpack('<dqiiB', data[:size])
+        sketch = cls(alpha)
+        sketch.zero_count = zero_count
+        sketch.offset = offset
+        sketch.counts = np.frombuffer(zlib.decompress(data[size:]), dtype='<u4' if width == 4 else '<u8').astype('int64')
+        assert len(sketch.counts) == n
+        return sketch
+
+
+# ------------------------------
+# MANY SKETCHES AT ONCE (one per group)
+# ------------------------------
+# Grouped sketches are kept as a long Series of counts indexed by group keys + ['bucket'],
+# which merges with a plain groupby-sum and stores as a small table.
+
+# Number of rows per (group, bucket) pair, non-empty pairs only.
+# Buckets are shifted to start at 1 (0 = the zero bucket) so each pair is one cell of a
+# groups x buckets grid. A grid no bigger than the rows is counted densely with one
+# bincount; a bigger one (many groups, e.g. the od bases) would be mostly empty, so only
+# the cells that occur are counted (np.unique), in the same cell order.
+def count_group_buckets(codes, buckets, n_groups):
+    positive = buckets != ZERO_BUCKET
+    low = buckets[positive].min() if positive.any() else 0
+    span = (buckets[positive].max() - low + 2) if positive.any() else 1
+
+    slots = np.where(positive, buckets.astype('int64') - low + 1, 0)
+    keys = codes * span + slots
+    if n_groups * span <= len(keys):
+        counts = np.bincount(keys, minlength=n_groups * span)
+        cells = np.flatnonzero(counts)
+        counts = counts[cells]
+    else:
+        cells, counts = np.unique(keys, return_counts=True)
+
+    slot_ids = cells % span
+    bucket_ids = np.where(slot_ids == 0, ZERO_BUCKET, slot_ids + low - 1).astype('int32')
+    return cells // span, bucket_ids, counts
+
+def grouped_sketches(codes, group_index, buckets):
+    group_ids, bucket_ids, counts = count_group_buckets(codes, buckets, len(group_index))
+    index = group_index[group_ids]
+    if not isinstance(index, pd.MultiIndex):
+        index = pd.MultiIndex.from_arrays([index])
+    index = pd.MultiIndex.from_arrays(
+        [index.get_level_values(i) for i in range(index.nlevels)] + [bucket_ids],
+        names=list(group_index.names) + ['bucket']
+    )
+    return pd.Series(counts, index=index)
+
+def merge_grouped_sketches(counts_list):
+    counts = pd.concat(counts_list)
+    return counts.groupby(level=list(range(counts.index.nlevels))).sum()
+
+# One quantile per group from a grouped-sketch Series
+def grouped_quantile(counts, q, alpha=DEFAULT_ALPHA):
+    group_cols = list(counts.index.names[:-1])
+    counts = counts.sort_index().reset_index(name='n')
+    cum = counts.groupby(group_cols, sort=False)['n'].cumsum()
+    total = counts.groupby(group_cols, sort=False)['n'].transform('sum')
+
+    hit = counts[cum > q * (total - 1)]
+    first = hit.groupby(group_cols)['bucket'].first()
+    return pd.Series(bucket_value(first.to_numpy(), alpha), index=first.index)
+
+# One group's buckets as a QuantileSketch (e.g. to ship or store a single sketch)
+def sketch_from_counts(buckets, counts, alpha=DEFAULT_ALPHA):
+    buckets = np.asarray(buckets)
+    counts = np.asarray(counts, dtype='int64')
+    sketch = QuantileSketch(alpha)
+    zero = buckets == ZERO_BUCKET
+    sketch.zero_count = int(counts[zero].sum())
+    if (~zero).any():
+        low = int(buckets[~zero].min())
+        sketch._add_counts(low, np.bincount(buckets[~zero] - low, weights=counts[~zero]).astype('int64'))
+    return sketch
@@ -0,0 +1,96 @@
+import pandas as pd
+import hashlib
+import json
+import os
+
+from paths import PROCESSED_FOLDER
+
+# ------------------------------
+# PER-MONTH PARTIAL-STATE STORE
+# ------------------------------
+# processed/agg_state/<source file name>/ holds the mergeable states aggregate.py built
+# from one cleaned file, plus a manifest with the file's fingerprint. A re-run reuses the
+# stored states when the fingerprint still matches and only rescans changed files.
+STATE_FOLDER = os.path.join(PROCESSED_FOLDER, 'agg_state')
+MANIFEST = 'manifest.json'
+
+# 'mtime' is free (size + modification time); 'hash' reads the file once (sha256).
+# A directory (one dataset partition) is fingerprinted from all the files in it.
+def fingerprint(path, method='mtime'):
+    if os.path.isdir(path):
+        parts = []
+        for dirpath, _, filenames in sorted(os.walk(path)):
+            for filename in sorted(filenames):
+                file_path = os.path.join(dirpath, filename)
+                parts.append(f'{os.path.relpath(file_path, path)}={fingerprint(file_path, method)}')
+        return hashlib.sha256('|'.join(parts).encode()).hexdigest()
+    if method == 'mtime':
+        stat = os.stat(path)
+        return f'mtime:{stat.st_size}:{stat.st_mtime_ns}'
+    if method == 'hash':
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+        return f'sha256:{digest.hexdigest()}'
+    raise ValueError(f'Unknown fingerprint method: {method}')
+
+# name defaults to the source file name; dataset partitions pass their own
+def state_dir(source_path, folder=STATE_FOLDER, name=None):
+    name = name or os.path.basename(source_path).replace('.parquet', '')
+    return os.path.join(folder, name)
+
+# states: {base name: state dict from aggregate.apply_agg}
+def save_month_states(source_path, source_fingerprint, states, folder=STATE_FOLDER, name=None):
+    out_dir = state_dir(source_path, folder, name)
+    os.makedirs(out_dir, exist_ok=True)
+    manifest_path = os.path.join(out_dir, MANIFEST)
+    if os.path.exists(manifest_path):
+        os.remove(manifest_path)
+
+    manifest = {'source': source_path, 'fingerprint': source_fingerprint, 'bases': {}}
+    for base, state in states.items():
+        state['sums'].reset_index().to_parquet(os.path.join(out_dir, f'{base}_sums.parquet'), index=False)
+        for col, counts in state['sketches'].items():
+            counts.rename('n').reset_index().to_parquet(
+                os.path.join(out_dir, f'{base}_{col}_sketch.parquet'), index=False
+            )
+        manifest['bases'][base] = {
+            'keys': list(state['sums'].index.names),
+            'sketch_cols': list(state['sketches']),
+            'alpha': state['alpha'],
+        }
+
+    # Manifest last: a half-written state dir has no valid manifest and is recomputed
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+# Stored states for source_path, or None if missing or built from another version of
+# the file / with other keys, sketch columns or alpha.
+# base_keys / sketch_cols: {base name: group keys} / {base name: sketched columns}
+def load_month_states(source_path, source_fingerprint, base_keys, sketch_cols, alpha, folder=STATE_FOLDER, name=None):
+    in_dir = state_dir(source_path, folder, name)
+    manifest_path = os.path.join(in_dir, MANIFEST)
+    if not os.path.exists(manifest_path):
+        return None
+
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    if manifest.get('fingerprint') != source_fingerprint:
+        return None
+
+    states = {}
+    for base, keys in base_keys.items():
+        info = manifest['bases'].get(base)
+        cols = list(sketch_cols[base])
+        if info is None or info['keys'] != keys or info['sketch_cols'] != cols or info['alpha'] != alpha:
+            return None
+
+        sums = pd.read_parquet(os.path.join(in_dir, f'{base}_sums.parquet')).set_index(keys)
+        sketches = {}
+        for col in cols:
+            counts = pd.read_parquet(os.path.join(in_dir, f'{base}_{col}_sketch.parquet'))
+            sketches[col] = counts.set_index(keys + ['bucket'])['n']
+        states[base] = {'sums': sums, 'sketches': sketches, 'alpha': alpha}
+
+    return states
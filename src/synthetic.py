@@ -0,0 +1,290 @@
+import pandas as pd
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+import argparse
+import os
+
+from qa_rules import QA_RULES
+from paths import RAW_FOLDER, ZONE_LOOKUP_PATH
+
+# ------------------------------
+# SYNTHETIC YELLOW TAXI MONTHS
+# ------------------------------
+# Raw files with the 2019 TLC schema and roughly real distributions (hourly / weekday
+# demand profile, skewed zone popularity, log-normal distances, speeds that drop in rush
+# hours, fares built from the 2019 tariff), so the pipeline can be run and benchmarked
+# without the real multi-GB files. A given fraction of rows breaks each QA rule
+# (VIOLATIONS, disjoint blocks of rows) and a fraction are exact duplicates.
+# The same seed always gives the same file.
+RAW_SCHEMA = pa.schema([
+    ('VendorID', pa.int64()),
+    ('tpep_pickup_datetime', pa.timestamp('us')),
+    ('tpep_dropoff_datetime', pa.timestamp('us')),
+    ('passenger_count', pa.float64()),
+    ('trip_distance', pa.float64()),
+    ('RatecodeID', pa.float64()),
+    ('store_and_fwd_flag', pa.string()),
+    ('PULocationID', pa.int64()),
+    ('DOLocationID', pa.int64()),
+    ('payment_type', pa.int64()),
+    ('fare_amount', pa.float64()),
+    ('extra', pa.float64()),
+    ('mta_tax', pa.float64()),
+    ('tip_amount', pa.float64()),
+    ('tolls_amount', pa.float64()),
+    ('improvement_surcharge', pa.float64()),
+    ('total_amount', pa.float64()),
+    ('congestion_surcharge', pa.float64()),
+    ('airport_fee', pa.float64()),
+])
+
+DEFAULT_VIOLATION_RATE = 0.005   # per rule
+DEFAULT_DUPLICATE_RATE = 0.001
+CHUNK_ROWS = 1_000_000
+
+# Share of the day's trips starting in each hour, and relative demand Monday..Sunday
+HOUR_PROFILE = np.array([
+    30, 21, 15, 10, 8, 9, 20, 35, 45, 46, 46, 48,
+    51, 52, 55, 56, 55, 61, 68, 65, 58, 55, 53, 43,
+], dtype='float64')
+DOW_PROFILE = np.array([0.95, 1.0, 1.03, 1.08, 1.08, 1.02, 0.85])
+# Median speed (mph) by hour: free-flowing at night, slow in rush hours
+HOUR_SPEED = np.array([
+    17, 18, 19, 20, 20, 18, 15, 12, 10, 10, 10, 10,
+    10, 10, 10, 10, 10, 10, 10, 11, 13, 14, 15, 16,
+], dtype='float64')
+
+N_PICKUP_ZONES = 263   # PULocationID 264 / 265 are the "unknown" zones
+N_ZONES = 265
+BOROUGHS = ['Manhattan', 'Brooklyn', 'Queens', 'Bronx', 'Staten Island', 'EWR']
+
+
+# ------------------------------
+# VALID TRIPS
+# ------------------------------
+# Few zones get most trips (like Midtown / Upper East Side); fixed for every month
+def zone_weights(n_zones, seed=0):
+    rng = np.random.default_rng([seed, n_zones])
+    weights = 1 / np.arange(1, n_zones + 1) ** 1.1
+    return rng.permutation(weights) / weights.sum()
+
+def generate_trips(month_str, n_rows, rng, seed=0):
+    start = pd.Timestamp(month_str)
+    n_days = start.days_in_month
+    days = pd.date_range(start, periods=n_days, freq='D')
+    day_weights = DOW_PROFILE[days.dayofweek]
+
+    day = rng.choice(n_days, n_rows, p=day_weights / day_weights.sum())
+    hour = rng.choice(24, n_rows, p=HOUR_PROFILE / HOUR_PROFILE.sum())
+    seconds = day * 86_400 + hour * 3_600 + rng.integers(0, 3_600, n_rows)
+    pickup = start.to_datetime64().astype('datetime64[us]') + (seconds * 1_000_000).astype('timedelta64[us]')
+
+    distance = np.clip(rng.lognormal(np.log(1.6), 0.9, n_rows), 0.01, 60).round(2)
+    distance[rng.random(n_rows) < 0.01] = 0.0
+    speed = np.clip(HOUR_SPEED[hour] * rng.lognormal(0, 0.3, n_rows), 2, 50)
+    minutes = np.minimum(distance / speed * 60 + rng.uniform(1, 4, n_rows), 300)
+    dropoff = pickup + (minutes * 60_000_000).astype('int64').astype('timedelta64[us]')
+
+    rate_code = rng.choice([1, 2, 3, 4, 5], n_rows, p=[0.965, 0.022, 0.002, 0.001, 0.01]).astype('float64')
+    payment = rng.choice([1, 2, 3, 4], n_rows, p=[0.72, 0.27, 0.006, 0.004])
+
+    fare = np.where(rate_code == 2, 52.0, (2.5 + 2.5 * distance + 0.1 * minutes).round(1))
+    extra = rng.choice([0.0, 0.5, 1.0], n_rows, p=[0.45, 0.35, 0.2])
+    mta_tax = np.full(n_rows, 0.5)
+    tolls = np.where(rng.random(n_rows) < 0.05, 5.76, 0.0)
+    improvement = np.full(n_rows, 0.3)
+    congestion = np.where(rng.random(n_rows) < 0.9, 2.5, 0.0)
+    tip = np.where(payment == 1, (fare * rng.uniform(0.1, 0.3, n_rows)).round(2), 0.0)
+    total = (fare + extra + mta_tax + tip + tolls + improvement + congestion).round(2)
+
+    passengers = rng.choice(7, n_rows, p=[0.02, 0.70, 0.14, 0.04, 0.02, 0.05, 0.03]).astype('float64')
+    passengers[rng.random(n_rows) < 0.005] = np.nan
+
+    return pd.DataFrame({
+        'VendorID': rng.choice([1, 2], n_rows, p=[0.35, 0.65]),
+        'tpep_pickup_datetime': pickup,
+        'tpep_dropoff_datetime': dropoff,
+        'passenger_count': passengers,
+        'trip_distance': distance,
+        'RatecodeID': rate_code,
+        'store_and_fwd_flag': np.where(rng.random(n_rows) < 0.01, 'Y', 'N'),
+        'PULocationID': rng.choice(N_PICKUP_ZONES, n_rows, p=zone_weights(N_PICKUP_ZONES, seed)) + 1,
+        'DOLocationID': rng.choice(N_ZONES, n_rows, p=zone_weights(N_ZONES, seed + 1)) + 1,
+        'payment_type': payment,
+        'fare_amount': fare,
+        'extra': extra,
+        'mta_tax': mta_tax,
+        'tip_amount': tip,
+        'tolls_amount': tolls,
+        'improvement_surcharge': improvement,
+        'total_amount': total,
+        'congestion_surcharge': congestion,
+        'airport_fee': np.full(n_rows, np.nan),
+    })
+
+
+# ------------------------------
+# QA VIOLATIONS
+# ------------------------------
+# QA rule name -> how to break it on the rows idx (in place). Some breaks also trip a
+# related rule (a dropoff before the pickup is also a bad duration).
+# Minutes as microsecond timedeltas, the unit of the raw timestamps
+def _minutes(values):
+    return (np.asarray(values, dtype='float64') * 60_000_000).astype('int64').astype('timedelta64[us]')
+
+def _pickups(df, idx):
+    return df['tpep_pickup_datetime'].to_numpy()[idx]
+
+def _dropoff_before_pickup(df, idx, rng):
+    df.loc[idx, 'tpep_dropoff_datetime'] = _pickups(df, idx) - _minutes(rng.integers(1, 30, len(idx)))
+
+def _outside_month(df, idx, rng):
+    shift = _minutes(rng.choice([-40, 40], len(idx)) * 1440)
+    df.loc[idx, 'tpep_dropoff_datetime'] = df['tpep_dropoff_datetime'].to_numpy()[idx] + shift
+    df.loc[idx, 'tpep_pickup_datetime'] = _pickups(df, idx) + shift
+
+def _too_long(df, idx, rng):
+    df.loc[idx, 'tpep_dropoff_datetime'] = _pickups(df, idx) + _minutes(rng.uniform(11, 30, len(idx)) * 60)
+
+def _set(column, values):
+    def apply(df, idx, rng):
+        df.loc[idx, column] = rng.choice(values, len(idx))
+    return apply
+
+def _too_fast(df, idx, rng):
+    df.loc[idx, 'trip_distance'] = rng.uniform(80, 200, len(idx)).round(2)
+    df.loc[idx, 'tpep_dropoff_datetime'] = _pickups(df, idx) + _minutes(20)
+
+def _tip_above_total(df, idx, rng):
+    df.loc[idx, 'tip_amount'] = df.loc[idx, 'total_amount'] + rng.uniform(1, 20, len(idx)).round(2)
+
+VIOLATIONS = {
+    'qa_dropoff_after_pickup': _dropoff_before_pickup,
+    'qa_timedate': _outside_month,
+    'qa_duration': _too_long,
+    'qa_distance': _set('trip_distance', [-0.5, -1.2, -3.0]),
+    'qa_speed': _too_fast,
+    'qa_payment_type': _set('payment_type', [5, 6]),
+    'qa_total_amount': _set('total_amount', [0.0, -4.5, 1500.0]),
+    'qa_tip_amount': _tip_above_total,
+    'qa_non_neg_amount': _set('extra', [-0.5, -1.0]),
+    'qa_locationID': _set('PULocationID', [0, 264, 265]),
+    'qa_ratecodeID': _set('RatecodeID', [0.0, 99.0]),
+    'qa_vendorID': _set('VendorID', [3, 4, 5]),
+    'qa_passenger_count': _set('passenger_count', [10.0, 12.0, -1.0]),
+}
+
+# rates: {rule name: fraction of rows}; each rule gets its own block of rows
+def add_violations(df, rates, rng):
+    order = rng.permutation(len(df))
+    offset = 0
+    for rule, rate in rates.items():
+        n = int(round(rate * len(df)))
+        if n == 0:
+            continue
+        if rule not in VIOLATIONS:
+            raise KeyError(f'No synthetic violation for QA rule {rule}')
+        VIOLATIONS[rule](df, np.sort(order[offset:offset + n]), rng)
+        offset += n
+    if offset > len(df):
+        raise ValueError('Violation rates add up to more than every row')
+    return df
+
+def add_duplicates(df, rate, rng):
+    n = int(round(rate * len(df)))
+    if n == 0:
+        return df
+    return pd.concat([df, df.iloc[rng.choice(len(df), n, replace=False)]], ignore_index=True)
+
+def default_rates(rate=DEFAULT_VIOLATION_RATE):
+    return {rule['name']: rate for rule in QA_RULES if rule['name'] in VIOLATIONS}
+
+
+# ------------------------------
+# FILES
+# ------------------------------
+# One raw month, written chunk_rows at a time so memory stays flat at any size
+def write_raw_month(path, month_str, n_rows, seed=0, rates=None, duplicate_rate=DEFAULT_DUPLICATE_RATE,
+                    chunk_rows=CHUNK_ROWS):
+    rates = default_rates() if rates is None else rates
+    period = pd.Period(month_str, freq='M')
+    rng = np.random.default_rng([seed, period.year, period.month])
+
+    with pq.ParquetWriter(path, RAW_SCHEMA) as writer:
+        written = 0
+        while written < n_rows:
+            n_chunk = min(chunk_rows, n_rows - written)
+            # Duplicates are added on top of the chunk: keep the file at n_rows
+            n_unique = n_chunk - int(round(duplicate_rate * n_chunk))
+            df = add_violations(generate_trips(month_str, n_unique, rng, seed), rates, rng)
+            df = add_duplicates(df, duplicate_rate, rng).iloc[:n_chunk]
+            writer.write_table(pa.Table.from_pandas(df, schema=RAW_SCHEMA, preserve_index=False))
+            written += n_chunk
+
+# Stand-in for the TLC zone lookup (LocationID, Borough, Zone, service_zone)
+def write_zone_lookup(path):
+    ids = np.arange(1, N_ZONES + 1)
+    boroughs = np.array(BOROUGHS[:-1])[(ids - 1) % (len(BOROUGHS) - 1)].astype(object)
+    boroughs[0] = 'EWR'
+    boroughs[-2:] = 'Unknown'
+    pd.DataFrame({
+        'LocationID': ids,
+        'Borough': boroughs,
+        'Zone': [f'Zone {i}' for i in ids],
+        'service_zone': np.where(boroughs == 'Manhattan', 'Yellow Zone', 'Boro Zone'),
+    }).to_csv(path, index=False)
+
+def parse_rows(text):
+    text = text.strip().lower()
+    scale = {'k': 1_000, 'm': 1_000_000}.get(text[-1], 1)
+    return int(float(text[:-1] if scale > 1 else text) * scale)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Write synthetic yellow taxi raw files with the 2019 TLC schema.')
+    parser.add_argument('--year', type=int, default=2019)
+    parser.add_argument('--months', type=int, nargs='+', default=list(range(1, 13)),
+                        help='Months to generate (default: 1 to 12)')
+    parser.add_argument('--rows', type=parse_rows, default=parse_rows('100k'),
+                        help='Rows per month, e.g. 100k or 1M (default: 100k)')
+    parser.add_argument('--violation-rate', type=float, default=DEFAULT_VIOLATION_RATE,
+                        help=f'Fraction of rows breaking each QA rule (default: {DEFAULT_VIOLATION_RATE})')
+    parser.add_argument('--violation', action='append', default=[], metavar='RULE=RATE',
+                        help='Rate for one rule, e.g. qa_speed=0.02 (repeatable)')
+    parser.add_argument('--duplicate-rate', type=float, default=DEFAULT_DUPLICATE_RATE,
+                        help=f'Fraction of rows that are exact duplicates (default: {DEFAULT_DUPLICATE_RATE})')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default=RAW_FOLDER, help='Folder to write to (default: raw/)')
+    parser.add_argument('--overwrite', action='store_true', help='Replace files that already exist')
+    args = parser.parse_args(argv)
+
+    rates = default_rates(args.violation_rate)
+    for item in args.violation:
+        rule, _, rate = item.partition('=')
+        if rule not in VIOLATIONS:
+            parser.error(f'Unknown QA rule in --violation: {rule} (choose from {", ".join(VIOLATIONS)})')
+        rates[rule] = float(rate)
+
+    os.makedirs(args.output, exist_ok=True)
+    for month in args.months:
+        path = os.path.join(args.output, f'yellow_tripdata_{args.year}-{month:02d}.parquet')
+        if os.path.exists(path) and not args.overwrite:
+            print(f'Exists, skipped: {path} (--overwrite replaces it)')
+            continue
+        write_raw_month(path, f'{args.year}-{month:02d}', args.rows, args.seed, rates, args.duplicate_rate)
+        print(f'Saved: {path}')
+
+    # The stand-in lookup never goes into raw/, where it would shadow the real TLC file
+    if os.path.abspath(args.output) == os.path.abspath(RAW_FOLDER):
+        if not os.path.exists(ZONE_LOOKUP_PATH):
+            print(f'Note: {ZONE_LOOKUP_PATH} is missing; borough steps need the TLC zone lookup')
+        return
+    lookup_path = os.path.join(args.output, os.path.basename(ZONE_LOOKUP_PATH))
+    if not os.path.exists(lookup_path):
+        write_zone_lookup(lookup_path)
+        print(f'Saved: {lookup_path}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+import pandas as pd
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+import json
+import os
+
+from state_store import fingerprint
+from services import DEFAULT_SERVICE, PICKUP_COLUMN, raw_path, source_columns
+from paths import RAW_FOLDER, PROCESSED_FOLDER
+
+# ------------------------------
+# REAL DAILY TRIP COUNTS
+# ------------------------------
+# The truth a forecast is scored against is just trips per pickup day. Each raw month is
+# streamed batch by batch (pickup column only), its timestamps turned into day offsets
+# from the start of the month with integer arithmetic and counted with np.bincount; trips
+# outside the month are ignored, as before. Per-file counts are cached in
+# processed/truth_cache/ under the raw file's fingerprint, so an unchanged file is never
+# read twice and any window of days only costs the months it touches. clean_data.py
+# --aggregate fills the same cache from its own scan of the raw files (save_month_days).
+TRUTH_FOLDER = RAW_FOLDER
+CACHE_FOLDER = os.path.join(PROCESSED_FOLDER, 'truth_cache')
+BATCH_SIZE = 1_000_000
+US_PER_DAY = 86_400_000_000
+
+# Trips per day of the month from pickup times as int64 microseconds
+def day_counts(micros, month_str):
+    start = pd.Timestamp(month_str)
+    n_days = start.days_in_month
+    day = (micros - start.value // 1000) // US_PER_DAY
+    day = day[(day >= 0) & (day < n_days)]
+    return np.bincount(day, minlength=n_days)
+
+# Trips per day of month_str ('2020-01') in one raw file, as an int64 array
+def count_month_days(path, month_str, batch_size=BATCH_SIZE, column=PICKUP_COLUMN):
+    counts = np.zeros(pd.Timestamp(month_str).days_in_month, dtype='int64')
+    for batch in pq.ParquetFile(path).iter_batches(batch_size=batch_size, columns=[column]):
+        pickups = batch.column(0).drop_null()
+        counts += day_counts(pc.cast(pc.cast(pickups, pa.timestamp('us')), pa.int64()).to_numpy(), month_str)
+    return counts
+
+def _cache_path(path, cache_folder):
+    return os.path.join(cache_folder, os.path.basename(path).replace('.parquet', '.json'))
+
+def save_month_days(path, month_str, counts, cache_folder=CACHE_FOLDER, source_fingerprint=None):
+    os.makedirs(cache_folder, exist_ok=True)
+    with open(_cache_path(path, cache_folder), 'w') as f:
+        json.dump({'source': path, 'fingerprint': source_fingerprint or fingerprint(path), 'month': month_str,
+                   'counts': np.asarray(counts).tolist()}, f)
+
+def cached_month_days(path, month_str, use_cache=True, cache_folder=CACHE_FOLDER, batch_size=BATCH_SIZE,
+                      column=PICKUP_COLUMN):
+    cache_path = _cache_path(path, cache_folder)
+    source_fingerprint = fingerprint(path)
+    if use_cache and os.path.exists(cache_path):
+        with open(cache_path) as f:
+            cached = json.load(f)
+        if cached['fingerprint'] == source_fingerprint and cached['month'] == month_str:
+            return np.array(cached['counts'], dtype='int64')
+
+    counts = count_month_days(path, month_str, batch_size, column)
+    if use_cache:
+        save_month_days(path, month_str, counts, cache_folder, source_fingerprint)
+    return counts
+
+# Date / Real_Data for every day in [start, end); months without a raw file are skipped
+def load_truth(start, end, folder=TRUTH_FOLDER, use_cache=True, cache_folder=CACHE_FOLDER, batch_size=BATCH_SIZE,
+               service=DEFAULT_SERVICE):
+    start, end = pd.Timestamp(start).normalize(), pd.Timestamp(end).normalize()
+    column = source_columns([PICKUP_COLUMN], service)[0]
+    parts = []
+    for period in pd.period_range(start, end - pd.Timedelta(days=1), freq='M'):
+        path = raw_path(service, period.year, period.month, folder)
+        if not os.path.exists(path):
+            print(f'Missing: {os.path.basename(path)}')
+            continue
+        counts = cached_month_days(path, str(period), use_cache, cache_folder, batch_size, column)
+        dates = pd.date_range(period.start_time, periods=len(counts), freq='D')
+        parts.append(pd.DataFrame({'Date': dates, 'Real_Data': counts}))
+
+    if not parts:
+        raise FileNotFoundError(f'No raw files in {folder} between {start.date()} and {end.date()}')
+    df = pd.concat(parts, ignore_index=True)
+    return df[(df['Date'] >= start) & (df['Date'] < end)].reset_index(drop=True)
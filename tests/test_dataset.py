@@ -0,0 +1,40 @@
+import numpy as np
+
+import synthetic
+from clean_data import prepare_frame
+from dataset import write_month
+from query import scan
+
+
+def month_trips(n_rows=300, seed=0):
+    return prepare_frame(synthetic.generate_trips('2019-03', n_rows, np.random.default_rng(seed)))
+
+
+def rows(root):
+    return len(scan(str(root), columns=['PULocationID'], years=[2019], months=[3]))
+
+
+def test_rerun_by_borough_replaces_flat_month(tmp_path):
+    df = month_trips()
+    write_month(df, str(tmp_path), '2019-03')
+    write_month(df, str(tmp_path), '2019-03', borough_map={zone: 'Manhattan' if zone % 2 else 'Queens'
+                                                            for zone in range(1, 266)})
+    assert rows(tmp_path) == len(df)
+
+
+def test_rerun_without_a_borough_drops_its_files(tmp_path):
+    df = month_trips()
+    two_boroughs = {zone: 'Manhattan' if zone % 2 else 'Queens' for zone in range(1, 266)}
+    write_month(df, str(tmp_path), '2019-03', borough_map=two_boroughs)
+
+    manhattan = df[df['PULocationID'] % 2 == 1]
+    write_month(manhattan, str(tmp_path), '2019-03', borough_map=two_boroughs)
+    assert rows(tmp_path) == len(manhattan)
+    assert not (tmp_path / 'year=2019' / 'month=3' / 'pickup_borough=Queens').exists()
+
+
+def test_streamed_parts_add_to_the_month(tmp_path):
+    df = month_trips()
+    write_month(df.iloc[:100], str(tmp_path), '2019-03', part_index=0)
+    write_month(df.iloc[100:], str(tmp_path), '2019-03', part_index=1)
+    assert rows(tmp_path) == len(df)
@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+import clean_data
+import synthetic
+
+# Identify a trip without its pickup time: the copy of a late-January trip in the
+# February file is only kept by QA when its pickup was re-stamped into February
+TRIP_KEYS = ['VendorID', 'tpep_dropoff_datetime', 'PULocationID', 'DOLocationID', 'total_amount']
+
+
+def write_month(path, df):
+    pq.write_table(pa.Table.from_pandas(df, schema=synthetic.RAW_SCHEMA, preserve_index=False), path)
+
+
+@pytest.fixture
+def months(tmp_path, monkeypatch):
+    monkeypatch.setattr(clean_data, 'dedup_folder', str(tmp_path / 'dedup_hashes'))
+    rng = np.random.default_rng(0)
+    jan = synthetic.generate_trips('2019-01', 500, rng)
+    feb = synthetic.generate_trips('2019-02', 500, rng)
+
+    # Picked up just before midnight on Jan 31, reported again by the February file
+    jan.loc[0, 'tpep_pickup_datetime'] = pd.Timestamp('2019-01-31 23:55')
+    jan.loc[0, 'tpep_dropoff_datetime'] = pd.Timestamp('2019-02-01 00:10')
+    copy = jan.iloc[[0]].copy()
+    copy['tpep_pickup_datetime'] = pd.Timestamp('2019-02-01 00:00')
+    feb = pd.concat([feb, copy], ignore_index=True)
+
+    paths = [str(tmp_path / 'yellow_tripdata_2019-01.parquet'), str(tmp_path / 'yellow_tripdata_2019-02.parquet')]
+    write_month(paths[0], jan)
+    write_month(paths[1], feb)
+    return paths
+
+
+def copies_kept(months, dedup_keys):
+    jan_path, feb_path = months
+    clean_data.process_month(jan_path, dedup_keys, across_months=True)
+    feb_clean, _, _ = clean_data.process_month(feb_path, dedup_keys, across_months=True)
+    return (feb_clean['tpep_dropoff_datetime'] == pd.Timestamp('2019-02-01 00:10')).sum()
+
+
+def test_trip_keys_drop_copy_of_previous_month(months):
+    assert copies_kept(months, TRIP_KEYS) == 0
+
+
+def test_keys_with_pickup_time_keep_restamped_copy(months):
+    assert copies_kept(months, None) == 1
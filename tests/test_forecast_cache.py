@@ -0,0 +1,32 @@
+import numpy as np
+import pandas as pd
+from functools import partial
+
+import model_cache
+import bonus_PredictiveModel as forecast
+
+
+# Daily trips indexed like the KPI store hands them back (datetime64[us])
+def daily_trips(n_days, seed=0):
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range('2019-01-01', periods=n_days, freq='D').as_unit('us')
+    trips = 1000 + 200 * (dates.dayofweek >= 5) + rng.normal(0, 20, n_days)
+    return pd.DataFrame({'trips': trips.round()}, index=pd.Index(dates, name='date'))
+
+
+def test_append_extends_cached_model(tmp_path, monkeypatch):
+    monkeypatch.setattr(forecast, 'load_entry', partial(model_cache.load_entry, folder=str(tmp_path)))
+    monkeypatch.setattr(forecast, 'save_entry', partial(model_cache.save_entry, folder=str(tmp_path)))
+    data = daily_trips(120)
+
+    first = forecast.fit_sarimax(data.iloc[:-5], cache_name='city')
+    extended = forecast.fit_sarimax(data, cache_name='city', warm_start='append')
+
+    # Same parameters (no optimisation), state extended over the new days
+    assert extended.nobs == len(data)
+    np.testing.assert_allclose(extended.params, first.params)
+    meta, _ = model_cache.load_entry('city', forecast.sarimax_spec(), str(tmp_path))
+    assert meta['n_obs'] == len(data)
+
+    future = pd.date_range(data.index[-1] + pd.Timedelta(days=1), periods=7, freq='D')
+    assert np.isfinite(forecast.forecast_sarimax(extended, future)).all()